@@ -3,16 +3,17 @@ Analytics API Endpoints
 FastAPI routes for performance analytics and statistics
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
-from typing import Optional, Dict, List
-import os
-import boto3
-from boto3.dynamodb.conditions import Key
-from collections import defaultdict
-from pymongo import MongoClient
+from typing import Optional, List, Union
+import numpy as np
 from services.habits_detector import HabitsDetector
 from services.narrative_generator import NarrativeGenerator
+from services.match_repository import get_match_repository
+from services.match_columns import count_ids
+from services.heatmap_filter import filter_heatmap_events
+from services.heatmap_queries import HEATMAP_CATEGORIES
+from services.static_data import get_static_data
 
 router = APIRouter(prefix="/api/analytics", tags=["analytics"])
 
@@ -28,20 +29,8 @@ class PerformanceRequest(BaseModel):
     timeRange: Optional[int] = None  # Limit number of matches (e.g., 20, 50)
 
 
-def get_player_participant_data(match_data: Dict, target_puuid: str) -> Optional[Dict]:
-    """Find the player's participant data in a match"""
-    try:
-        participants = match_data.get('info', {}).get('participants', [])
-        for participant in participants:
-            if participant.get('puuid') == target_puuid:
-                return participant
-    except Exception as e:
-        print(f"Error finding participant: {e}")
-    return None
-
-
 @router.post("/performance")
-async def get_performance_analytics(request: PerformanceRequest):
+def get_performance_analytics(request: PerformanceRequest):
     """
     Get complete performance analytics for a player in one call
 
@@ -52,165 +41,68 @@ async def get_performance_analytics(request: PerformanceRequest):
         - Performance trends (gold, damage, deaths, vision per match)
     """
     try:
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
-        # Fetch all matches with pagination (do this once!)
-        matches = []
-        last_evaluated_key = None
-
-        while True:
-            if last_evaluated_key:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#'),
-                    ExclusiveStartKey=last_evaluated_key
-                )
-            else:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#')
-                )
-
-            matches.extend(response['Items'])
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break
-
-        if not matches:
+        # Columnar view of all matches (shared with the other analytics calls for this player)
+        repository = get_match_repository()
+        if not repository.get_summaries(request.puuid):
             raise HTTPException(status_code=404, detail="No matches found for player")
+        columns = repository.get_columns(request.puuid)
+
+        # === Apply Filters ===
+        champion = request.champion if request.champion and request.champion != 'All' else None
+
+        role = None
+        if request.role and request.role != 'All':
+            # Map roles: TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY
+            role_map = {
+                'Top': 'TOP',
+                'Jungle': 'JUNGLE',
+                'Mid': 'MIDDLE',
+                'Bot': 'BOTTOM',
+                'Support': 'UTILITY'
+            }
+            role = role_map.get(request.role, request.role)
+
+        # Matching rows in stored order, limited by time range
+        rows = columns.select(champion=champion, role=role, limit=request.timeRange)
+        match_count = len(rows)
+
+        if match_count == 0:
+            raise HTTPException(status_code=404, detail="No valid match data found")
 
-        # Initialize aggregation containers
+        def total(name):
+            return columns.total(name, rows)
+
+        # === Vision Stats ===
         vision_totals = {
-            'wardsPlaced': 0, 'wardsKilled': 0, 'controlWardsPlaced': 0,
-            'stealthWardsPlaced': 0, 'visionScore': 0, 'visionWardsBoughtInGame': 0,
-            'gameDuration': 0
+            'wardsPlaced': total('wardsPlaced'),
+            'wardsKilled': total('wardsKilled'),
+            'controlWardsPlaced': total('detectorWardsPlaced'),
+            'stealthWardsPlaced': total('stealthWardsPlaced'),
+            'visionScore': total('visionScore'),
+            'visionWardsBoughtInGame': total('visionWardsBoughtInGame'),
+            'gameDuration': total('gameDuration')
         }
 
+        # === Objective Stats ===
         objective_totals = {
-            'dragonTakedowns': 0, 'baronTakedowns': 0, 'turretTakedowns': 0,
-            'firstBloodCount': 0, 'firstTowerCount': 0, 'inhibitorTakedowns': 0,
-            'objectivesStolen': 0, 'teamObjectives': 0
+            'dragonTakedowns': total('dragonTakedowns'),
+            'baronTakedowns': total('teamBaronKills'),
+            'turretTakedowns': total('turretKills'),
+            'firstBloodCount': total('firstBloodKill'),
+            'firstTowerCount': total('firstTowerKill'),
+            'inhibitorTakedowns': total('inhibitorKills'),
+            'objectivesStolen': total('objectivesStolen'),
+            'teamObjectives': total('teamBaronKills') + total('teamElderDragonKills')
         }
 
-        item_counts = defaultdict(int)
-        rune_counts = defaultdict(int)
-
-        # Performance trends - store per match
-        performance_trends = []
-
-        # Champion breakdown - track stats per champion
-        champion_stats = defaultdict(lambda: {
-            'matches': 0, 'wins': 0, 'totalKDA': 0, 'totalDamageShare': 0,
-            'totalVisionScore': 0, 'totalGoldPerMin': 0
-        })
-
-        match_count = 0
-
-        # Process all matches in one pass
-        for match_item in matches:
-            match_data = match_item.get('data', {})
-            player_data = get_player_participant_data(match_data, request.puuid)
-
-            if not player_data:
-                continue
-
-            # === Apply Filters ===
-            # Filter by champion
-            if request.champion and request.champion != 'All':
-                if player_data.get('championName', '') != request.champion:
-                    continue
-
-            # Filter by role
-            if request.role and request.role != 'All':
-                player_role = player_data.get('teamPosition', '')
-                # Map roles: TOP, JUNGLE, MIDDLE, BOTTOM, UTILITY
-                role_map = {
-                    'Top': 'TOP',
-                    'Jungle': 'JUNGLE',
-                    'Mid': 'MIDDLE',
-                    'Bot': 'BOTTOM',
-                    'Support': 'UTILITY'
-                }
-                if role_map.get(request.role, request.role) != player_role:
-                    continue
-
-            # Limit by time range
-            if request.timeRange and match_count >= request.timeRange:
-                break
-
-            match_count += 1
-            match_info = match_data.get('info', {})
-
-            # === Vision Stats ===
-            vision_totals['wardsPlaced'] += int(player_data.get('wardsPlaced', 0))
-            vision_totals['wardsKilled'] += int(player_data.get('wardsKilled', 0))
-            vision_totals['controlWardsPlaced'] += int(player_data.get('detectorWardsPlaced', 0))
-            vision_totals['stealthWardsPlaced'] += int(player_data.get('challenges', {}).get('stealthWardsPlaced', 0) or 0)
-            vision_totals['visionScore'] += int(player_data.get('visionScore', 0))
-            vision_totals['visionWardsBoughtInGame'] += int(player_data.get('visionWardsBoughtInGame', 0))
-
-            game_duration = int(match_info.get('gameDuration', 0))
-            vision_totals['gameDuration'] += game_duration
-
-            # === Objective Stats ===
-            challenges = player_data.get('challenges', {})
-            objective_totals['dragonTakedowns'] += int(challenges.get('dragonTakedowns', 0) or 0)
-            objective_totals['baronTakedowns'] += int(challenges.get('teamBaronKills', 0) or 0)
-            objective_totals['turretTakedowns'] += int(player_data.get('turretKills', 0))
-            objective_totals['inhibitorTakedowns'] += int(player_data.get('inhibitorKills', 0))
-            objective_totals['firstBloodCount'] += 1 if player_data.get('firstBloodKill') else 0
-            objective_totals['firstTowerCount'] += 1 if player_data.get('firstTowerKill') else 0
-            objective_totals['objectivesStolen'] += int(challenges.get('objectivesStolen', 0) or 0)
-            objective_totals['teamObjectives'] += int(challenges.get('teamBaronKills', 0) or 0) + int(challenges.get('teamElderDragonKills', 0) or 0)
-
-            # === Items ===
-            for i in range(7):
-                item_id = player_data.get(f'item{i}', 0)
-                if item_id > 0:
-                    item_counts[item_id] += 1
-
-            # === Runes ===
-            perks = player_data.get('perks', {})
-            primary_style = perks.get('styles', [{}])[0] if perks.get('styles') else {}
-            if primary_style:
-                for selection in primary_style.get('selections', []):
-                    perk_id = selection.get('perk')
-                    if perk_id:
-                        rune_counts[perk_id] += 1
-
-            # === Performance Trends ===
-            # Use pre-calculated values from challenges to avoid Decimal issues
-            gold_per_min = float(challenges.get('goldPerMinute', 0))
-            kda = float(challenges.get('kda', 0))
-            damage_share = float(challenges.get('teamDamagePercentage', 0)) * 100 if challenges.get('teamDamagePercentage') else 0
-            vision_score = int(player_data.get('visionScore', 0))
-            is_win = player_data.get('win', False)
-
-            performance_trends.append({
-                'matchId': match_data.get('metadata', {}).get('matchId'),
-                'gameCreation': int(match_info.get('gameCreation', 0)),
-                'goldPerMinute': gold_per_min,
-                'damageToChampions': int(player_data.get('totalDamageDealtToChampions', 0)),
-                'deaths': int(player_data.get('deaths', 0)),
-                'visionScore': vision_score,
-                'kills': int(player_data.get('kills', 0)),
-                'assists': int(player_data.get('assists', 0)),
-                'kda': kda,
-                'win': is_win,
-                'damageShare': damage_share
-            })
-
-            # === Champion Stats ===
-            champion_name = player_data.get('championName', 'Unknown')
-            champion_stats[champion_name]['matches'] += 1
-            champion_stats[champion_name]['wins'] += 1 if is_win else 0
-            champion_stats[champion_name]['totalKDA'] += kda
-            champion_stats[champion_name]['totalDamageShare'] += damage_share
-            champion_stats[champion_name]['totalVisionScore'] += vision_score
-            champion_stats[champion_name]['totalGoldPerMin'] += gold_per_min
-
-        if match_count == 0:
-            raise HTTPException(status_code=404, detail="No valid match data found")
+        # === Performance Trends ===
+        # Use pre-calculated values from challenges (already floats in the columnar view)
+        gold_per_min = columns['goldPerMinute'][rows]
+        kda = columns['kda'][rows]
+        damage_share = columns['teamDamagePercentage'][rows] * 100
+        vision_score = columns['visionScore'][rows]
+        deaths = columns['deaths'][rows]
+        wins = columns['win'][rows]
 
         # === Calculate Vision Averages ===
         vision_averages = {
@@ -238,57 +130,84 @@ async def get_performance_analytics(request: PerformanceRequest):
         objective_participation = round((objective_averages['dragons'] + objective_averages['barons']) * 10, 1)
 
         # === Top Items ===
-        top_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:10]
         items_with_rates = [
             {
                 'itemId': item_id,
                 'pickRate': round((count / match_count) * 100, 1),
                 'pickCount': count
             }
-            for item_id, count in top_items
+            for item_id, count in count_ids(columns.items[rows], top=10)
         ]
 
         # === Top Runes ===
-        top_runes = sorted(rune_counts.items(), key=lambda x: x[1], reverse=True)[:8]
         runes_with_rates = [
             {
                 'runeId': rune_id,
                 'pickRate': round((count / match_count) * 100, 1),
                 'pickCount': count
             }
-            for rune_id, count in top_runes
+            for rune_id, count in count_ids(columns.runes[rows], top=8)
         ]
 
-        # Sort performance trends by date (newest first for display)
-        performance_trends.sort(key=lambda x: x.get('gameCreation', 0), reverse=True)
+        # Performance trends by date (newest first for display); only the shown ones become dicts
+        newest_first = rows[np.argsort(-columns['gameCreation'][rows], kind='stable')][:50]
+        performance_trends = [
+            {
+                'matchId': columns.match_ids[row],
+                'gameCreation': creation,
+                'goldPerMinute': gpm,
+                'damageToChampions': damage,
+                'deaths': match_deaths,
+                'visionScore': vision,
+                'kills': kills,
+                'assists': assists,
+                'kda': match_kda,
+                'win': won,
+                'damageShare': share
+            }
+            for row, creation, gpm, damage, match_deaths, vision, kills, assists, match_kda, won, share in zip(
+                newest_first.tolist(),
+                columns['gameCreation'][newest_first].tolist(),
+                columns['goldPerMinute'][newest_first].tolist(),
+                columns['totalDamageDealtToChampions'][newest_first].tolist(),
+                columns['deaths'][newest_first].tolist(),
+                columns['visionScore'][newest_first].tolist(),
+                columns['kills'][newest_first].tolist(),
+                columns['assists'][newest_first].tolist(),
+                columns['kda'][newest_first].tolist(),
+                columns['win'][newest_first].tolist(),
+                (columns['teamDamagePercentage'][newest_first] * 100).tolist()
+            )
+        ]
 
         # === Calculate KPI aggregates ===
-        total_kda = sum(match.get('kda', 0) for match in performance_trends)
-        total_damage_share = sum(match.get('damageShare', 0) for match in performance_trends)
-        total_gold_per_min = sum(match.get('goldPerMinute', 0) for match in performance_trends)
-        total_wins = sum(1 for match in performance_trends if match.get('win', False))
-
         kpi_stats = {
-            'kda': round(total_kda / match_count, 2) if match_count > 0 else 0,
-            'damageShare': round(total_damage_share / match_count, 1) if match_count > 0 else 0,
-            'goldPerMinute': round(total_gold_per_min / match_count, 0) if match_count > 0 else 0,
+            'kda': round(float(kda.sum()) / match_count, 2),
+            'damageShare': round(float(damage_share.sum()) / match_count, 1),
+            'goldPerMinute': round(float(gold_per_min.sum()) / match_count, 0),
             'visionScore': vision_averages['visionScore'],
-            'winRate': round((total_wins / match_count) * 100, 1) if match_count > 0 else 0
+            'winRate': round((int(wins.sum()) / match_count) * 100, 1)
         }
 
         # === Champion Breakdown ===
-        champion_breakdown = []
-        for champ_name, stats in champion_stats.items():
-            if stats['matches'] > 0:
-                champion_breakdown.append({
-                    'champion': champ_name,
-                    'matches': stats['matches'],
-                    'avgKDA': round(stats['totalKDA'] / stats['matches'], 2),
-                    'winRate': round((stats['wins'] / stats['matches']) * 100, 1),
-                    'damage': round(stats['totalDamageShare'] / stats['matches'], 1),
-                    'vision': round(stats['totalVisionScore'] / stats['matches'], 1),
-                    'gpm': round(stats['totalGoldPerMin'] / stats['matches'], 0)
-                })
+        champion_breakdown = [
+            {
+                'champion': stats['champion'],
+                'matches': stats['matches'],
+                'avgKDA': round(stats['totalKDA'] / stats['matches'], 2),
+                'winRate': round((stats['wins'] / stats['matches']) * 100, 1),
+                'damage': round(stats['totalDamageShare'] / stats['matches'], 1),
+                'vision': round(stats['totalVisionScore'] / stats['matches'], 1),
+                'gpm': round(stats['totalGoldPerMin'] / stats['matches'], 0)
+            }
+            for stats in columns.group_by_champion(rows, {
+                'wins': wins,
+                'totalKDA': kda,
+                'totalDamageShare': damage_share,
+                'totalVisionScore': vision_score,
+                'totalGoldPerMin': gold_per_min
+            })
+        ]
 
         # Sort by matches played (descending)
         champion_breakdown.sort(key=lambda x: x['matches'], reverse=True)
@@ -301,7 +220,7 @@ async def get_performance_analytics(request: PerformanceRequest):
             'vision': min(round((kpi_stats['visionScore'] / 60) * 100, 1), 100),  # Assume 60 vision is perfect
             'objectives': min(round(objective_participation, 1), 100),
             'farming': min(round((kpi_stats['goldPerMinute'] / 600) * 100, 1), 100),  # Assume 600 GPM is perfect
-            'survivability': min(round(100 - (sum(match.get('deaths', 0) for match in performance_trends) / match_count) * 10, 1), 100) if match_count > 0 else 50  # Lower deaths = higher survivability
+            'survivability': min(round(100 - (int(deaths.sum()) / match_count) * 10, 1), 100)  # Lower deaths = higher survivability
         }
 
         # === Return Everything ===
@@ -325,7 +244,7 @@ async def get_performance_analytics(request: PerformanceRequest):
                 'topRunes': runes_with_rates
             },
             'trends': {
-                'matches': performance_trends[:50]  # Last 50 matches (frontend will filter based on timeRange)
+                'matches': performance_trends  # Last 50 matches (frontend will filter based on timeRange)
             },
             'championBreakdown': champion_breakdown,
             'radarData': radar_data
@@ -343,7 +262,7 @@ async def get_performance_analytics(request: PerformanceRequest):
 
 
 @router.post("/vision-control")
-async def get_vision_control_stats(request: VisionStatsRequest):
+def get_vision_control_stats(request: VisionStatsRequest):
     """
     Get vision control statistics for a player across all matches
 
@@ -354,67 +273,27 @@ async def get_vision_control_stats(request: VisionStatsRequest):
         - Game phase breakdown (early/mid/late)
     """
     try:
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
-        # Fetch all matches with pagination
-        matches = []
-        last_evaluated_key = None
-
-        while True:
-            if last_evaluated_key:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#'),
-                    ExclusiveStartKey=last_evaluated_key
-                )
-            else:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#')
-                )
-
-            matches.extend(response['Items'])
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break
-
-        if not matches:
+        # Columnar view of all matches
+        repository = get_match_repository()
+        if not repository.get_summaries(request.puuid):
             raise HTTPException(status_code=404, detail="No matches found for player")
+        columns = repository.get_columns(request.puuid)
+
+        rows = columns.select()
+        match_count = len(rows)
 
         # Aggregate vision stats
         total_stats = {
-            'wardsPlaced': 0,
-            'wardsKilled': 0,
-            'controlWardsPlaced': 0,
-            'stealthWardsPlaced': 0,
+            'wardsPlaced': columns.total('wardsPlaced', rows),
+            'wardsKilled': columns.total('wardsKilled', rows),
+            'controlWardsPlaced': columns.total('detectorWardsPlaced', rows),  # Control wards
+            'stealthWardsPlaced': columns.total('stealthWardsPlaced', rows),
             'detectorWardsPlaced': 0,
-            'visionScore': 0,
-            'visionWardsBoughtInGame': 0,
-            'gameDuration': 0
+            'visionScore': columns.total('visionScore', rows),
+            'visionWardsBoughtInGame': columns.total('visionWardsBoughtInGame', rows),
+            'gameDuration': columns.total('gameDuration', rows)
         }
 
-        match_count = 0
-
-        for match_item in matches:
-            match_data = match_item.get('data', {})
-            player_data = get_player_participant_data(match_data, request.puuid)
-
-            if not player_data:
-                continue
-
-            match_count += 1
-
-            # Aggregate basic stats (convert Decimal to int/float)
-            total_stats['wardsPlaced'] += int(player_data.get('wardsPlaced', 0))
-            total_stats['wardsKilled'] += int(player_data.get('wardsKilled', 0))
-            total_stats['controlWardsPlaced'] += int(player_data.get('detectorWardsPlaced', 0))  # Control wards
-            total_stats['stealthWardsPlaced'] += int(player_data.get('challenges', {}).get('stealthWardsPlaced', 0) or 0)
-            total_stats['visionScore'] += int(player_data.get('visionScore', 0))
-            total_stats['visionWardsBoughtInGame'] += int(player_data.get('visionWardsBoughtInGame', 0))
-
-            game_duration = int(match_data.get('info', {}).get('gameDuration', 0))
-            total_stats['gameDuration'] += game_duration
-
         if match_count == 0:
             raise HTTPException(status_code=404, detail="No valid match data found")
 
@@ -458,7 +337,7 @@ async def get_vision_control_stats(request: VisionStatsRequest):
 
 
 @router.post("/objective-control")
-async def get_objective_control_stats(request: VisionStatsRequest):
+def get_objective_control_stats(request: VisionStatsRequest):
     """
     Get objective control statistics for a player
 
@@ -468,77 +347,31 @@ async def get_objective_control_stats(request: VisionStatsRequest):
         - First blood/tower/objective rates
     """
     try:
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
-        # Fetch all matches with pagination
-        matches = []
-        last_evaluated_key = None
-
-        while True:
-            if last_evaluated_key:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#'),
-                    ExclusiveStartKey=last_evaluated_key
-                )
-            else:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#')
-                )
-
-            matches.extend(response['Items'])
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break
-
-        if not matches:
+        # Columnar view of all matches
+        repository = get_match_repository()
+        if not repository.get_summaries(request.puuid):
             raise HTTPException(status_code=404, detail="No matches found")
+        columns = repository.get_columns(request.puuid)
 
-        # Aggregate objective stats
-        total_objectives = {
-            'dragonTakedowns': 0,
-            'baronTakedowns': 0,
-            'turretTakedowns': 0,
-            'firstBloodCount': 0,
-            'firstTowerCount': 0,
-            'inhibitorTakedowns': 0,
-            'objectivesStolen': 0,
-            'teamObjectives': 0
-        }
-
-        match_count = 0
-
-        for match_item in matches:
-            match_data = match_item.get('data', {})
-            player_data = get_player_participant_data(match_data, request.puuid)
-
-            if not player_data:
-                continue
-
-            match_count += 1
+        rows = columns.select()
+        match_count = len(rows)
 
-            # Get challenges data
-            challenges = player_data.get('challenges', {})
-
-            # Aggregate stats using participation (challenges) instead of just kills
+        # Aggregate stats using participation (challenges) instead of just kills
+        total_objectives = {
             # Dragons: Use dragonTakedowns for participation
-            total_objectives['dragonTakedowns'] += int(challenges.get('dragonTakedowns', 0) or 0)
-
+            'dragonTakedowns': columns.total('dragonTakedowns', rows),
             # Barons: Use teamBaronKills for participation
-            total_objectives['baronTakedowns'] += int(challenges.get('teamBaronKills', 0) or 0)
-
+            'baronTakedowns': columns.total('teamBaronKills', rows),
             # Turrets and inhibitors from direct stats
-            total_objectives['turretTakedowns'] += int(player_data.get('turretKills', 0))
-            total_objectives['inhibitorTakedowns'] += int(player_data.get('inhibitorKills', 0))
-
+            'turretTakedowns': columns.total('turretKills', rows),
             # First blood and first tower
-            total_objectives['firstBloodCount'] += 1 if player_data.get('firstBloodKill') else 0
-            total_objectives['firstTowerCount'] += 1 if player_data.get('firstTowerKill') else 0
-
+            'firstBloodCount': columns.total('firstBloodKill', rows),
+            'firstTowerCount': columns.total('firstTowerKill', rows),
+            'inhibitorTakedowns': columns.total('inhibitorKills', rows),
             # Objectives stolen
-            total_objectives['objectivesStolen'] += int(challenges.get('objectivesStolen', 0) or 0)
-            total_objectives['teamObjectives'] += int(challenges.get('teamBaronKills', 0) or 0) + int(challenges.get('teamElderDragonKills', 0) or 0)
+            'objectivesStolen': columns.total('objectivesStolen', rows),
+            'teamObjectives': columns.total('teamBaronKills', rows) + columns.total('teamElderDragonKills', rows)
+        }
 
         if match_count == 0:
             raise HTTPException(status_code=404, detail="No valid match data")
@@ -573,7 +406,7 @@ async def get_objective_control_stats(request: VisionStatsRequest):
 
 
 @router.post("/items-runes")
-async def get_items_runes_stats(request: VisionStatsRequest):
+def get_items_runes_stats(request: VisionStatsRequest):
     """
     Get most used items and runes for a player
 
@@ -582,87 +415,36 @@ async def get_items_runes_stats(request: VisionStatsRequest):
         - Most used rune pages with pick rates
     """
     try:
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
-        # Fetch all matches
-        matches = []
-        last_evaluated_key = None
-
-        while True:
-            if last_evaluated_key:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#'),
-                    ExclusiveStartKey=last_evaluated_key
-                )
-            else:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').begins_with('match#')
-                )
-
-            matches.extend(response['Items'])
-
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break
-
-        if not matches:
+        # Columnar view of all matches
+        repository = get_match_repository()
+        if not repository.get_summaries(request.puuid):
             raise HTTPException(status_code=404, detail="No matches found")
+        columns = repository.get_columns(request.puuid)
 
-        # Track item and rune frequency
-        item_counts = defaultdict(int)
-        rune_counts = defaultdict(int)
-        match_count = 0
-
-        for match_item in matches:
-            match_data = match_item.get('data', {})
-            player_data = get_player_participant_data(match_data, request.puuid)
-
-            if not player_data:
-                continue
-
-            match_count += 1
-
-            # Count items (item slots 0-6)
-            for i in range(7):
-                item_id = player_data.get(f'item{i}', 0)
-                if item_id > 0:
-                    item_counts[item_id] += 1
-
-            # Count runes
-            perks = player_data.get('perks', {})
-            primary_style = perks.get('styles', [{}])[0] if perks.get('styles') else {}
-
-            # Primary rune tree
-            if primary_style:
-                for selection in primary_style.get('selections', []):
-                    perk_id = selection.get('perk')
-                    if perk_id:
-                        rune_counts[perk_id] += 1
+        rows = columns.select()
+        match_count = len(rows)
 
         if match_count == 0:
             raise HTTPException(status_code=404, detail="No valid match data")
 
-        # Get top items (sorted by frequency)
-        top_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+        # Get top items (item slots 0-6, sorted by frequency)
         items_with_rates = [
             {
                 'itemId': item_id,
                 'pickRate': round((count / match_count) * 100, 1),
                 'pickCount': count
             }
-            for item_id, count in top_items
+            for item_id, count in count_ids(columns.items[rows], top=10)
         ]
 
-        # Get top runes
-        top_runes = sorted(rune_counts.items(), key=lambda x: x[1], reverse=True)[:8]
+        # Get top runes (primary rune tree)
         runes_with_rates = [
             {
                 'runeId': rune_id,
                 'pickRate': round((count / match_count) * 100, 1),
                 'pickCount': count
             }
-            for rune_id, count in top_runes
+            for rune_id, count in count_ids(columns.runes[rows], top=8)
         ]
 
         return {
@@ -678,66 +460,35 @@ async def get_items_runes_stats(request: VisionStatsRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _static_headers(request: Request, response: Response, *datasets: str) -> Optional[Response]:
+    """Set ETag/Cache-Control from the static data version; a 304 response when the client's copy is current"""
+    headers = get_static_data().cache_headers(*datasets)
+    if request.headers.get('if-none-match') == headers['ETag']:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 @router.post("/items/batch")
-async def get_items_batch(item_ids: List[int]):
+def get_items_batch(item_ids: List[int], response: Response):
     """Get multiple items information in one request"""
     try:
-        import json
-        item_path = os.path.join(os.path.dirname(__file__), '..', 'static_data', 'item.json')
-
-        with open(item_path, 'r', encoding='utf-8') as f:
-            item_data = json.load(f)
-
-        results = {}
-        for item_id in item_ids:
-            item_id_str = str(item_id)
-            if item_id_str in item_data.get('data', {}):
-                item = item_data['data'][item_id_str]
-                results[item_id] = {
-                    'id': item_id,
-                    'name': item.get('name', f'Item {item_id}'),
-                    'description': item.get('plaintext', ''),
-                    'image': item.get('image', {}).get('full', f'{item_id}.png')
-                }
-            else:
-                results[item_id] = {
-                    'id': item_id,
-                    'name': f'Item {item_id}',
-                    'description': '',
-                    'image': f'{item_id}.png'
-                }
-
-        return {'success': True, 'items': results}
+        static_data = get_static_data()
+        response.headers.update(static_data.cache_headers('items'))
+        return {'success': True, 'items': static_data.items(item_ids)}
     except Exception as e:
         print(f"Error loading items batch: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/items/{item_id}")
-async def get_item_info(item_id: str):
+def get_item_info(item_id: str, request: Request, response: Response):
     """Get item information by ID"""
     try:
-        import json
-        item_path = os.path.join(os.path.dirname(__file__), '..', 'static_data', 'item.json')
-
-        with open(item_path, 'r', encoding='utf-8') as f:
-            item_data = json.load(f)
-
-        if item_id in item_data.get('data', {}):
-            item = item_data['data'][item_id]
-            return {
-                'id': item_id,
-                'name': item.get('name', f'Item {item_id}'),
-                'description': item.get('plaintext', ''),
-                'image': item.get('image', {}).get('full', f'{item_id}.png')
-            }
-        else:
-            return {
-                'id': item_id,
-                'name': f'Item {item_id}',
-                'description': '',
-                'image': f'{item_id}.png'
-            }
+        not_modified = _static_headers(request, response, 'items')
+        if not_modified:
+            return not_modified
+        return get_static_data().item(item_id)
     except Exception as e:
         print(f"Error loading item {item_id}: {e}")
         return {
@@ -749,80 +500,25 @@ async def get_item_info(item_id: str):
 
 
 @router.post("/runes/batch")
-async def get_runes_batch(rune_ids: List[int]):
+def get_runes_batch(rune_ids: List[int], response: Response):
     """Get multiple runes information in one request"""
     try:
-        import json
-        rune_path = os.path.join(os.path.dirname(__file__), '..', 'static_data', 'runesReforged.json')
-
-        with open(rune_path, 'r', encoding='utf-8') as f:
-            rune_trees = json.load(f)
-
-        # Build a lookup map for runes
-        rune_lookup = {}
-        for tree in rune_trees:
-            for slot in tree.get('slots', []):
-                for rune in slot.get('runes', []):
-                    rune_id = rune.get('id')
-                    if rune_id:
-                        rune_lookup[rune_id] = {
-                            'id': rune_id,
-                            'name': rune.get('name', f'Rune {rune_id}'),
-                            'key': rune.get('key', ''),
-                            'icon': rune.get('icon', ''),
-                            'shortDesc': rune.get('shortDesc', '')
-                        }
-
-        results = {}
-        for rune_id in rune_ids:
-            if rune_id in rune_lookup:
-                results[rune_id] = rune_lookup[rune_id]
-            else:
-                results[rune_id] = {
-                    'id': rune_id,
-                    'name': f'Rune {rune_id}',
-                    'key': '',
-                    'icon': '',
-                    'shortDesc': ''
-                }
-
-        return {'success': True, 'runes': results}
+        static_data = get_static_data()
+        response.headers.update(static_data.cache_headers('runes'))
+        return {'success': True, 'runes': static_data.runes(rune_ids)}
     except Exception as e:
         print(f"Error loading runes batch: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/runes/{rune_id}")
-async def get_rune_info(rune_id: int):
+def get_rune_info(rune_id: int, request: Request, response: Response):
     """Get rune information by ID"""
     try:
-        import json
-        rune_path = os.path.join(os.path.dirname(__file__), '..', 'static_data', 'runesReforged.json')
-
-        with open(rune_path, 'r', encoding='utf-8') as f:
-            rune_trees = json.load(f)
-
-        # Search through all rune trees and slots
-        for tree in rune_trees:
-            for slot in tree.get('slots', []):
-                for rune in slot.get('runes', []):
-                    if rune.get('id') == rune_id:
-                        return {
-                            'id': rune_id,
-                            'name': rune.get('name', f'Rune {rune_id}'),
-                            'key': rune.get('key', ''),
-                            'icon': rune.get('icon', ''),
-                            'shortDesc': rune.get('shortDesc', '')
-                        }
-
-        # Rune not found
-        return {
-            'id': rune_id,
-            'name': f'Rune {rune_id}',
-            'key': '',
-            'icon': '',
-            'shortDesc': ''
-        }
+        not_modified = _static_headers(request, response, 'runes')
+        if not_modified:
+            return not_modified
+        return get_static_data().rune(rune_id)
     except Exception as e:
         print(f"Error loading rune {rune_id}: {e}")
         return {
@@ -834,6 +530,30 @@ async def get_rune_info(rune_id: int):
         }
 
 
+@router.get("/champions/{champion}")
+def get_champion_info(champion: str, request: Request, response: Response):
+    """Get champion information by numeric key or name"""
+    not_modified = _static_headers(request, response, 'champions')
+    if not_modified:
+        return not_modified
+    champion_info = get_static_data().champion(champion)
+    if champion_info is None:
+        raise HTTPException(status_code=404, detail=f"Champion {champion} not found")
+    return champion_info
+
+
+@router.get("/challenges/{challenge_id}")
+def get_challenge_info(challenge_id: int, request: Request, response: Response):
+    """Get challenge configuration by ID"""
+    not_modified = _static_headers(request, response, 'challenges')
+    if not_modified:
+        return not_modified
+    challenge = get_static_data().challenge(challenge_id)
+    if challenge is None:
+        raise HTTPException(status_code=404, detail=f"Challenge {challenge_id} not found")
+    return challenge
+
+
 class HabitsRequest(BaseModel):
     puuid: str
     time_range: Optional[int] = None  # Number of recent matches to analyze
@@ -841,7 +561,7 @@ class HabitsRequest(BaseModel):
 
 
 @router.post("/habits")
-async def get_player_habits(request: HabitsRequest):
+def get_player_habits(request: HabitsRequest):
     """
     Detect persistent gameplay habits (both good and bad)
 
@@ -876,7 +596,7 @@ class NarrativeRequest(BaseModel):
 
 
 @router.post("/year-narrative")
-async def generate_year_narrative(request: NarrativeRequest):
+def generate_year_narrative(request: NarrativeRequest):
     """
     Generate Spotify Wrapped-style year recap narrative
 
@@ -907,14 +627,16 @@ async def generate_year_narrative(request: NarrativeRequest):
 
 class FilteredHeatmapRequest(BaseModel):
     puuid: str
-    event_type: str  # 'kills', 'deaths', 'assists', 'objectives'
+    event_type: Union[str, List[str]]  # 'kills', 'deaths', 'assists', 'objectives' (or several, one pass)
     champion_name: Optional[str] = None
     role: Optional[str] = None
     time_range: Optional[int] = None  # Number of recent matches
+    include_points: bool = False  # Raw event points in addition to the density grids
+    resolutions: Optional[List[int]] = None  # Density pyramid levels (default: all)
 
 
 @router.post("/filtered-heatmap")
-async def get_filtered_heatmap(request: FilteredHeatmapRequest):
+def get_filtered_heatmap(request: FilteredHeatmapRequest):
     """
     Get filtered heatmap data on-the-fly based on dynamic criteria.
 
@@ -924,160 +646,39 @@ async def get_filtered_heatmap(request: FilteredHeatmapRequest):
     - Filter by time range (e.g., last 20 matches)
     - Or any combination of the above
 
-    Returns filtered event points with positions for heatmap visualization.
+    event_type may list several categories; they are classified in the same
+    pass and returned per type under event_types.
+
+    Returns density grids for heatmap visualization (raw event points with
+    include_points).
     """
     try:
         import logging
         logger = logging.getLogger(__name__)
 
-        # Connect to MongoDB for timeline data
-        mongo_connection = os.getenv('MONGODB_CONNECTION_STRING')
-        mongo_client = MongoClient(mongo_connection)
-        mongo_db = mongo_client['lol_timelines']
-
-        # Connect to DynamoDB for match data
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
-        logger.info(f"Filtering {request.event_type} - Champion: {request.champion_name}, Role: {request.role}, TimeRange: {request.time_range}")
-
-        # Get all timelines for this player from MongoDB
-        timelines_cursor = mongo_db.timelines.find({'puuid': request.puuid})
-        timelines = list(timelines_cursor)
-
-        if not timelines:
-            return {
-                "success": True,
-                "filtered_events": [],
-                "total_events": 0,
-                "filters_applied": {
-                    "champion": request.champion_name,
-                    "role": request.role,
-                    "time_range": request.time_range
-                }
-            }
+        event_types = [request.event_type] if isinstance(request.event_type, str) else request.event_type
+        unknown = [name for name in event_types if name not in HEATMAP_CATEGORIES]
+        if unknown or not event_types:
+            raise HTTPException(status_code=400, detail=f"event_type must be one or more of {list(HEATMAP_CATEGORIES)}")
 
-        logger.info(f"Found {len(timelines)} timeline documents")
-
-        # Build match metadata (champion, role) by fetching from DynamoDB
-        match_metadata = {}
-        participant_id_map = {}
-
-        # Limit to time_range if specified
-        timelines_to_process = timelines[:request.time_range] if request.time_range else timelines
-
-        for timeline_doc in timelines_to_process:
-            match_id = timeline_doc['matchId']
-
-            # Fetch match data from DynamoDB
-            try:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(request.puuid) & Key('dataType').eq(f'match#{match_id}')
-                )
-
-                if response['Items']:
-                    match_data = response['Items'][0].get('data', {})
-
-                    # Find player's participant ID
-                    participants_puuids = match_data.get('metadata', {}).get('participants', [])
-                    for idx, puuid in enumerate(participants_puuids, 1):
-                        if puuid == request.puuid:
-                            participant_id_map[match_id] = idx
-                            break
-
-                    # Extract champion and role
-                    participants = match_data.get('info', {}).get('participants', [])
-                    for participant in participants:
-                        if participant.get('puuid') == request.puuid:
-                            match_metadata[match_id] = {
-                                'champion_name': participant.get('championName', 'Unknown'),
-                                'role': participant.get('teamPosition', 'Unknown')
-                            }
-                            break
-            except Exception as e:
-                logger.error(f"Error fetching match {match_id}: {e}")
-                continue
-
-        logger.info(f"Built metadata for {len(match_metadata)} matches")
-
-        # Apply filters and collect matching events
-        filtered_events = []
-        total_events_checked = 0
-
-        for timeline_doc in timelines_to_process:
-            match_id = timeline_doc['matchId']
-
-            if match_id not in participant_id_map or match_id not in match_metadata:
-                continue
-
-            metadata = match_metadata[match_id]
-            participant_id = participant_id_map[match_id]
-
-            # Apply champion filter
-            if request.champion_name and metadata['champion_name'] != request.champion_name:
-                continue
-
-            # Apply role filter
-            if request.role and metadata['role'] != request.role:
-                continue
-
-            # Process timeline events
-            timeline_data = timeline_doc['data']
-
-            for frame in timeline_data['info']['frames']:
-                for event in frame.get('events', []):
-                    if not event.get('position'):
-                        continue
-
-                    pos = event['position']
-                    timestamp = event['timestamp']
-                    event_matched = False
-                    event_data = {
-                        'x': pos['x'],
-                        'y': pos['y'],
-                        'timestamp': timestamp,
-                        'match_id': match_id,
-                        'champion_name': metadata['champion_name'],
-                        'role': metadata['role']
-                    }
-
-                    # Match event type
-                    if request.event_type == 'deaths':
-                        if event['type'] == 'CHAMPION_KILL' and event.get('victimId') == participant_id:
-                            event_data['killer_id'] = event.get('killerId')
-                            event_matched = True
-
-                    elif request.event_type == 'kills':
-                        if event['type'] == 'CHAMPION_KILL' and event.get('killerId') == participant_id:
-                            event_data['victim_id'] = event.get('victimId')
-                            event_matched = True
-
-                    elif request.event_type == 'assists':
-                        if event['type'] == 'CHAMPION_KILL' and participant_id in event.get('assistingParticipantIds', []):
-                            event_data['victim_id'] = event.get('victimId')
-                            event_matched = True
-
-                    elif request.event_type == 'objectives':
-                        if event['type'] == 'ELITE_MONSTER_KILL' and event.get('killerId') == participant_id:
-                            event_data['monster_type'] = event.get('monsterType')
-                            event_matched = True
-                        elif event['type'] == 'BUILDING_KILL':
-                            assisting = event.get('assistingParticipantIds', [])
-                            if participant_id in assisting or event.get('killerId') == participant_id:
-                                event_data['building_type'] = event.get('buildingType')
-                                event_matched = True
-
-                    if event_matched:
-                        filtered_events.append(event_data)
-                        total_events_checked += 1
-
-        logger.info(f"Filtered to {len(filtered_events)} events from {total_events_checked} total")
+        # Same server-side filtering the year recap agent uses
+        result = filter_heatmap_events(
+            puuid=request.puuid,
+            event_type=request.event_type,
+            champion_name=request.champion_name,
+            role=request.role,
+            match_count=request.time_range,
+            include_points=request.include_points,
+            resolutions=request.resolutions
+        )
+
+        logger.info(f"Filtered heatmap: {result['total_events']} {request.event_type} events from {result['matches_analyzed']} matches")
 
         return {
             "success": True,
-            "filtered_events": filtered_events,
-            "total_events": len(filtered_events),
-            "matches_analyzed": len(match_metadata),
+            **{key: result[key] for key in ("filtered_events", "density", "event_types") if key in result},
+            "total_events": result['total_events'],
+            "matches_analyzed": result['matches_analyzed'],
             "filters_applied": {
                 "event_type": request.event_type,
                 "champion": request.champion_name,
@@ -1086,6 +687,8 @@ async def get_filtered_heatmap(request: FilteredHeatmapRequest):
             }
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         logger = logging.getLogger(__name__)
@@ -3,37 +3,25 @@ Player API Endpoints
 FastAPI routes for fetching and storing player data
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
 from pydantic import BaseModel
 from typing import Optional
 import sys
-import os
 from pathlib import Path
-from pymongo import MongoClient
 
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+from services.clients import ClientRegistry, get_clients
 from services.player_data_service import PlayerDataService
+from services.riot_api import get_riot_client
+from services.match_repository import get_match_repository
+from services.storage import get_player_data_store
+from services.timeline_codec import timeline_data as decode_timeline
+from services.timeline_store import get_timeline_store
 
 router = APIRouter(prefix="/api/player", tags=["player"])
 
-# Initialize MongoDB client once (reuse connection)
-_mongo_client = None
-
-def get_mongo_client():
-    """Get or create MongoDB client singleton"""
-    global _mongo_client
-    if _mongo_client is None:
-        connection_string = os.getenv('MONGODB_CONNECTION_STRING')
-        _mongo_client = MongoClient(
-            connection_string,
-            serverSelectionTimeoutMS=5000,  # 5 second timeout
-            connectTimeoutMS=5000,
-            socketTimeoutMS=5000
-        )
-    return _mongo_client
-
 # Request/Response models
 class PlayerRequest(BaseModel):
     gameName: str
@@ -46,8 +34,8 @@ class PlayerResponse(BaseModel):
     message: str
     data: Optional[dict] = None
 
-# Initialize service
-player_service = PlayerDataService()
+# Initialize service (app-scoped Riot client: one rate limiter and match cache, closed by the app lifespan)
+player_service = PlayerDataService(riot_client=get_riot_client())
 
 @router.post("/fetch", response_model=PlayerResponse)
 async def fetch_player_data(request: PlayerRequest):
@@ -91,7 +79,7 @@ async def fetch_player_data(request: PlayerRequest):
 
 
 @router.get("/data/{puuid}")
-async def get_player_data(puuid: str):
+def get_player_data(puuid: str, clients: ClientRegistry = Depends(get_clients)):
     """
     Get player data from DynamoDB
 
@@ -102,19 +90,8 @@ async def get_player_data(puuid: str):
         All player data from DynamoDB
     """
     try:
-        import boto3
-        import os
-
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
         # Query all data for this player
-        response = table.query(
-            KeyConditionExpression='puuid = :puuid',
-            ExpressionAttributeValues={':puuid': puuid}
-        )
-
-        items = response['Items']
+        items = get_player_data_store(clients).query(puuid)
 
         # Organize data by type
         data = {
@@ -160,12 +137,16 @@ async def get_player_data(puuid: str):
 
 
 @router.get("/match/timeline/{match_id}")
-async def get_match_timeline(match_id: str):
+def get_match_timeline(match_id: str, frame_start: Optional[int] = None, frame_end: Optional[int] = None,
+                       fields: Optional[str] = None, clients: ClientRegistry = Depends(get_clients)):
     """
     Get match timeline from MongoDB Atlas
 
     Args:
         match_id: Match ID (e.g., "NA1_5080320781")
+        frame_start / frame_end: Optional frame range (inclusive, one frame per minute)
+        fields: Optional comma-separated participant frame fields (e.g. "position,totalGold,xp");
+            packed timelines decode only these columns
 
     Returns:
         Match timeline data
@@ -176,14 +157,8 @@ async def get_match_timeline(match_id: str):
         logger = logging.getLogger(__name__)
         logger.info(f"Fetching timeline for match: {match_id}")
 
-        # Use the shared MongoDB client
-        mongo_client = get_mongo_client()
-        mongo_db = mongo_client['lol_timelines']
-
-        timeline_doc = mongo_db.timelines.find_one(
-            {'matchId': match_id},
-            {'_id': 0}  # Exclude MongoDB's _id field
-        )
+        # MongoDB (shared client) or the local store
+        timeline_doc = get_timeline_store(clients).get_timeline(match_id)
 
         if not timeline_doc:
             logger.warning(f"Timeline not found for match: {match_id}")
@@ -191,9 +166,13 @@ async def get_match_timeline(match_id: str):
 
         logger.info(f"Timeline document keys: {timeline_doc.keys()}")
 
-        # Extract the actual timeline data (nested inside 'data' field)
-        # The 'data' field contains the full timeline from Riot API
-        timeline_data = timeline_doc.get('data', {})
+        # Extract the actual timeline data (nested inside 'data' field, or decoded from the packed format)
+        # The result has the shape of the full timeline from Riot API
+        frames = None
+        if frame_start is not None or frame_end is not None:
+            frames = range(frame_start or 0, frame_end + 1 if frame_end is not None else sys.maxsize)
+        selected_fields = [field.strip() for field in fields.split(',') if field.strip()] if fields is not None else None
+        timeline_data = decode_timeline(timeline_doc, frames, selected_fields)
 
         logger.info(f"Timeline data extracted, has info: {'info' in timeline_data}")
 
@@ -211,7 +190,7 @@ async def get_match_timeline(match_id: str):
 
 
 @router.get("/search/{game_name}/{tag_line}")
-async def search_player(game_name: str, tag_line: str):
+def search_player(game_name: str, tag_line: str, clients: ClientRegistry = Depends(get_clients)):
     """
     Search for a player in the database
 
@@ -223,32 +202,15 @@ async def search_player(game_name: str, tag_line: str):
         Player account info if found in database
     """
     try:
-        import boto3
-        import os
-
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-
-        # Scan for player by name (not efficient for large databases)
-        # For production, consider adding a GSI on playerName
-        response = table.scan(
-            FilterExpression='playerName = :name',
-            ExpressionAttributeValues={
-                ':name': f"{game_name}#{tag_line}"
-            },
-            Limit=1
-        )
+        account_item = get_player_data_store(clients).find_player(f"{game_name}#{tag_line}")
 
-        items = response['Items']
-
-        if not items:
+        if not account_item:
             return {
                 'success': False,
                 'found': False,
                 'message': f"Player {game_name}#{tag_line} not found in database"
             }
 
-        account_item = items[0]
         return {
             'success': True,
             'found': True,
@@ -262,7 +224,7 @@ async def search_player(game_name: str, tag_line: str):
 
 
 @router.get("/matches/{puuid}")
-async def get_player_matches(puuid: str, include_full_data: bool = False):
+def get_player_matches(puuid: str, include_full_data: bool = False):
     """
     Get list of all matches for a player from DynamoDB
 
@@ -274,67 +236,41 @@ async def get_player_matches(puuid: str, include_full_data: bool = False):
         List of matches with summary info for selection
     """
     try:
-        import boto3
-        import os
-        from datetime import datetime
-
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
+        matches = []
 
-        # Query all match data for this player with pagination
-        # Note: dataType is the sort key in the lol-player-data table
-        from boto3.dynamodb.conditions import Key
+        # Summary rows carry every field listed here; full matches only when asked for
+        repository = get_match_repository()
+        items = repository.get_matches(puuid) if include_full_data else repository.get_summaries(puuid)
 
-        matches = []
-        last_evaluated_key = None
-
-        # Paginate through all results
-        while True:
-            if last_evaluated_key:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                    ExclusiveStartKey=last_evaluated_key
-                )
-            else:
-                response = table.query(
-                    KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                )
-
-            # Process items from this page
-            for item in response['Items']:
-                match_data = item.get('data', {})
-                match_info = match_data.get('info', {})
-                match_metadata = match_data.get('metadata', {})
-
-                # Find the player's participant data
-                participants = match_info.get('participants', [])
-                player_data = next((p for p in participants if p.get('puuid') == puuid), None)
-
-                if player_data:
-                    match_summary = {
-                        'matchId': match_metadata.get('matchId'),
-                        'gameCreation': match_info.get('gameCreation'),
-                        'gameDuration': match_info.get('gameDuration'),
-                        'gameMode': match_info.get('gameMode'),
-                        'championName': player_data.get('championName'),
-                        'championId': player_data.get('championId'),
-                        'kills': player_data.get('kills'),
-                        'deaths': player_data.get('deaths'),
-                        'assists': player_data.get('assists'),
-                        'win': player_data.get('win'),
-                        'role': player_data.get('teamPosition')
-                    }
-                    
-                    # Only include full data if explicitly requested
-                    if include_full_data:
-                        match_summary['fullData'] = match_data
-                    
-                    matches.append(match_summary)
-
-            # Check if there are more results to fetch
-            last_evaluated_key = response.get('LastEvaluatedKey')
-            if not last_evaluated_key:
-                break
+        for item in items:
+            match_data = item.get('data', {})
+            match_info = match_data.get('info', {})
+            match_metadata = match_data.get('metadata', {})
+
+            # Find the player's participant data
+            participants = match_info.get('participants', [])
+            player_data = next((p for p in participants if p.get('puuid') == puuid), None)
+
+            if player_data:
+                match_summary = {
+                    'matchId': match_metadata.get('matchId'),
+                    'gameCreation': match_info.get('gameCreation'),
+                    'gameDuration': match_info.get('gameDuration'),
+                    'gameMode': match_info.get('gameMode'),
+                    'championName': player_data.get('championName'),
+                    'championId': player_data.get('championId'),
+                    'kills': player_data.get('kills'),
+                    'deaths': player_data.get('deaths'),
+                    'assists': player_data.get('assists'),
+                    'win': player_data.get('win'),
+                    'role': player_data.get('teamPosition')
+                }
+
+                # Only include full data if explicitly requested
+                if include_full_data:
+                    match_summary['fullData'] = match_data
+
+                matches.append(match_summary)
 
         # Sort by game creation time (newest first)
         matches.sort(key=lambda x: x.get('gameCreation', 0), reverse=True)
@@ -351,7 +287,7 @@ async def get_player_matches(puuid: str, include_full_data: bool = False):
 
 
 @router.get("/match/{puuid}/{match_id}")
-async def get_single_match(puuid: str, match_id: str):
+def get_single_match(puuid: str, match_id: str, clients: ClientRegistry = Depends(get_clients)):
     """
     Get full data for a specific match
     
@@ -363,20 +299,12 @@ async def get_single_match(puuid: str, match_id: str):
         Full match data
     """
     try:
-        import boto3
-        from boto3.dynamodb.conditions import Key
-        
-        dynamodb = boto3.resource('dynamodb', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        table = dynamodb.Table('lol-player-data')
-        
-        response = table.query(
-            KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').eq(f'match#{match_id}')
-        )
+        item = get_player_data_store(clients).get_item(puuid, f'match#{match_id}')
         
-        if not response['Items']:
+        if not item:
             raise HTTPException(status_code=404, detail="Match not found")
         
-        match_data = response['Items'][0].get('data', {})
+        match_data = item.get('data', {})
         
         return {
             'success': True,
@@ -0,0 +1,238 @@
+"""
+Analytics aggregation benchmark
+Compares the per-match Python loop the performance endpoint used to run with the
+columnar NumPy path (services/match_columns.py) on synthetic matches.
+
+Usage:
+    python benchmark_analytics.py            # 1k and 10k matches
+    python benchmark_analytics.py 50000      # custom sizes
+"""
+import random
+import sys
+import time
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, List
+
+from api.analytics_api import PerformanceRequest, get_performance_analytics
+from services import match_repository
+from services.match_repository import MatchRepository
+
+PUUID = 'benchmark-puuid'
+CHAMPIONS = ['Ahri', 'Yasuo', 'Lux', 'Jinx', 'Thresh', 'Lee Sin', 'Garen', 'Ezreal', 'Orianna', 'Vi']
+ROLES = ['TOP', 'JUNGLE', 'MIDDLE', 'BOTTOM', 'UTILITY']
+ITEMS = [0, 1001, 3006, 3031, 3094, 6672, 3087, 3036, 3072, 3153, 3020, 6653]
+RUNES = [8005, 8008, 8021, 8010, 9111, 9104, 8014, 8299, 8017, 9103]
+
+
+def synthetic_matches(count: int, seed: int = 7) -> List[Dict]:
+    """Summary-shaped DynamoDB items (numbers as Decimal, like boto3 returns them)"""
+    rnd = random.Random(seed)
+    matches = []
+
+    for i in range(count):
+        participant = {
+            'puuid': PUUID,
+            'championName': rnd.choice(CHAMPIONS),
+            'teamPosition': rnd.choice(ROLES),
+            'win': rnd.random() < 0.5,
+            'kills': Decimal(rnd.randint(0, 20)),
+            'deaths': Decimal(rnd.randint(0, 15)),
+            'assists': Decimal(rnd.randint(0, 25)),
+            'wardsPlaced': Decimal(rnd.randint(0, 40)),
+            'wardsKilled': Decimal(rnd.randint(0, 15)),
+            'detectorWardsPlaced': Decimal(rnd.randint(0, 6)),
+            'visionScore': Decimal(rnd.randint(5, 90)),
+            'visionWardsBoughtInGame': Decimal(rnd.randint(0, 6)),
+            'turretKills': Decimal(rnd.randint(0, 4)),
+            'inhibitorKills': Decimal(rnd.randint(0, 2)),
+            'firstBloodKill': rnd.random() < 0.1,
+            'firstTowerKill': rnd.random() < 0.1,
+            'totalDamageDealtToChampions': Decimal(rnd.randint(3000, 60000)),
+            'challenges': {
+                'kda': Decimal(str(round(rnd.random() * 8, 4))),
+                'goldPerMinute': Decimal(str(round(250 + rnd.random() * 350, 4))),
+                'teamDamagePercentage': Decimal(str(round(rnd.random() * 0.4, 4))),
+                'stealthWardsPlaced': Decimal(rnd.randint(0, 30)),
+                'dragonTakedowns': Decimal(rnd.randint(0, 4)),
+                'teamBaronKills': Decimal(rnd.randint(0, 2)),
+                'teamElderDragonKills': Decimal(rnd.randint(0, 1)),
+                'objectivesStolen': Decimal(rnd.randint(0, 1))
+            },
+            'perks': {'styles': [{'selections': [{'perk': Decimal(rnd.choice(RUNES))} for _ in range(4)]}]}
+        }
+        for slot in range(7):
+            participant[f'item{slot}'] = Decimal(rnd.choice(ITEMS))
+
+        matches.append({
+            'puuid': PUUID,
+            'dataType': f'summary#NA1_{i:08d}',
+            'data': {
+                'metadata': {'matchId': f'NA1_{i:08d}'},
+                'info': {
+                    'gameCreation': Decimal(1_700_000_000_000 + rnd.randint(0, 10 ** 10)),
+                    'gameDuration': Decimal(rnd.randint(900, 2700)),
+                    'participants': [participant]
+                }
+            }
+        })
+
+    return matches
+
+
+def legacy_performance(matches: List[Dict], puuid: str) -> Dict:
+    """The per-match loop get_performance_analytics ran before the columnar layer (no filters)"""
+    vision_totals = defaultdict(int)
+    objective_totals = defaultdict(int)
+    item_counts = defaultdict(int)
+    rune_counts = defaultdict(int)
+    performance_trends = []
+    champion_stats = defaultdict(lambda: {
+        'matches': 0, 'wins': 0, 'totalKDA': 0, 'totalDamageShare': 0,
+        'totalVisionScore': 0, 'totalGoldPerMin': 0
+    })
+    match_count = 0
+
+    for match_item in matches:
+        match_data = match_item.get('data', {})
+        player_data = next(
+            (p for p in match_data.get('info', {}).get('participants', []) if p.get('puuid') == puuid),
+            None
+        )
+        if not player_data:
+            continue
+
+        match_count += 1
+        match_info = match_data.get('info', {})
+        challenges = player_data.get('challenges', {})
+
+        vision_totals['wardsPlaced'] += int(player_data.get('wardsPlaced', 0))
+        vision_totals['wardsKilled'] += int(player_data.get('wardsKilled', 0))
+        vision_totals['controlWardsPlaced'] += int(player_data.get('detectorWardsPlaced', 0))
+        vision_totals['stealthWardsPlaced'] += int(challenges.get('stealthWardsPlaced', 0) or 0)
+        vision_totals['visionScore'] += int(player_data.get('visionScore', 0))
+        vision_totals['visionWardsBoughtInGame'] += int(player_data.get('visionWardsBoughtInGame', 0))
+        vision_totals['gameDuration'] += int(match_info.get('gameDuration', 0))
+
+        objective_totals['dragonTakedowns'] += int(challenges.get('dragonTakedowns', 0) or 0)
+        objective_totals['baronTakedowns'] += int(challenges.get('teamBaronKills', 0) or 0)
+        objective_totals['turretTakedowns'] += int(player_data.get('turretKills', 0))
+        objective_totals['inhibitorTakedowns'] += int(player_data.get('inhibitorKills', 0))
+        objective_totals['firstBloodCount'] += 1 if player_data.get('firstBloodKill') else 0
+        objective_totals['firstTowerCount'] += 1 if player_data.get('firstTowerKill') else 0
+        objective_totals['objectivesStolen'] += int(challenges.get('objectivesStolen', 0) or 0)
+        objective_totals['teamObjectives'] += int(challenges.get('teamBaronKills', 0) or 0) + int(challenges.get('teamElderDragonKills', 0) or 0)
+
+        for i in range(7):
+            item_id = player_data.get(f'item{i}', 0)
+            if item_id > 0:
+                item_counts[item_id] += 1
+
+        perks = player_data.get('perks', {})
+        primary_style = perks.get('styles', [{}])[0] if perks.get('styles') else {}
+        for selection in primary_style.get('selections', []):
+            if selection.get('perk'):
+                rune_counts[selection['perk']] += 1
+
+        gold_per_min = float(challenges.get('goldPerMinute', 0))
+        kda = float(challenges.get('kda', 0))
+        damage_share = float(challenges.get('teamDamagePercentage', 0)) * 100 if challenges.get('teamDamagePercentage') else 0
+        vision_score = int(player_data.get('visionScore', 0))
+        is_win = player_data.get('win', False)
+
+        performance_trends.append({
+            'matchId': match_data.get('metadata', {}).get('matchId'),
+            'gameCreation': int(match_info.get('gameCreation', 0)),
+            'goldPerMinute': gold_per_min,
+            'damageToChampions': int(player_data.get('totalDamageDealtToChampions', 0)),
+            'deaths': int(player_data.get('deaths', 0)),
+            'visionScore': vision_score,
+            'kills': int(player_data.get('kills', 0)),
+            'assists': int(player_data.get('assists', 0)),
+            'kda': kda,
+            'win': is_win,
+            'damageShare': damage_share
+        })
+
+        champion = champion_stats[player_data.get('championName', 'Unknown')]
+        champion['matches'] += 1
+        champion['wins'] += 1 if is_win else 0
+        champion['totalKDA'] += kda
+        champion['totalDamageShare'] += damage_share
+        champion['totalVisionScore'] += vision_score
+        champion['totalGoldPerMin'] += gold_per_min
+
+    top_items = sorted(item_counts.items(), key=lambda x: x[1], reverse=True)[:10]
+    top_runes = sorted(rune_counts.items(), key=lambda x: x[1], reverse=True)[:8]
+    performance_trends.sort(key=lambda x: x.get('gameCreation', 0), reverse=True)
+
+    return {
+        'matchCount': match_count,
+        'kda': round(sum(m['kda'] for m in performance_trends) / match_count, 2),
+        'winRate': round(sum(1 for m in performance_trends if m['win']) / match_count * 100, 1),
+        'topItems': [int(item_id) for item_id, _ in top_items],
+        'topRunes': [int(rune_id) for rune_id, _ in top_runes],
+        'champions': sorted(champion_stats, key=lambda c: champion_stats[c]['matches'], reverse=True),
+        'trends': performance_trends[:50]
+    }
+
+
+class InMemoryTable:
+    """Serves pre-built items through the DynamoDB query() interface MatchRepository uses"""
+
+    def __init__(self, items: List[Dict]):
+        self.items = items
+
+    def query(self, **kwargs):
+        prefix = kwargs['KeyConditionExpression'].get_expression()['values'][1].get_expression()['values'][1]
+        return {'Items': self.items if prefix == 'summary#' else []}
+
+
+def columnar_performance(repository: MatchRepository) -> Dict:
+    match_repository._match_repository = repository
+    return get_performance_analytics(PerformanceRequest(puuid=PUUID))
+
+
+def timed(fn, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run(count: int):
+    matches = synthetic_matches(count)
+    repeat = 5 if count <= 10_000 else 2
+
+    legacy = legacy_performance(matches, PUUID)
+    columnar = columnar_performance(MatchRepository(table=InMemoryTable(matches), ttl_seconds=0))
+
+    # Same answer from both paths
+    assert legacy['matchCount'] == columnar['matchCount']
+    assert legacy['kda'] == columnar['kpi']['kda']
+    assert legacy['winRate'] == columnar['kpi']['winRate']
+    assert legacy['topItems'] == [i['itemId'] for i in columnar['items']['topItems']]
+    assert legacy['topRunes'] == [r['runeId'] for r in columnar['runes']['topRunes']]
+    assert legacy['champions'] == [c['champion'] for c in columnar['championBreakdown']]
+    assert legacy['trends'] == columnar['trends']['matches']
+
+    legacy_ms = timed(lambda: legacy_performance(matches, PUUID), repeat)
+    # Cold: columns built from the items on this call (first dashboard request)
+    cold_ms = timed(lambda: columnar_performance(MatchRepository(table=InMemoryTable(matches), ttl_seconds=0)), repeat)
+    # Warm: columns already cached (sibling endpoints, filter changes within the TTL)
+    warm_repository = MatchRepository(table=InMemoryTable(matches), ttl_seconds=300)
+    columnar_performance(warm_repository)
+    warm_ms = timed(lambda: columnar_performance(warm_repository), repeat)
+
+    print(f"{count:>8,} matches | loop {legacy_ms:9.1f} ms | columnar cold {cold_ms:9.1f} ms "
+          f"({legacy_ms / cold_ms:4.1f}x) | columnar warm {warm_ms:7.2f} ms ({legacy_ms / warm_ms:6.1f}x)")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000]
+    print("Performance analytics aggregation: per-match loop vs columnar NumPy")
+    for size in sizes:
+        run(size)
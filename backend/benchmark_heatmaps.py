@@ -0,0 +1,205 @@
+"""
+Heatmap query benchmark
+Compares the old full-timeline load (find + list + Python event scan) with the server-side
+projection/aggregation pipeline: wall time, peak RSS and bytes received from MongoDB.
+
+Seeds synthetic timelines into a scratch database (never lol_timelines):
+    python benchmark_heatmaps.py                 # 100 and 300 timelines
+    python benchmark_heatmaps.py 500 --keep      # keep the seeded data for another run
+
+Requires MONGODB_CONNECTION_STRING (a local mongod works: mongodb://localhost:27017).
+"""
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+import bson
+from dotenv import load_dotenv
+from pymongo import MongoClient, monitoring
+
+from services.heatmap_queries import find_timeline_participants, iter_heatmap_points
+
+load_dotenv()
+
+BENCHMARK_DB = 'lol_timelines_benchmark'
+PUUID = 'benchmark-puuid'
+EVENT_TYPES = ['CHAMPION_KILL', 'ELITE_MONSTER_KILL', 'BUILDING_KILL', 'WARD_PLACED', 'ITEM_PURCHASED', 'SKILL_LEVEL_UP']
+
+
+class ReplyBytes(monitoring.CommandListener):
+    """Sums the BSON size of every server reply (find/getMore/aggregate batches)"""
+
+    def __init__(self):
+        self.total = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.total += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+def synthetic_timeline(rnd: random.Random, index: int) -> dict:
+    """Riot-shaped timeline: ~30 one-minute frames with full participantFrames and mixed events"""
+    puuids = [f'other-{index}-{k}' for k in range(10)]
+    participant_id = index % 10 + 1
+    puuids[participant_id - 1] = PUUID
+
+    frames = []
+    for minute in range(rnd.randint(22, 38)):
+        participant_frames = {
+            str(pid): {
+                'participantId': pid,
+                'position': {'x': rnd.randint(0, 15000), 'y': rnd.randint(0, 15000)},
+                'currentGold': rnd.randint(0, 3000), 'totalGold': rnd.randint(500, 20000),
+                'level': rnd.randint(1, 18), 'xp': rnd.randint(0, 20000),
+                'minionsKilled': rnd.randint(0, 300), 'jungleMinionsKilled': rnd.randint(0, 150),
+                'championStats': {name: rnd.randint(0, 500) for name in (
+                    'abilityHaste', 'abilityPower', 'armor', 'armorPen', 'attackDamage', 'attackSpeed',
+                    'bonusArmorPenPercent', 'ccReduction', 'health', 'healthMax', 'healthRegen',
+                    'lifesteal', 'magicPen', 'magicResist', 'movementSpeed', 'power', 'powerMax'
+                )},
+                'damageStats': {name: rnd.randint(0, 50000) for name in (
+                    'magicDamageDone', 'magicDamageDoneToChampions', 'magicDamageTaken',
+                    'physicalDamageDone', 'physicalDamageDoneToChampions', 'physicalDamageTaken',
+                    'totalDamageDone', 'totalDamageDoneToChampions', 'totalDamageTaken',
+                    'trueDamageDone', 'trueDamageDoneToChampions', 'trueDamageTaken'
+                )}
+            }
+            for pid in range(1, 11)
+        }
+
+        events = []
+        for _ in range(rnd.randint(5, 25)):
+            event_type = rnd.choice(EVENT_TYPES)
+            event = {'type': event_type, 'timestamp': minute * 60000 + rnd.randint(0, 59999)}
+            if event_type in ('CHAMPION_KILL', 'ELITE_MONSTER_KILL', 'BUILDING_KILL'):
+                event.update({
+                    'position': {'x': rnd.randint(0, 15000), 'y': rnd.randint(0, 15000)},
+                    'killerId': rnd.randint(0, 10),
+                    'victimId': rnd.randint(1, 10),
+                    'assistingParticipantIds': rnd.sample(range(1, 11), rnd.randint(0, 3))
+                })
+                if event_type == 'ELITE_MONSTER_KILL':
+                    event['monsterType'] = rnd.choice(['DRAGON', 'BARON_NASHOR', 'RIFTHERALD'])
+                elif event_type == 'BUILDING_KILL':
+                    event['buildingType'] = rnd.choice(['TOWER_BUILDING', 'INHIBITOR_BUILDING'])
+            else:
+                event['participantId'] = rnd.randint(1, 10)
+            events.append(event)
+
+        frames.append({'timestamp': minute * 60000, 'events': events, 'participantFrames': participant_frames})
+
+    match_id = f'BENCH_{index:06d}'
+    return {
+        'matchId': match_id,
+        'puuid': PUUID,
+        'participantId': participant_id,
+        'championName': rnd.choice(['Ahri', 'Lux', 'Jinx']),
+        'teamPosition': rnd.choice(['MIDDLE', 'BOTTOM']),
+        'data': {'metadata': {'matchId': match_id, 'participants': puuids}, 'info': {'frames': frames}}
+    }
+
+
+def seed(db, count: int):
+    if db.timelines.count_documents({'puuid': PUUID}) == count:
+        return
+    db.timelines.drop()
+    rnd = random.Random(11)
+    for start in range(0, count, 25):
+        db.timelines.insert_many([synthetic_timeline(rnd, i) for i in range(start, min(start + 25, count))])
+    db.timelines.create_index('matchId', unique=True)
+    db.timelines.create_index('puuid')
+
+
+def legacy_heatmap(db) -> int:
+    """What TimelineAggregator did before: every full document in memory, events scanned in Python"""
+    timelines = list(db.timelines.find({'puuid': PUUID}))
+    points = 0
+    for timeline_doc in timelines:
+        participant_id = timeline_doc['participantId']
+        for frame in timeline_doc['data']['info']['frames']:
+            for event in frame.get('events', []):
+                if not event.get('position'):
+                    continue
+                if event['type'] == 'CHAMPION_KILL' and (
+                    event.get('victimId') == participant_id or event.get('killerId') == participant_id
+                    or participant_id in event.get('assistingParticipantIds', [])
+                ):
+                    points += 1
+                elif event['type'] == 'ELITE_MONSTER_KILL' and event.get('killerId') == participant_id:
+                    points += 1
+                elif event['type'] == 'BUILDING_KILL' and (
+                    participant_id in event.get('assistingParticipantIds', []) or event.get('killerId') == participant_id
+                ):
+                    points += 1
+    return points
+
+
+def pipeline_heatmap(db) -> int:
+    """Current path: participant fields via projection, every category streamed from one aggregation pass"""
+    participant_ids = {doc['matchId']: doc['participantId'] for doc in find_timeline_participants(db, PUUID)}
+    return sum(1 for _ in iter_heatmap_points(db, PUUID, participant_ids))
+
+
+def measure(mode: str):
+    """Run one mode in this (fresh) process and print a JSON result line"""
+    listener = ReplyBytes()
+    client = MongoClient(os.getenv('MONGODB_CONNECTION_STRING'), event_listeners=[listener])
+    db = client[BENCHMARK_DB]
+
+    start = time.perf_counter()
+    points = legacy_heatmap(db) if mode == 'legacy' else pipeline_heatmap(db)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+    print(json.dumps({'points': points, 'seconds': elapsed, 'peak_rss_mb': peak_rss_mb, 'bytes': listener.total}))
+
+
+def run(count: int):
+    client = MongoClient(os.getenv('MONGODB_CONNECTION_STRING'))
+    seed(client[BENCHMARK_DB], count)
+
+    results = {}
+    for mode in ('legacy', 'pipeline'):
+        # Separate processes so peak RSS of one mode doesn't hide the other
+        output = subprocess.run(
+            [sys.executable, __file__, '--measure', mode], capture_output=True, text=True, check=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    legacy, pipeline = results['legacy'], results['pipeline']
+    assert legacy['points'] == pipeline['points'], (legacy['points'], pipeline['points'])
+
+    print(f"{count:>5} timelines | legacy   {legacy['seconds']:7.2f} s  {legacy['peak_rss_mb']:8.1f} MB RSS  "
+          f"{legacy['bytes'] / 1024 / 1024:9.2f} MB received")
+    print(f"{'':>5}           | pipeline {pipeline['seconds']:7.2f} s  {pipeline['peak_rss_mb']:8.1f} MB RSS  "
+          f"{pipeline['bytes'] / 1024 / 1024:9.2f} MB received  ({legacy['points']} points)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == '--measure':
+        measure(sys.argv[2])
+        sys.exit(0)
+
+    if not os.getenv('MONGODB_CONNECTION_STRING'):
+        print("[ERROR] MONGODB_CONNECTION_STRING is not set")
+        sys.exit(1)
+
+    keep = '--keep' in sys.argv
+    sizes = [int(arg) for arg in sys.argv[1:] if arg.isdigit()] or [100, 300]
+    print("Heatmap generation: full timeline load vs projection + aggregation pipeline")
+    for size in sizes:
+        run(size)
+
+    if not keep:
+        MongoClient(os.getenv('MONGODB_CONNECTION_STRING')).drop_database(BENCHMARK_DB)
@@ -0,0 +1,88 @@
+"""
+Build the local storage tier
+Copies players into the Parquet / compressed-file store that STORAGE_BACKEND=local serves
+(LOCAL_STORE_DIR), then rebuilds their year recap aggregates there
+
+    python build_local_store.py <player_dir> [<player_dir> ...]      # directories written by save_to_filesystem
+    python build_local_store.py --from-aws <puuid> [<puuid> ...]     # a player's DynamoDB items and MongoDB timelines
+    python build_local_store.py --root <dir> ...                     # write to another store directory
+"""
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+from dotenv import load_dotenv
+
+from services.local_store import LocalPlayerData, LocalTimelines
+from services.match_repository import MatchRepository
+from services.player_data_service import PlayerDataService, build_player_items, build_timeline_documents
+from services.storage import LOCAL_STORE_DIR, DynamoPlayerData
+from services.timeline_ingest import BATCH_SIZE
+from services.timeline_store import MongoTimelines
+from services.year_recap_aggregate import YearRecapAggregates
+
+load_dotenv()
+
+
+def copy_directory(player_dir: str, players: LocalPlayerData, timelines: LocalTimelines) -> str:
+    """One save_to_filesystem directory into the store; returns the player's puuid"""
+    player_data = PlayerDataService.load_from_filesystem(player_dir)
+    items = players.write_items(build_player_items(player_data), name=player_dir)['written']
+    count, events = timelines.put_timelines(build_timeline_documents(player_data))
+    print(f"[OK] {player_dir}: {items} items, {count} timelines, {events:,} positioned events")
+    return player_data['puuid']
+
+
+def copy_from_aws(puuid: str, players: LocalPlayerData, timelines: LocalTimelines) -> str:
+    """A player's DynamoDB items and MongoDB timelines into the store"""
+    items = players.write_items(DynamoPlayerData().query(puuid), name=puuid)['written']
+
+    count = events = 0
+    batch = []
+    for doc in MongoTimelines().iter_timelines(puuid):
+        batch.append(doc)
+        if len(batch) >= BATCH_SIZE:
+            written, written_events = timelines.put_timelines(batch)
+            count, events = count + written, events + written_events
+            batch.clear()
+    written, written_events = timelines.put_timelines(batch)
+    count, events = count + written, events + written_events
+
+    print(f"[OK] {puuid}: {items} items, {count} timelines, {events:,} positioned events")
+    return puuid
+
+
+def directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.rglob('*') if file.is_file())
+
+
+def main(args: List[str]) -> int:
+    root = args[args.index('--root') + 1] if '--root' in args else os.getenv('LOCAL_STORE_DIR', LOCAL_STORE_DIR)
+    from_aws = '--from-aws' in args
+    targets = [arg for i, arg in enumerate(args) if not arg.startswith('--') and (i == 0 or args[i - 1] != '--root')]
+    if not targets:
+        print(__doc__)
+        return 2
+
+    players = LocalPlayerData(root)
+    timelines = LocalTimelines(root)
+    # Aggregates are recomputed from the summaries just written (no TTL caching)
+    aggregates = YearRecapAggregates(store=players, match_repository=MatchRepository(store=players, ttl_seconds=0))
+
+    failed = 0
+    for target in targets:
+        try:
+            puuid = copy_from_aws(target, players, timelines) if from_aws else copy_directory(target, players, timelines)
+            aggregates.rebuild(puuid)
+        except Exception as e:
+            print(f"[FAIL] {target}: {e}")
+            failed += 1
+
+    print(f"[OK] Local store at {root}: {directory_size(Path(root)) / 1024 / 1024:.1f} MB, "
+          f"{len(targets) - failed} players copied, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,121 @@
+"""
+Blocking I/O load test
+Fires concurrent /api/analytics/performance requests at the app (in-process, no network)
+with a DynamoDB stand-in that blocks for a fixed latency per query, and compares:
+
+    event loop   the handler awaited inline from an `async def` route (how the
+                 analytics endpoints ran before: every boto3 call stalls the loop)
+    thread pool  the real route (plain `def`, run on the bounded worker pool)
+
+While the load runs, /health is polled to show how long the loop stays unresponsive.
+
+Usage:
+    python loadtest_blocking.py                  # 200 requests, 50 concurrent, 50 ms per query
+    python loadtest_blocking.py 500 100 20       # requests, concurrency, query latency (ms)
+"""
+import asyncio
+import copy
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+from api.analytics_api import PerformanceRequest, get_performance_analytics
+from benchmark_analytics import PUUID, synthetic_matches
+from main import app
+from services import match_repository
+from services.blocking import configure_worker_pool
+from services.match_repository import MatchRepository
+
+LEGACY_PATH = '/loadtest/performance-on-loop'
+
+
+class SlowTable:
+    """Per-player summary items behind a query() that blocks the calling thread like a DynamoDB round trip"""
+
+    def __init__(self, players: List[str], latency_ms: float, matches_per_player: int = 50):
+        template = synthetic_matches(matches_per_player)
+        self.items = {}
+        for player in players:
+            items = copy.deepcopy(template)
+            for item in items:
+                item['puuid'] = player
+                item['data']['info']['participants'][0]['puuid'] = player
+            self.items[player] = items
+        self.latency = latency_ms / 1000
+
+    def query(self, **kwargs):
+        time.sleep(self.latency)
+        puuid_condition, sort_condition = kwargs['KeyConditionExpression'].get_expression()['values']
+        puuid = puuid_condition.get_expression()['values'][1]
+        prefix = sort_condition.get_expression()['values'][1]
+        return {'Items': self.items.get(puuid, []) if prefix == 'summary#' else []}
+
+
+@app.post(LEGACY_PATH, include_in_schema=False)
+async def performance_on_loop(request: PerformanceRequest):
+    # Same handler, called the way `async def` endpoints used to run it
+    return get_performance_analytics(request)
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event) -> List[float]:
+    """Latency of /health while the load runs (ms)"""
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get('/health')
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def run_load(path: str, players: List[str], requests: int, concurrency: int) -> Dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=None) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one(player: str):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(path, json={'puuid': player})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_health(client, stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(one(players[i % len(players)]) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        health = await probe
+
+    latencies.sort()
+    return {
+        'rps': requests / elapsed,
+        'p50': statistics.median(latencies),
+        'p95': latencies[int(len(latencies) * 0.95) - 1],
+        'health_max': max(health) if health else 0.0
+    }
+
+
+async def main(requests: int, concurrency: int, latency_ms: float):
+    configure_worker_pool()
+    # One player per concurrent slot (loads of the same player are single-flight by design),
+    # no TTL: every request pays the (simulated) DynamoDB round trip
+    players = [f'{PUUID}-{k}' for k in range(concurrency)]
+    match_repository._match_repository = MatchRepository(table=SlowTable(players, latency_ms), ttl_seconds=0)
+
+    print(f"{requests} requests, {concurrency} concurrent, {latency_ms:g} ms per DynamoDB query")
+    for label, path in (('event loop ', LEGACY_PATH), ('thread pool', '/api/analytics/performance')):
+        result = await run_load(path, players, requests, concurrency)
+        print(f"{label} | {result['rps']:7.1f} req/s | p50 {result['p50']:7.1f} ms | p95 {result['p95']:7.1f} ms | "
+              f"/health worst {result['health_max']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    args = [float(arg) for arg in sys.argv[1:]]
+    requests, concurrency, latency_ms = (args + [200, 50, 50][len(args):])[:3]
+    asyncio.run(main(int(requests), int(concurrency), latency_ms))
@@ -1,14 +1,16 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from fastapi import UploadFile, File
+from contextlib import asynccontextmanager
 import base64
-import os
+import json
 import logging
 from dotenv import load_dotenv
 
-from services.riot_api import RiotAPIClient
+from services.riot_api import get_riot_client
 from services.bedrock_ai import BedrockAIService
 from services.match_analyzer import MatchAnalyzer
 from services.coaching_agent import CoachingAgent
@@ -16,6 +18,10 @@ from services.match_chat_agent import MatchChatAgent
 from services.year_recap_chat_agent import YearRecapChatAgent
 from services.timeline_aggregator import TimelineAggregator
 from services.s3_service import S3Service
+from services.match_repository import request_scope
+from services.clients import get_clients
+from services.blocking import configure_worker_pool
+from services.chat_context import get_chat_metrics
 from services.demo_data import (
     DEMO_PLAYER,
     DEMO_YEAR_RECAP,
@@ -34,7 +40,26 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-app = FastAPI(title="Rift Rewind API", version="1.0.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bounded thread pool for blocking boto3 / pymongo / Bedrock work
+    configure_worker_pool()
+
+    # One set of pooled MongoDB / AWS clients for every service and endpoint
+    clients = get_clients()
+    try:
+        clients.connect()
+    except Exception as e:
+        logger.warning(f"Client registry initialization failed: {e}")
+    app.state.clients = clients
+    yield
+    # Close pooled Riot API, MongoDB and AWS connections
+    await riot_client.aclose()
+    clients.close()
+
+
+app = FastAPI(title="Rift Rewind API", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware for React frontend
 app.add_middleware(
@@ -50,12 +75,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def match_repository_scope(request: Request, call_next):
+    # Endpoints called during one request share a single load of each player's matches
+    with request_scope():
+        return await call_next(request)
+
+
 # Include routers
 app.include_router(player_router)
 app.include_router(analytics_router)
 
-# Initialize services
-riot_client = RiotAPIClient(api_key=os.getenv("RIOT_API_KEY"))
+# Initialize services (the Riot client is shared with the player API so both pace against one key budget)
+riot_client = get_riot_client()
 
 # Initialize Bedrock service (optional - some features won't work if unavailable)
 try:
@@ -125,6 +158,8 @@ class ChallengesRequest(BaseModel):
 class YearRecapHeatmapRequest(BaseModel):
     puuid: str
     player_name: str = "Player"
+    include_points: bool = False  # Raw event points in addition to the density grids
+    resolutions: Optional[List[int]] = None  # Density pyramid levels (default: all)
 
 
 class MatchChatRequest(BaseModel):
@@ -165,6 +200,12 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/api/metrics/chat-tokens")
+async def chat_token_metrics():
+    """Input tokens per chat agent since startup: billed, served from the prompt cache, removed by compaction"""
+    return get_chat_metrics().snapshot()
+
+
 @app.post("/api/player/lookup")
 async def lookup_player(request: PlayerRequest):
     """Look up a player by Riot ID (game name + tag line)"""
@@ -325,7 +366,7 @@ async def get_challenges_config(platform: str = "na1"):
 # ============= YEAR RECAP HEATMAP ENDPOINTS =============
 
 @app.post("/api/year-recap/heatmap")
-async def get_year_recap_heatmap(request: YearRecapHeatmapRequest):
+def get_year_recap_heatmap(request: YearRecapHeatmapRequest):
     """
     Generate year recap heatmap data by aggregating all timeline events.
 
@@ -333,13 +374,16 @@ async def get_year_recap_heatmap(request: YearRecapHeatmapRequest):
     and aggregates location-based events (deaths, kills, assists, objectives) for
     the specified player.
 
-    Returns heatmap data suitable for visualization on the map.
+    Returns density grids (binned counts per category at several resolutions)
+    suitable for visualization on the map; raw points only with include_points.
     """
     try:
         logger.info(f"Generating year recap heatmap for PUUID: {request.puuid[:8]}...")
         heatmap_data = timeline_aggregator.generate_heatmap_data(
             target_puuid=request.puuid,
-            player_name=request.player_name
+            player_name=request.player_name,
+            include_points=request.include_points,
+            resolutions=request.resolutions
         )
         logger.info(f"Heatmap generated: {heatmap_data['stats']['total_matches']} matches, "
                    f"{heatmap_data['stats']['deaths_count']} deaths, "
@@ -350,6 +394,19 @@ async def get_year_recap_heatmap(request: YearRecapHeatmapRequest):
         raise HTTPException(status_code=500, detail=f"Error generating heatmap: {str(e)}")
 
 
+def event_stream(events: AsyncIterator[dict]) -> StreamingResponse:
+    """Server-Sent Events response: one `event: <type>` / `data: <json>` pair per agent event"""
+    async def encode():
+        async for event in events:
+            yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(
+        encode(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/api/year-recap/chat")
 async def year_recap_chat(request: YearRecapChatRequest):
     """
@@ -363,7 +420,7 @@ async def year_recap_chat(request: YearRecapChatRequest):
     """
     try:
         logger.info(f"Year recap chat request: {request.message[:50]}...")
-        response = year_recap_chat_agent.chat(
+        response = await year_recap_chat_agent.chat(
             message=request.message,
             year_recap_data=request.year_recap_data,
             puuid=request.puuid,
@@ -377,6 +434,24 @@ async def year_recap_chat(request: YearRecapChatRequest):
         raise HTTPException(status_code=500, detail=f"Error processing year recap chat: {str(e)}")
 
 
+@app.post("/api/year-recap/chat/stream")
+async def year_recap_chat_stream(request: YearRecapChatRequest):
+    """
+    Streaming Year Recap chat (Server-Sent Events)
+
+    Events: `text` deltas as the model writes, `tool_use` / `ui_action` as each tool
+    call completes, then `done` with the same body /api/year-recap/chat returns
+    (`error` instead if the chat fails).
+    """
+    logger.info(f"Year recap chat stream request: {request.message[:50]}...")
+    return event_stream(year_recap_chat_agent.chat_stream(
+        message=request.message,
+        year_recap_data=request.year_recap_data,
+        puuid=request.puuid,
+        conversation_history=request.conversation_history
+    ))
+
+
 # ============= AI COACHING AGENT ENDPOINTS =============
 
 @app.post("/api/agent/chat")
@@ -407,6 +482,25 @@ async def agent_chat(request: CoachingChatRequest):
         raise HTTPException(status_code=500, detail=f"Error in coaching agent: {str(e)}")
 
 
+@app.post("/api/agent/chat/stream")
+async def agent_chat_stream(request: CoachingChatRequest):
+    """
+    Streaming coaching agent chat (Server-Sent Events)
+
+    Events: `text` deltas, `tool_use` as each tool starts running, then `done`
+    with the same body /api/agent/chat returns.
+    """
+    if not coaching_agent:
+        raise HTTPException(status_code=503, detail="AI service unavailable - Coaching agent not initialized")
+    logger.info(f"Agent chat stream request: {request.message}")
+    return event_stream(coaching_agent.chat_stream(
+        user_message=request.message,
+        puuid=request.puuid,
+        main_role=request.main_role,
+        conversation_history=request.conversation_history
+    ))
+
+
 @app.post("/api/agent/quick-analysis")
 async def agent_quick_analysis(request: QuickCoachingRequest):
     """
@@ -484,10 +578,26 @@ async def chat_match_analysis(request: MatchChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/chat/match-analysis/stream")
+async def chat_match_analysis_stream(request: MatchChatRequest):
+    """
+    Streaming match analysis chat (Server-Sent Events)
+
+    Events: `text` deltas, `action` as each tool call resolves to a timeline action,
+    then `done` with the same body /api/chat/match-analysis returns.
+    """
+    logger.info(f"Match chat stream request: {request.message}")
+    return event_stream(match_chat_agent.chat_stream(
+        message=request.message,
+        context=request.context,
+        conversation_history=request.conversation_history
+    ))
+
+
 # ============= S3 UPLOAD ENDPOINTS =============
 
 @app.post("/api/share/upload-image")
-async def upload_recap_image(request: UploadImageRequest):
+def upload_recap_image(request: UploadImageRequest):
     """
     Upload a year recap image to S3 and return the public URL
 
@@ -524,7 +634,7 @@ async def upload_recap_image(request: UploadImageRequest):
 
 
 @app.post("/api/share/upload-video")
-async def upload_recap_video(request: UploadVideoRequest):
+def upload_recap_video(request: UploadVideoRequest):
     """
     Upload a year recap video to S3 and return the public URL
 
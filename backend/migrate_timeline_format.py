@@ -0,0 +1,95 @@
+"""
+Migrate timelines between raw and packed storage
+Rewrites existing `timelines` documents to the column-packed zstd format (or back), verifying every
+packed document decodes to exactly the original Riot JSON before it is written
+
+    python migrate_timeline_format.py [--puuid <puuid>] [--dry-run]       # raw -> packed
+    python migrate_timeline_format.py --to raw [--puuid <puuid>]           # packed -> raw
+"""
+import sys
+from typing import Dict, List
+
+import bson
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from services.clients import ClientRegistry
+from services.timeline_codec import PACKED_FORMAT, canonical, pack_document, timeline_data, unpack_document
+from services.timeline_ingest import BATCH_SIZE, MAX_DOCUMENT_BYTES
+
+load_dotenv()
+
+
+def convert(doc: Dict, target: str) -> Dict:
+    """The $set/$unset update for one document, or {} when it should be left alone"""
+    if target == 'packed':
+        original = canonical(doc.get('data') or {})
+        if not pack_document(doc):
+            return {}
+        if canonical(timeline_data(doc)) != original:
+            raise ValueError('packed timeline does not decode to the original')
+        return {'$set': {'data': doc['data'], 'packed': doc['packed'], 'format': PACKED_FORMAT}}
+
+    unpack_document(doc)
+    if len(bson.encode(doc)) > MAX_DOCUMENT_BYTES:
+        raise ValueError('raw timeline would exceed the document size limit')
+    return {'$set': {'data': doc['data']}, '$unset': {'packed': '', 'format': ''}}
+
+
+def migrate(db, target: str, puuid: str = None, dry_run: bool = False) -> Dict[str, int]:
+    query = {'format': {'$ne': PACKED_FORMAT}} if target == 'packed' else {'format': PACKED_FORMAT}
+    if puuid:
+        query['puuid'] = puuid
+
+    stats = dict.fromkeys(('converted', 'skipped', 'failed', 'bytes_before', 'bytes_after'), 0)
+    updates: List[UpdateOne] = []
+
+    def flush():
+        if updates and not dry_run:
+            db.timelines.bulk_write(updates, ordered=False)
+        updates.clear()
+
+    for doc in db.timelines.find(query, batch_size=BATCH_SIZE):
+        size_before = len(bson.encode(doc))
+        try:
+            update = convert(doc, target)
+        except Exception as e:
+            print(f"[FAIL] {doc.get('matchId')}: {e}")
+            stats['failed'] += 1
+            continue
+        if not update:
+            print(f"[SKIP] {doc.get('matchId')}: does not fit the packed layout, left raw")
+            stats['skipped'] += 1
+            continue
+
+        stats['converted'] += 1
+        stats['bytes_before'] += size_before
+        stats['bytes_after'] += len(bson.encode(doc))
+        updates.append(UpdateOne({'_id': doc['_id']}, update))
+        if len(updates) >= BATCH_SIZE:
+            flush()
+            print(f"  {stats['converted']} converted...")
+    flush()
+    return stats
+
+
+def main(args: List[str]) -> int:
+    target = args[args.index('--to') + 1] if '--to' in args else 'packed'
+    puuid = args[args.index('--puuid') + 1] if '--puuid' in args else None
+    dry_run = '--dry-run' in args
+    if target not in ('packed', 'raw'):
+        print(__doc__)
+        return 2
+
+    db = ClientRegistry().mongo_db()
+    stats = migrate(db, target, puuid, dry_run)
+
+    ratio = stats['bytes_before'] / stats['bytes_after'] if stats['bytes_after'] else 0
+    print(f"[{'DRY RUN' if dry_run else 'OK'}] {stats['converted']} timelines -> {target}: "
+          f"{stats['bytes_before'] / 1024 / 1024:.1f} MB -> {stats['bytes_after'] / 1024 / 1024:.1f} MB ({ratio:.1f}x); "
+          f"{stats['skipped']} skipped, {stats['failed']} failed")
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,92 @@
+"""
+Rebuild and verify year recap aggregates
+Recomputes a player's aggregate#year_recap item from every stored match summary and checks
+it against the full-scan narrative path
+
+    python rebuild_year_recap_aggregates.py <puuid> [<puuid> ...]           # rebuild, then verify
+    python rebuild_year_recap_aggregates.py --verify-only <puuid> [...]     # compare the stored item, no writes
+"""
+import sys
+from typing import Dict, List
+
+from services.match_repository import MatchRepository
+from services.narrative_generator import NarrativeGenerator
+from services.year_recap_aggregate import YearRecapAggregates, build_aggregate, to_matches_data
+
+
+def diff(expected, actual, path: str = '') -> List[str]:
+    """Human-readable differences between two JSON-like values"""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        problems = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in actual:
+                problems.append(f"{path}.{key}: missing")
+            elif key not in expected:
+                problems.append(f"{path}.{key}: unexpected")
+            else:
+                problems.extend(diff(expected[key], actual[key], f"{path}.{key}"))
+        return problems
+    if isinstance(expected, float) or isinstance(actual, float):
+        return [] if abs(float(expected) - float(actual)) < 1e-9 else [f"{path}: {expected!r} != {actual!r}"]
+    return [] if expected == actual else [f"{path}: {expected!r} != {actual!r}"]
+
+
+def narrative_view(generator: NarrativeGenerator, matches_data: Dict) -> Dict:
+    """What the recap shows: headline stats and milestones"""
+    return {
+        'stats': generator._calculate_narrative_stats(matches_data),
+        'milestones': generator._detect_milestones(matches_data)
+    }
+
+
+def verify(puuid: str, aggregates: YearRecapAggregates, generator: NarrativeGenerator) -> bool:
+    summaries = [item['data'] for item in aggregates.match_repository.get_summaries(puuid)]
+    stored = aggregates.get(puuid)
+    if stored is None:
+        print(f"[FAIL] {puuid}: no aggregate stored")
+        return False
+
+    # 1. Stored document == fold over every summary
+    problems = diff(build_aggregate(puuid, summaries), stored)
+
+    # 2. Recap built from the aggregate == recap built by the full match scan
+    full_scan = generator._fetch_all_matches(puuid)
+    if full_scan['total_matches']:
+        problems.extend(
+            f"narrative{problem}" for problem in
+            diff(narrative_view(generator, full_scan), narrative_view(generator, to_matches_data(stored)))
+        )
+
+    if problems:
+        print(f"[FAIL] {puuid}: {len(problems)} differences")
+        for problem in problems[:20]:
+            print(f"    {problem}")
+        return False
+
+    print(f"[OK] {puuid}: {stored['total_matches']} matches, aggregate matches full recompute")
+    return True
+
+
+def main(args: List[str]) -> int:
+    verify_only = '--verify-only' in args
+    puuids = [arg for arg in args if not arg.startswith('--')]
+    if not puuids:
+        print(__doc__)
+        return 2
+
+    # No TTL caching: always compare against what is stored right now
+    repository = MatchRepository(ttl_seconds=0)
+    aggregates = YearRecapAggregates(match_repository=repository)
+    generator = NarrativeGenerator(match_repository=repository, aggregates=aggregates)
+
+    ok = True
+    for puuid in puuids:
+        if not verify_only:
+            aggregate = aggregates.rebuild(puuid)
+            print(f"[OK] {puuid}: rebuilt from {aggregate['total_matches']} matches")
+        ok = verify(puuid, aggregates, generator) and ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
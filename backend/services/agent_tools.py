@@ -1,16 +1,18 @@
 """
 Agent Tools - Functions that the Bedrock Agent can call
 """
-from typing import Dict, List
+from typing import Dict, List, Optional
 import statistics
 from collections import Counter
+from services.match_snapshot import MatchSnapshotStore, get_match_snapshots
 
 
 class AgentTools:
     """Tools that the coaching agent can use to analyze player data"""
 
-    def __init__(self, riot_client):
+    def __init__(self, riot_client, snapshots: Optional[MatchSnapshotStore] = None):
         self.riot_client = riot_client
+        self.snapshots = snapshots or get_match_snapshots()
 
     async def analyze_recent_performance(
         self,
@@ -27,8 +29,7 @@ class AgentTools:
         - Role performance
         - Time-based patterns
         """
-        match_ids = await self.riot_client.get_match_history(puuid, region=region, count=games)
-        matches = await self.riot_client.get_multiple_matches(match_ids, region)
+        matches = await self._fetch_recent_matches(puuid, games, region)
 
         if not matches:
             return {"error": "No matches found"}
@@ -98,8 +99,7 @@ class AgentTools:
         - Damage consistency
         - Objective participation
         """
-        match_ids = await self.riot_client.get_match_history(puuid, region=region, count=games)
-        matches = await self.riot_client.get_multiple_matches(match_ids, region)
+        matches = await self._fetch_recent_matches(puuid, games, region)
 
         if not matches:
             return {"error": "No matches found"}
@@ -208,8 +208,7 @@ class AgentTools:
         }
 
         # Get current champion pool
-        match_ids = await self.riot_client.get_match_history(puuid, region=region, count=games)
-        matches = await self.riot_client.get_multiple_matches(match_ids, region)
+        matches = await self._fetch_recent_matches(puuid, games, region)
 
         current_champions = Counter()
         for match in matches:
@@ -274,8 +273,7 @@ class AgentTools:
         }
 
         # Get player stats
-        match_ids = await self.riot_client.get_match_history(puuid, region=region, count=games)
-        matches = await self.riot_client.get_multiple_matches(match_ids, region)
+        matches = await self._fetch_recent_matches(puuid, games, region)
 
         player_stats = self._calculate_aggregate_stats(puuid, matches)
         target_stats = benchmarks.get(target_rank.lower(), benchmarks["platinum"])
@@ -358,6 +356,15 @@ class AgentTools:
         }
 
     # Helper methods
+    async def _fetch_recent_matches(self, puuid: str, games: int, region: str) -> List[Dict]:
+        """The player's last N matches, sliced from the shared match snapshot (fetched once per conversation)"""
+        async def load(window: int) -> List[Dict]:
+            match_ids = await self.riot_client.get_match_history(puuid, region=region, count=window)
+            return await self.riot_client.get_multiple_matches(match_ids, region)
+
+        snapshot = await self.snapshots.get_recent(puuid, games, load)
+        return snapshot.matches
+
     def _find_participant(self, puuid: str, match: Dict) -> Dict:
         """Find participant in match"""
         if "info" not in match or "participants" not in match["info"]:
@@ -1,16 +1,21 @@
-import boto3
 import json
 from typing import Dict, List, Optional
 
+from services.blocking import run_blocking
+from services.clients import ClientRegistry, get_clients
+
+
+def invoke_model_json(bedrock, model_id: str, body: str) -> Dict:
+    """Blocking invoke_model + body read; await it through run_blocking() from async code"""
+    response = bedrock.invoke_model(modelId=model_id, body=body)
+    return json.loads(response['body'].read())
+
 
 class BedrockAIService:
     """Service for interacting with Amazon Bedrock AI models"""
 
-    def __init__(self, region_name: str = "us-east-1"):
-        self.bedrock = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=region_name
-        )
+    def __init__(self, region_name: str = "us-east-1", clients: Optional[ClientRegistry] = None):
+        self.bedrock = (clients or get_clients()).bedrock_runtime(region_name)
         # Using Claude 3 Sonnet as default model
         self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
 
@@ -35,12 +40,7 @@ class BedrockAIService:
         })
 
         try:
-            response = self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=body
-            )
-
-            response_body = json.loads(response['body'].read())
+            response_body = await run_blocking(invoke_model_json, self.bedrock, self.model_id, body)
             return response_body['content'][0]['text']
 
         except Exception as e:
@@ -0,0 +1,109 @@
+"""
+Bedrock Response Streaming
+Reads invoke_model_with_response_stream events and reassembles them into text deltas and completed tool calls
+"""
+import json
+import logging
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from services.blocking import iterate_blocking
+
+logger = logging.getLogger(__name__)
+
+
+def iter_stream_events(bedrock, model_id: str, body: str) -> Iterator[Dict]:
+    """Blocking: decoded Anthropic stream events (message_start, content_block_delta, ...) as they arrive"""
+    response = bedrock.invoke_model_with_response_stream(modelId=model_id, body=body)
+    stream = response['body']
+    try:
+        for event in stream:
+            chunk = event.get('chunk')
+            if chunk:
+                yield json.loads(chunk['bytes'])
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
+
+
+class MessageAssembler:
+    """
+    Rebuilds the message invoke_model would have returned from stream events.
+
+    feed() returns an event for the caller when there is something to act on:
+        {'type': 'text', 'text': delta}                  as each text delta arrives
+        {'type': 'tool_use', 'id', 'name', 'input'}      once a tool call's input JSON is complete
+    """
+
+    def __init__(self):
+        self.blocks: Dict[int, Dict] = {}
+        self.partial_json: Dict[int, list] = {}
+        self.stop_reason: Optional[str] = None
+        self.usage: Dict = {}
+
+    def feed(self, event: Dict) -> Optional[Dict]:
+        event_type = event.get('type')
+
+        if event_type == 'message_start':
+            self.usage.update(event.get('message', {}).get('usage', {}))
+
+        elif event_type == 'content_block_start':
+            block = dict(event['content_block'])
+            if block.get('type') == 'tool_use':
+                block['input'] = {}
+                self.partial_json[event['index']] = []
+            self.blocks[event['index']] = block
+
+        elif event_type == 'content_block_delta':
+            block = self.blocks[event['index']]
+            delta = event['delta']
+            if delta.get('type') == 'text_delta':
+                block['text'] = block.get('text', '') + delta['text']
+                return {'type': 'text', 'text': delta['text']}
+            if delta.get('type') == 'input_json_delta':
+                self.partial_json[event['index']].append(delta.get('partial_json', ''))
+
+        elif event_type == 'content_block_stop':
+            block = self.blocks[event['index']]
+            if block.get('type') == 'tool_use':
+                raw_input = ''.join(self.partial_json.pop(event['index'], []))
+                block['input'] = json.loads(raw_input) if raw_input else {}
+                return {'type': 'tool_use', 'id': block['id'], 'name': block['name'], 'input': block['input']}
+
+        elif event_type == 'message_delta':
+            self.stop_reason = event.get('delta', {}).get('stop_reason') or self.stop_reason
+            self.usage.update(event.get('usage', {}))
+
+        return None
+
+    def message(self) -> Dict:
+        """The assembled response, shaped like an invoke_model body"""
+        return {
+            'role': 'assistant',
+            'content': [self.blocks[index] for index in sorted(self.blocks)],
+            'stop_reason': self.stop_reason,
+            'usage': self.usage
+        }
+
+
+async def stream_message(bedrock, model_id: str, body: str) -> AsyncIterator[Dict]:
+    """
+    Stream one Bedrock completion: text and tool_use events as they complete,
+    then {'type': 'message', 'message': <assembled response>}.
+    Stream reads run on the blocking worker pool, not the event loop.
+    """
+    assembler = MessageAssembler()
+    raw_events = iter_stream_events(bedrock, model_id, body)
+    try:
+        async for raw_event in iterate_blocking(raw_events):
+            event = assembler.feed(raw_event)
+            if event:
+                yield event
+    finally:
+        # Callers may stop early (e.g. after the first tool call): release the HTTP stream
+        try:
+            raw_events.close()
+        except ValueError:
+            # Cancelled while a worker thread is mid-read; the stream is released with the generator
+            pass
+    yield {'type': 'message', 'message': assembler.message()}
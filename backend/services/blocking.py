@@ -0,0 +1,40 @@
+"""
+Blocking I/O Execution
+Runs synchronous boto3 / pymongo / Bedrock calls on a bounded worker pool instead of the event loop
+"""
+import os
+import logging
+from typing import AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+import anyio.to_thread
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Threads shared by sync (def) endpoints and run_blocking(); caps concurrent blocking calls
+BLOCKING_IO_WORKERS = int(os.getenv('BLOCKING_IO_WORKERS', '40'))
+
+
+def configure_worker_pool(workers: Optional[int] = None):
+    """
+    Size the worker pool (call from the app lifespan, inside the event loop).
+
+    FastAPI runs plain `def` endpoints on anyio's default thread limiter, and
+    run_blocking() uses the same one, so this is the single knob for how many
+    blocking calls run at once per process.
+    """
+    workers = workers or BLOCKING_IO_WORKERS
+    anyio.to_thread.current_default_thread_limiter().total_tokens = workers
+    logger.info(f"Blocking I/O worker pool: {workers} threads")
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """Await a blocking call from async code (context variables such as the request scope carry over)"""
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+def iterate_blocking(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Consume a blocking iterator (e.g. a Bedrock event stream) from async code, one item per worker hop"""
+    return iterate_in_threadpool(iterator)
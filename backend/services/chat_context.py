@@ -0,0 +1,187 @@
+"""
+Chat Context Budgeting
+Prompt-cache breakpoints, history compaction and per-request token accounting for the Bedrock chat agents
+"""
+import json
+import os
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = {'type': 'ephemeral'}
+
+# Bedrock Claude models that accept cache_control breakpoints (Claude 3 Sonnet does not)
+PROMPT_CACHE_MODELS = (
+    'anthropic.claude-3-5-haiku',
+    'anthropic.claude-3-5-sonnet-20241022-v2',
+    'anthropic.claude-3-7-sonnet',
+    'anthropic.claude-sonnet-4',
+    'anthropic.claude-opus-4',
+    'anthropic.claude-haiku-4'
+)
+
+# Estimated history tokens above which older turns are compacted
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '6000'))
+# Most recent messages that are always sent untouched
+CHAT_KEEP_RECENT_MESSAGES = int(os.getenv('CHAT_KEEP_RECENT_MESSAGES', '6'))
+
+
+def prompt_cache_enabled(model_id: str) -> bool:
+    """BEDROCK_PROMPT_CACHE=auto (default) enables breakpoints only for models that support them"""
+    setting = os.getenv('BEDROCK_PROMPT_CACHE', 'auto').lower()
+    if setting in ('1', 'true', 'yes'):
+        return True
+    if setting in ('0', 'false', 'no'):
+        return False
+    return any(model in model_id for model in PROMPT_CACHE_MODELS)
+
+
+def cached_system(system_prompt: str, enabled: bool) -> Union[str, List[Dict]]:
+    """System prompt as a cacheable block (tools + system form the cached prefix)"""
+    if not enabled:
+        return system_prompt
+    return [{'type': 'text', 'text': system_prompt, 'cache_control': CACHE_CONTROL}]
+
+
+def cached_tools(tools: List[Dict], enabled: bool) -> List[Dict]:
+    """Tool schemas with a breakpoint on the last one"""
+    if not enabled or not tools:
+        return tools
+    return tools[:-1] + [{**tools[-1], 'cache_control': CACHE_CONTROL}]
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (~4 characters per token) for budgeting; Bedrock's usage block has the real numbers"""
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return len(text) // 4
+
+
+def _compact_tool_results(message: Dict) -> Dict:
+    """Replace tool_result payloads with a one-line placeholder (tool_use ids stay paired)"""
+    content = message.get('content')
+    if not isinstance(content, list):
+        return message
+
+    compacted = []
+    for block in content:
+        if block.get('type') == 'tool_result' and estimate_tokens(block.get('content', '')) > 20:
+            block = {**block, 'content': f"[Earlier tool result omitted (~{estimate_tokens(block['content'])} tokens)]"}
+        compacted.append(block)
+    return {**message, 'content': compacted}
+
+
+def _trim_front(messages: List[Dict]) -> List[Dict]:
+    """Drop leading messages until the list starts with a user turn; tool_results orphaned by the cut are removed"""
+    messages = list(messages)
+    while messages:
+        first = messages[0]
+        if first.get('role') != 'user':
+            messages.pop(0)
+            continue
+        content = first.get('content')
+        if isinstance(content, list) and any(block.get('type') == 'tool_result' for block in content):
+            rest = [block for block in content if block.get('type') != 'tool_result']
+            if not rest:
+                messages.pop(0)
+                continue
+            messages[0] = {**first, 'content': rest}
+        break
+    return messages
+
+
+def compact_history(
+    messages: List[Dict],
+    budget_tokens: Optional[int] = None,
+    keep_recent: Optional[int] = None
+) -> Tuple[List[Dict], int]:
+    """
+    Keep the messages sent to Bedrock under `budget_tokens` (estimated).
+
+    Older turns (everything before the last `keep_recent` messages) first lose
+    their tool_result payloads; if that isn't enough, whole turns are dropped
+    from the front until the budget holds, restarting at a user message.
+    Returns (messages, estimated tokens removed).
+    """
+    budget_tokens = budget_tokens or CHAT_HISTORY_TOKEN_BUDGET
+    keep_recent = keep_recent if keep_recent is not None else CHAT_KEEP_RECENT_MESSAGES
+
+    before = estimate_tokens(messages)
+    if before <= budget_tokens or len(messages) <= keep_recent:
+        return messages, 0
+
+    split = len(messages) - keep_recent
+    compacted = [_compact_tool_results(message) for message in messages[:split]] + messages[split:]
+
+    dropped = False
+    while len(compacted) > keep_recent and estimate_tokens(compacted) > budget_tokens:
+        compacted = compacted[1:]
+        dropped = True
+    if dropped:
+        compacted = _trim_front(compacted)
+
+    return compacted, max(before - estimate_tokens(compacted), 0)
+
+
+def add_usage(total: Dict, usage: Optional[Dict]) -> Dict:
+    """Sum Bedrock usage blocks across the calls of one request"""
+    for key, value in (usage or {}).items():
+        if isinstance(value, (int, float)):
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+class ChatTokenMetrics:
+    """Process-wide input token accounting for the chat agents"""
+
+    FIELDS = ('requests', 'input_tokens', 'cache_read_input_tokens', 'cache_write_input_tokens',
+              'compacted_tokens', 'input_tokens_saved')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, agent: str, usage: Optional[Dict], compacted_tokens: int) -> Dict:
+        """
+        Per-request report. input_tokens_saved counts tokens Bedrock didn't have to
+        process at full price: prompt-cache reads plus tokens compaction kept out of
+        the request entirely.
+        """
+        usage = usage or {}
+        cache_read = int(usage.get('cache_read_input_tokens', 0) or 0)
+        report = {
+            'input_tokens': int(usage.get('input_tokens', 0) or 0),
+            'cache_read_input_tokens': cache_read,
+            'cache_write_input_tokens': int(usage.get('cache_creation_input_tokens', 0) or 0),
+            'compacted_tokens': compacted_tokens,
+            'input_tokens_saved': cache_read + compacted_tokens
+        }
+
+        with self._lock:
+            totals = self._totals.setdefault(agent, dict.fromkeys(self.FIELDS, 0))
+            totals['requests'] += 1
+            for key, value in report.items():
+                totals[key] += value
+
+        logger.info(
+            f"{agent}: {report['input_tokens']} input tokens, {cache_read} from cache, "
+            f"{compacted_tokens} compacted ({report['input_tokens_saved']} saved)"
+        )
+        return report
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {agent: dict(totals) for agent, totals in self._totals.items()}
+
+
+# Shared instance
+_chat_metrics = None
+
+
+def get_chat_metrics() -> ChatTokenMetrics:
+    """Get or create the ChatTokenMetrics singleton"""
+    global _chat_metrics
+    if _chat_metrics is None:
+        _chat_metrics = ChatTokenMetrics()
+    return _chat_metrics
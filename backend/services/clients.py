@@ -0,0 +1,137 @@
+"""
+Client Registry
+App-scoped MongoDB and AWS clients (created once, pooled, shared by every service)
+"""
+import os
+import threading
+import logging
+from typing import Dict, Optional
+
+import boto3
+from botocore.config import Config
+from pymongo import MongoClient
+
+from services.fake_bedrock import FakeBedrockRuntime
+
+logger = logging.getLogger(__name__)
+
+PLAYER_DATA_TABLE = 'lol-player-data'
+TIMELINES_DB = 'lol_timelines'
+
+
+class ClientRegistry:
+    """
+    Holds one pooled MongoClient and one boto3 session for the whole app.
+
+    boto3 low-level clients (bedrock-runtime, s3) are thread-safe and shared.
+    DynamoDB resources are not, so dynamodb_table() hands each thread its own
+    Table built from the shared session (cheap after the first: botocore models
+    are loaded once per session).
+
+    Pool sizes and timeouts come from the environment (see .env.example).
+    """
+
+    def __init__(self, mongo_uri: Optional[str] = None, aws_region: Optional[str] = None):
+        self.mongo_uri = mongo_uri or os.getenv('MONGODB_CONNECTION_STRING')
+        self.aws_region = aws_region or os.getenv('AWS_REGION', 'us-east-1')
+
+        self.mongo_options = {
+            'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', '50')),
+            'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+            'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '10000')),
+            'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+            'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '30000'))
+        }
+        self.aws_config = Config(
+            max_pool_connections=int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '50')),
+            connect_timeout=float(os.getenv('AWS_CONNECT_TIMEOUT', '5')),
+            read_timeout=float(os.getenv('AWS_READ_TIMEOUT', '60')),
+            retries={'max_attempts': int(os.getenv('AWS_MAX_ATTEMPTS', '3')), 'mode': 'standard'}
+        )
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._session: Optional[boto3.session.Session] = None
+        self._mongo_client: Optional[MongoClient] = None
+        self._clients: Dict[tuple, object] = {}
+
+    @property
+    def session(self) -> boto3.session.Session:
+        with self._lock:
+            if self._session is None:
+                self._session = boto3.session.Session(region_name=self.aws_region)
+            return self._session
+
+    @property
+    def mongo_client(self) -> MongoClient:
+        """Shared MongoClient (thread-safe, connects lazily, pooled)"""
+        with self._lock:
+            if self._mongo_client is None:
+                self._mongo_client = MongoClient(self.mongo_uri, **self.mongo_options)
+            return self._mongo_client
+
+    def mongo_db(self, name: str = TIMELINES_DB):
+        return self.mongo_client[name]
+
+    def client(self, service_name: str, region_name: Optional[str] = None):
+        """Shared low-level boto3 client per (service, region)"""
+        key = (service_name, region_name or self.aws_region)
+        session = self.session
+        with self._lock:
+            if key not in self._clients:
+                self._clients[key] = session.client(service_name, region_name=key[1], config=self.aws_config)
+            return self._clients[key]
+
+    def bedrock_runtime(self, region_name: str = 'us-east-1'):
+        if os.getenv('BEDROCK_FAKE', '').lower() in ('1', 'true', 'yes'):
+            # Offline development: scripted local responses instead of the AWS API
+            with self._lock:
+                return self._clients.setdefault(('bedrock-runtime-fake', region_name), FakeBedrockRuntime())
+        return self.client('bedrock-runtime', region_name)
+
+    def s3(self, region_name: Optional[str] = None):
+        return self.client('s3', region_name)
+
+    def dynamodb_table(self, name: str = PLAYER_DATA_TABLE):
+        """DynamoDB Table for the calling thread"""
+        tables = getattr(self._local, 'tables', None)
+        if tables is None:
+            tables = self._local.tables = {}
+        if name not in tables:
+            session = self.session
+            with self._lock:
+                resource = session.resource('dynamodb', region_name=self.aws_region, config=self.aws_config)
+            tables[name] = resource.Table(name)
+        return tables[name]
+
+    def connect(self):
+        """Create the shared clients up front (called from the app lifespan)"""
+        if self.mongo_uri:
+            self.mongo_db()
+        self.dynamodb_table()
+        self.bedrock_runtime()
+        logger.info(
+            f"Clients ready (MongoDB pool {self.mongo_options['maxPoolSize']}, "
+            f"AWS pool {self.aws_config.max_pool_connections})"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._mongo_client is not None:
+                self._mongo_client.close()
+                self._mongo_client = None
+            for client in self._clients.values():
+                client.close()
+            self._clients.clear()
+
+
+# Shared instance (one set of pools per process)
+_clients = None
+
+
+def get_clients() -> ClientRegistry:
+    """Get or create the ClientRegistry singleton (also usable as a FastAPI dependency)"""
+    global _clients
+    if _clients is None:
+        _clients = ClientRegistry()
+    return _clients
@@ -1,11 +1,17 @@
 """
 Bedrock Coaching Agent - Multi-step reasoning agent for personalized coaching
 """
-import boto3
 import json
-from typing import Dict, List, Optional
+import logging
+from typing import AsyncIterator, Dict, List, Optional
 from services.agent_tools import AgentTools
+from services.bedrock_ai import invoke_model_json
+from services.bedrock_stream import stream_message
+from services.blocking import run_blocking
+from services.clients import ClientRegistry, get_clients
+from services.tool_execution import ToolCallBatch, execute_tool_calls
 
+logger = logging.getLogger(__name__)
 
 class CoachingAgent:
     """
@@ -18,11 +24,8 @@ class CoachingAgent:
     4. Synthesize insights into actionable coaching
     """
 
-    def __init__(self, riot_client, region_name: str = "us-east-1"):
-        self.bedrock = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=region_name
-        )
+    def __init__(self, riot_client, region_name: str = "us-east-1", clients: Optional[ClientRegistry] = None):
+        self.bedrock = (clients or get_clients()).bedrock_runtime(region_name)
         self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
         self.tools = AgentTools(riot_client)
 
@@ -147,33 +150,7 @@ class CoachingAgent:
         if conversation_history is None:
             conversation_history = []
 
-        # System prompt for the coaching agent
-        system_prompt = f"""You are an expert League of Legends coach powered by AI. Your role is to help players improve by:
-
-1. Analyzing their match data using the available tools
-2. Identifying specific patterns and weaknesses
-3. Providing actionable, personalized coaching advice
-4. Creating structured improvement plans
-
-The player you're coaching:
-- PUUID: {puuid}
-- Main Role: {main_role}
-
-When answering questions:
-- Use multiple tools to gather complete information
-- Be specific and data-driven in your analysis
-- Provide actionable advice, not generic tips
-- Break down complex improvements into steps
-- Be encouraging but honest about areas to improve
-
-Available tools let you:
-- Analyze recent performance and trends
-- Detect patterns in gameplay
-- Recommend champion pool changes
-- Compare stats to target ranks
-- Generate structured practice plans
-
-Think step by step and use tools to gather data before giving advice."""
+        system_prompt = self._system_prompt(puuid, main_role)
 
         # Build message history
         messages = conversation_history + [
@@ -199,26 +176,9 @@ Think step by step and use tools to gather data before giving advice."""
                     if content.get("type") == "tool_use"
                 ]
 
-                # Execute tools
-                tool_results = []
-                for tool_call in tool_calls:
-                    tool_name = tool_call["name"]
-                    tool_input = tool_call["input"]
-                    tool_id = tool_call["id"]
-
-                    # Execute the tool
-                    result = await self._execute_tool(tool_name, tool_input)
-                    tools_used.append({
-                        "name": tool_name,
-                        "input": tool_input,
-                        "result": result
-                    })
-
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_id,
-                        "content": json.dumps(result)
-                    })
+                # Execute tools concurrently (results come back in call order)
+                results = await execute_tool_calls(tool_calls, self._execute_tool)
+                tool_results = self._record_tool_results(tool_calls, results, tools_used)
 
                 # Add assistant response and tool results to conversation
                 messages.append({
@@ -250,13 +210,143 @@ Think step by step and use tools to gather data before giving advice."""
             "conversation_history": messages
         }
 
-    async def _call_bedrock(
+    async def chat_stream(
         self,
-        messages: List[Dict],
-        system_prompt: str
-    ) -> Dict:
-        """Call Bedrock with tool definitions"""
-        body = {
+        user_message: str,
+        puuid: str,
+        main_role: str = "MIDDLE",
+        conversation_history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Streaming variant of chat()
+
+        Yields {"type": "text"} deltas as they arrive and {"type": "tool_use"} as each
+        tool call completes (the tool runs right away, while the model may still be
+        writing the next one), then {"type": "done"} with the fields chat() returns
+        ({"type": "error"} with them on failure).
+        """
+        system_prompt = self._system_prompt(puuid, main_role)
+        messages = (conversation_history or []) + [
+            {
+                "role": "user",
+                "content": user_message
+            }
+        ]
+
+        tools_used = []
+        max_iterations = 5  # Prevent infinite loops
+
+        try:
+            for iteration in range(max_iterations):
+                body = json.dumps(self._request_body(messages, system_prompt))
+                response = None
+                tool_calls = []
+                batch = ToolCallBatch(self._execute_tool)
+
+                try:
+                    async for event in stream_message(self.bedrock, self.model_id, body):
+                        if event["type"] == "text":
+                            yield event
+                        elif event["type"] == "tool_use":
+                            # Start the tool now; it runs while the model writes the rest of the turn
+                            yield {"type": "tool_use", "name": event["name"], "input": event["input"]}
+                            tool_calls.append(event)
+                            batch.submit(event)
+                        elif event["type"] == "message":
+                            response = event["message"]
+                except BaseException:
+                    batch.cancel()
+                    raise
+
+                tool_results = self._record_tool_results(tool_calls, await batch.results(), tools_used)
+
+                if response is None:
+                    raise RuntimeError("Bedrock stream ended without a message")
+
+                if response["stop_reason"] == "tool_use" and tool_results:
+                    messages.append({
+                        "role": "assistant",
+                        "content": response["content"]
+                    })
+                    messages.append({
+                        "role": "user",
+                        "content": tool_results
+                    })
+                    continue
+
+                final_text = "".join(c["text"] for c in response["content"] if c.get("type") == "text")
+                yield {
+                    "type": "done",
+                    "response": final_text,
+                    "tools_used": tools_used,
+                    "conversation_history": messages
+                }
+                return
+
+        except Exception as e:
+            logger.error(f"Coaching chat stream error: {e}", exc_info=True)
+            yield {
+                "type": "error",
+                "response": "I encountered an error processing your request. Please try again.",
+                "tools_used": tools_used,
+                "conversation_history": messages
+            }
+            return
+
+        yield {
+            "type": "done",
+            "response": "I've analyzed your data but need more context. Could you rephrase your question?",
+            "tools_used": tools_used,
+            "conversation_history": messages
+        }
+
+    def _system_prompt(self, puuid: str, main_role: str) -> str:
+        """System prompt for the coaching agent"""
+        return f"""You are an expert League of Legends coach powered by AI. Your role is to help players improve by:
+
+1. Analyzing their match data using the available tools
+2. Identifying specific patterns and weaknesses
+3. Providing actionable, personalized coaching advice
+4. Creating structured improvement plans
+
+The player you're coaching:
+- PUUID: {puuid}
+- Main Role: {main_role}
+
+When answering questions:
+- Use multiple tools to gather complete information
+- Be specific and data-driven in your analysis
+- Provide actionable advice, not generic tips
+- Break down complex improvements into steps
+- Be encouraging but honest about areas to improve
+
+Available tools let you:
+- Analyze recent performance and trends
+- Detect patterns in gameplay
+- Recommend champion pool changes
+- Compare stats to target ranks
+- Generate structured practice plans
+
+Think step by step and use tools to gather data before giving advice."""
+
+    def _record_tool_results(self, tool_calls: List[Dict], results: List[Dict], tools_used: List[Dict]) -> List[Dict]:
+        """Add each call to tools_used and build the tool_result blocks for the next user message"""
+        tool_results = []
+        for tool_call, result in zip(tool_calls, results):
+            tools_used.append({
+                "name": tool_call["name"],
+                "input": tool_call["input"],
+                "result": result
+            })
+            tool_results.append({
+                "type": "tool_result",
+                "tool_use_id": tool_call["id"],
+                "content": json.dumps(result)
+            })
+        return tool_results
+
+    def _request_body(self, messages: List[Dict], system_prompt: str) -> Dict:
+        return {
             "anthropic_version": "bedrock-2023-05-31",
             "max_tokens": 4096,
             "temperature": 0.7,
@@ -265,12 +355,16 @@ Think step by step and use tools to gather data before giving advice."""
             "tools": self.tool_definitions
         }
 
-        response = self.bedrock.invoke_model(
-            modelId=self.model_id,
-            body=json.dumps(body)
-        )
+    async def _call_bedrock(
+        self,
+        messages: List[Dict],
+        system_prompt: str
+    ) -> Dict:
+        """Call Bedrock with tool definitions"""
+        body = self._request_body(messages, system_prompt)
 
-        return json.loads(response['body'].read())
+        # Off the event loop: Bedrock calls take seconds
+        return await run_blocking(invoke_model_json, self.bedrock, self.model_id, json.dumps(body))
 
     async def _execute_tool(self, tool_name: str, tool_input: Dict) -> Dict:
         """Execute a tool and return results"""
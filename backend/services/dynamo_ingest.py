@@ -0,0 +1,329 @@
+"""
+DynamoDB Ingest
+Streaming bulk writes: one-pass item preparation, a long-lived batch writer per worker thread, retried unprocessed items and resumable checkpoints
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import logging
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from services.clients import PLAYER_DATA_TABLE, ClientRegistry, get_clients
+
+logger = logging.getLogger(__name__)
+
+# DynamoDB rejects items over 400 KB (409,600 bytes, attribute names included)
+MAX_ITEM_BYTES = 400 * 1024
+BATCH_SIZE = 25  # BatchWriteItem limit
+# In-memory writes are queued this many items at a time (two batches per worker turn)
+ITEMS_PER_SOURCE = 2 * BATCH_SIZE
+
+DEFAULT_WORKERS = int(os.getenv('DYNAMO_INGEST_WORKERS', '4'))
+MAX_WRITE_ATTEMPTS = int(os.getenv('DYNAMO_INGEST_MAX_ATTEMPTS', '8'))
+CHECKPOINT_DIR = os.getenv('DYNAMO_INGEST_CHECKPOINT_DIR', '.cache/ingest')
+
+RETRYABLE_ERRORS = {
+    'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded',
+    'InternalServerError', 'ServiceUnavailable'
+}
+
+
+def _number_size(value) -> int:
+    digits = len(str(value).lstrip('-').replace('.', '').lstrip('0')) or 1
+    return (digits + 1) // 2 + 1
+
+
+def _prepare(value) -> Tuple[object, int]:
+    if isinstance(value, str):
+        return value, len(value) if value.isascii() else len(value.encode('utf-8'))
+    if isinstance(value, bool) or value is None:
+        return value, 1
+    if isinstance(value, float):
+        value = Decimal(str(value))
+        return value, _number_size(value)
+    if isinstance(value, (int, Decimal)):
+        return value, _number_size(value)
+    if isinstance(value, dict):
+        converted = {}
+        size = 3
+        for key, item in value.items():
+            converted[key], item_size = _prepare(item)
+            size += len(key) + 1 + item_size
+        return converted, size
+    if isinstance(value, (list, tuple)):
+        converted = []
+        size = 3
+        for item in value:
+            item, item_size = _prepare(item)
+            converted.append(item)
+            size += 1 + item_size
+        return converted, size
+    if isinstance(value, (bytes, bytearray)):
+        return value, len(value)
+    return value, len(str(value))
+
+
+def prepare_item(item: Dict) -> Tuple[Dict, int]:
+    """
+    Floats -> Decimal and DynamoDB's item size estimate (attribute names plus
+    value sizes) in one walk of the item, instead of a conversion followed by json.dumps
+    """
+    converted = {}
+    size = 0
+    for name, value in item.items():
+        converted[name], value_size = _prepare(value)
+        size += len(name) + value_size
+    return converted, size
+
+
+class IngestSource(NamedTuple):
+    """
+    One unit of work: a file (or in-memory record) that yields items when loaded.
+    `load` runs on a worker thread, only if the source isn't checkpointed.
+    """
+    name: str
+    fingerprint: str
+    load: Callable[[], List[Dict]]
+
+
+def file_source(path, load: Callable[[Path], List[Dict]], root=None) -> IngestSource:
+    """IngestSource for a file, fingerprinted by modification time and size"""
+    path = Path(path)
+    stat = path.stat()
+    name = str(path.relative_to(root)) if root else str(path)
+    return IngestSource(name, f"{stat.st_mtime_ns}:{stat.st_size}", lambda: load(path))
+
+
+class IngestCheckpoint:
+    """
+    Append-only JSON lines file of sources whose items were all written.
+    A re-run skips sources recorded with the same fingerprint without reading them.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._done: Dict[str, str] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted run
+                    self._done[entry['source']] = entry['fingerprint']
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def done(self, source: IngestSource) -> bool:
+        return self._done.get(source.name) == source.fingerprint
+
+    def record(self, source: IngestSource):
+        with self._lock:
+            self._done[source.name] = source.fingerprint
+            self._file.write(json.dumps({'source': source.name, 'fingerprint': source.fingerprint}) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def checkpoint_for(name: str) -> IngestCheckpoint:
+    """Checkpoint file under DYNAMO_INGEST_CHECKPOINT_DIR (e.g. one per player and table)"""
+    return IngestCheckpoint(Path(CHECKPOINT_DIR) / f"{name}.jsonl")
+
+
+class _Progress:
+    """Items of one source still waiting to be written (touched by a single worker)"""
+
+    def __init__(self, source: IngestSource):
+        self.source = source
+        self.pending = 0
+        self.loaded = False
+        self.failed = False
+
+
+class _BatchWriter:
+    """
+    Buffers puts for one worker and sends them 25 at a time. Unprocessed items,
+    throttling and network errors are retried with jittered backoff; items are
+    reported committed only once DynamoDB has accepted them, and failed otherwise.
+    """
+
+    def __init__(self, table, stats: Dict[str, int], stats_lock: threading.Lock,
+                 on_written: Callable[[_Progress], None], key_names: Tuple[str, ...]):
+        self.table = table
+        self.client = table.meta.client
+        self.stats = stats
+        self.stats_lock = stats_lock
+        self.on_written = on_written
+        self.key_names = key_names
+        self._buffer: Dict[tuple, Tuple[Dict, _Progress]] = {}
+
+    def put(self, item: Dict, progress: _Progress):
+        key = tuple(item.get(name) for name in self.key_names)
+        previous = self._buffer.pop(key, None)
+        if previous is not None:
+            # Same key twice in a batch is rejected by DynamoDB; the later item wins
+            self._done(previous[1], 1, failed=False)
+        self._buffer[key] = (item, progress)
+        if len(self._buffer) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        pending = self._buffer
+        self._buffer = {}
+
+        for attempt in range(MAX_WRITE_ATTEMPTS):
+            request = [{'PutRequest': {'Item': item}} for item, _ in pending.values()]
+            try:
+                response = self.client.batch_write_item(RequestItems={self.table.name: request})
+                unprocessed = response.get('UnprocessedItems', {}).get(self.table.name, [])
+            except ClientError as e:
+                if e.response.get('Error', {}).get('Code') not in RETRYABLE_ERRORS:
+                    logger.error(f"Batch write to {self.table.name} failed: {e}")
+                    break
+                unprocessed = request
+            except BotoCoreError as e:
+                # Connection resets, timeouts and the like: retry the whole batch
+                logger.warning(f"Batch write to {self.table.name} interrupted: {e}")
+                unprocessed = request
+            except Exception as e:
+                logger.error(f"Batch write to {self.table.name} failed: {e}")
+                break
+
+            unprocessed_keys = {
+                tuple(entry['PutRequest']['Item'].get(name) for name in self.key_names) for entry in unprocessed
+            }
+            for key in [key for key in pending if key not in unprocessed_keys]:
+                self._done(pending.pop(key)[1], 1, failed=False)
+            if not pending:
+                return
+
+            with self.stats_lock:
+                self.stats['retried'] += len(pending)
+            time.sleep(random.uniform(0, min(0.05 * 2 ** attempt, 5.0)))
+
+        logger.error(f"Giving up on {len(pending)} items for {self.table.name} after {MAX_WRITE_ATTEMPTS} attempts")
+        for _, progress in pending.values():
+            self._done(progress, 1, failed=True)
+
+    def _done(self, progress: _Progress, count: int, failed: bool):
+        with self.stats_lock:
+            self.stats['failed' if failed else 'written'] += count
+        progress.pending -= count
+        progress.failed = progress.failed or failed
+        self.on_written(progress)
+
+
+class DynamoIngest:
+    """
+    Streams sources into a DynamoDB table.
+
+    Sources are loaded (files parsed) lazily on the worker threads; each worker
+    prepares its items (Decimal conversion + size check in one pass) and owns a
+    batch writer for its lifetime. Puts are idempotent (same key, same item),
+    and with a checkpoint a re-run skips every source already written in full.
+    """
+
+    def __init__(self, table_name: str = PLAYER_DATA_TABLE, workers: Optional[int] = None,
+                 checkpoint: Optional[IngestCheckpoint] = None, clients: Optional[ClientRegistry] = None,
+                 key_names: Tuple[str, ...] = ('puuid', 'dataType')):
+        self.table_name = table_name
+        self.workers = workers or DEFAULT_WORKERS
+        self.checkpoint = checkpoint
+        self._clients = clients
+        self.key_names = key_names
+
+    def write_items(self, items: List[Dict], name: str = 'items') -> Dict[str, int]:
+        """Write in-memory items (no checkpoint entry), split into chunks so every worker takes a share"""
+        sources = [
+            IngestSource(f"{name}[{start}:{start + ITEMS_PER_SOURCE}]", '',
+                         lambda chunk=items[start:start + ITEMS_PER_SOURCE]: chunk)
+            for start in range(0, len(items), ITEMS_PER_SOURCE)
+        ]
+        return self.run(sources, use_checkpoint=False)
+
+    def run(self, sources: Iterable[IngestSource], use_checkpoint: bool = True) -> Dict[str, int]:
+        """Write every source's items; returns counts (written, skipped, oversized, failed, retried)"""
+        clients = self._clients or get_clients()
+        checkpoint = self.checkpoint if use_checkpoint else None
+        stats = dict.fromkeys(('sources', 'skipped_sources', 'written', 'oversized', 'failed', 'retried'), 0)
+        stats_lock = threading.Lock()
+        work: 'queue.Queue[Optional[IngestSource]]' = queue.Queue(maxsize=self.workers * 4)
+        started = time.perf_counter()
+
+        def finished(progress: _Progress):
+            if progress.loaded and progress.pending == 0 and not progress.failed and checkpoint is not None:
+                checkpoint.record(progress.source)
+
+        def worker():
+            writer = None
+            while True:
+                source = work.get()
+                if source is None:
+                    break
+                progress = _Progress(source)
+                # Any failure only fails this source: the worker keeps draining the queue so run() never blocks
+                try:
+                    if writer is None:
+                        writer = _BatchWriter(
+                            clients.dynamodb_table(self.table_name), stats, stats_lock, finished, self.key_names
+                        )
+                    for raw in source.load():
+                        item, size = prepare_item(raw)
+                        if size > MAX_ITEM_BYTES:
+                            logger.warning(
+                                f"Skipping large item {item.get('dataType', 'unknown')} from {source.name} ({size:,} bytes)"
+                            )
+                            with stats_lock:
+                                stats['oversized'] += 1
+                            continue
+                        progress.pending += 1
+                        writer.put(item, progress)
+                except Exception as e:
+                    logger.error(f"Could not ingest {source.name}: {e}")
+                    progress.failed = True
+                    with stats_lock:
+                        stats['failed'] += 1
+                    continue
+                progress.loaded = True
+                finished(progress)
+            if writer is not None:
+                try:
+                    writer.flush()
+                except Exception as e:
+                    logger.error(f"Final batch write to {self.table_name} failed: {e}")
+
+        threads = [threading.Thread(target=worker, name=f"dynamo-ingest-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for source in sources:
+                if checkpoint is not None and checkpoint.done(source):
+                    stats['skipped_sources'] += 1
+                    continue
+                stats['sources'] += 1
+                work.put(source)
+        finally:
+            for _ in threads:
+                work.put(None)
+            for thread in threads:
+                thread.join()
+
+        logger.info(
+            f"Ingested {stats['written']} items into {self.table_name} from {stats['sources']} sources "
+            f"in {time.perf_counter() - started:.1f} s ({stats['skipped_sources']} sources already done, "
+            f"{stats['oversized']} oversized, {stats['failed']} failed, {stats['retried']} retries)"
+        )
+        return stats
@@ -0,0 +1,109 @@
+"""
+Fake Bedrock Runtime
+Offline stand-in for the bedrock-runtime client: replays scripted Claude messages through invoke_model
+and invoke_model_with_response_stream (enable app-wide with BEDROCK_FAKE=true)
+"""
+import io
+import json
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional
+
+
+def text_message(text: str) -> Dict:
+    return {'content': [{'type': 'text', 'text': text}], 'stop_reason': 'end_turn'}
+
+
+def tool_use_message(name: str, tool_input: Dict, text: Optional[str] = None) -> Dict:
+    content = [{'type': 'text', 'text': text}] if text else []
+    content.append({'type': 'tool_use', 'id': f'toolu_{uuid.uuid4().hex[:20]}', 'name': name, 'input': tool_input})
+    return {'content': content, 'stop_reason': 'tool_use'}
+
+
+def stream_events(message: Dict, chunk_size: int = 8) -> Iterator[Dict]:
+    """The Anthropic streaming event sequence for a complete message (text and tool input split into chunks)"""
+    yield {'type': 'message_start', 'message': {
+        'role': 'assistant', 'content': [], 'usage': message.get('usage', {'input_tokens': 0, 'output_tokens': 0})
+    }}
+    for index, block in enumerate(message['content']):
+        if block['type'] == 'text':
+            yield {'type': 'content_block_start', 'index': index, 'content_block': {'type': 'text', 'text': ''}}
+            text = block['text']
+            for start in range(0, len(text), chunk_size):
+                yield {'type': 'content_block_delta', 'index': index,
+                       'delta': {'type': 'text_delta', 'text': text[start:start + chunk_size]}}
+        elif block['type'] == 'tool_use':
+            yield {'type': 'content_block_start', 'index': index, 'content_block': {
+                'type': 'tool_use', 'id': block['id'], 'name': block['name'], 'input': {}
+            }}
+            raw_input = json.dumps(block['input'])
+            for start in range(0, len(raw_input), chunk_size):
+                yield {'type': 'content_block_delta', 'index': index,
+                       'delta': {'type': 'input_json_delta', 'partial_json': raw_input[start:start + chunk_size]}}
+        yield {'type': 'content_block_stop', 'index': index}
+    yield {'type': 'message_delta', 'delta': {'stop_reason': message.get('stop_reason', 'end_turn')},
+           'usage': {'output_tokens': 0}}
+    yield {'type': 'message_stop'}
+
+
+class FakeBedrockRuntime:
+    """
+    Serves `responses` (Messages API dicts, see text_message/tool_use_message) in order;
+    once they run out, replies with a short offline text. Every request body is kept
+    in `requests` for inspection.
+
+    Usage is estimated (~4 characters per token). When the request carries
+    cache_control breakpoints, the tools + system prefix is reported as a cache
+    write the first time and a cache read afterwards, like Bedrock does.
+    """
+
+    def __init__(self, responses: Optional[List[Dict]] = None, chunk_size: int = 8, chunk_delay: float = 0.0):
+        self.responses = list(responses or [])
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.requests: List[Dict] = []
+        self._cached_prefixes = set()
+
+    def _next_message(self, body: str) -> Dict:
+        request = json.loads(body)
+        self.requests.append(request)
+        if self.responses:
+            message = self.responses.pop(0)
+        else:
+            last = request.get('messages', [{}])[-1].get('content', '')
+            if isinstance(last, list):
+                last = ' '.join(block.get('text', '') for block in last if block.get('type') == 'text')
+            message = text_message(f"(offline Bedrock) You asked: {last}")
+        return {**message, 'usage': self._usage(request, message)}
+
+    def _usage(self, request: Dict, message: Dict) -> Dict:
+        prefix = json.dumps([request.get('tools', []), request.get('system', '')])
+        usage = {
+            'input_tokens': len(json.dumps(request.get('messages', []))) // 4,
+            'output_tokens': len(json.dumps(message.get('content', []))) // 4
+        }
+        if 'cache_control' not in prefix:
+            usage['input_tokens'] += len(prefix) // 4
+        elif prefix in self._cached_prefixes:
+            usage['cache_read_input_tokens'] = len(prefix) // 4
+        else:
+            self._cached_prefixes.add(prefix)
+            usage['cache_creation_input_tokens'] = len(prefix) // 4
+        return usage
+
+    def _chunks(self, message: Dict) -> Iterator[Dict]:
+        for event in stream_events(message, self.chunk_size):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield {'chunk': {'bytes': json.dumps(event).encode()}}
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict:
+        message = self._next_message(body)
+        payload = {'type': 'message', 'role': 'assistant', 'model': modelId, **message}
+        return {'body': io.BytesIO(json.dumps(payload).encode())}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict:
+        return {'body': self._chunks(self._next_message(body))}
+
+    def close(self):
+        pass
@@ -0,0 +1,60 @@
+"""
+Concurrent fetch engine
+Bounded fan-out for bulk Riot API downloads (retries happen once, in RiotAPIClient._get)
+"""
+import asyncio
+import os
+import random
+import logging
+from typing import Awaitable, Callable, List, Optional, Sequence, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_CONCURRENCY = int(os.getenv('RIOT_FETCH_CONCURRENCY', '10'))
+
+
+def is_retryable(error: Exception) -> bool:
+    """Retry server errors and network failures; not 4xx like 404 (429s follow Retry-After instead)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError))
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 8.0) -> float:
+    """Full jitter keeps retrying workers from stampeding together"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+async def fetch_all(
+    items: Sequence[T],
+    fetch: Callable[[T], Awaitable[R]],
+    concurrency: Optional[int] = None,
+    semaphore: Optional[asyncio.Semaphore] = None
+) -> List[Optional[R]]:
+    """
+    Run `fetch` for every item with at most `concurrency` calls in flight.
+
+    Pass `semaphore` to share one in-flight budget across several fan-outs
+    (matches and timelines downloading together). Results come back in the
+    same order as `items`; an item whose fetch fails yields None so one bad
+    match doesn't sink the whole batch.
+    """
+    if not items:
+        return []
+
+    semaphore = semaphore or asyncio.Semaphore(concurrency or DEFAULT_CONCURRENCY)
+
+    async def run(item: T) -> Optional[R]:
+        try:
+            async with semaphore:
+                return await fetch(item)
+        except Exception as e:
+            logger.error(f"Error fetching {item}: {e}")
+            return None
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -4,9 +4,8 @@ Identifies persistent gameplay patterns (both good and bad habits)
 """
 import logging
 from typing import Dict, List, Optional
-import boto3
-from boto3.dynamodb.conditions import Key
 import statistics
+from services.match_repository import MatchRepository, get_match_repository
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +13,8 @@ logger = logging.getLogger(__name__)
 class HabitsDetector:
     """Detects persistent gameplay habits across matches"""
 
-    def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        self.table = self.dynamodb.Table('lol-player-data')
+    def __init__(self, match_repository: Optional[MatchRepository] = None):
+        self.match_repository = match_repository or get_match_repository()
 
     def detect_habits(
         self,
@@ -70,19 +68,9 @@ class HabitsDetector:
             }
 
     def _fetch_matches(self, puuid: str, time_range: Optional[int]) -> List[Dict]:
-        """Fetch match data from DynamoDB"""
+        """Fetch match data from DynamoDB (all pages, stopping once time_range matches are read)"""
         try:
-            response = self.table.query(
-                KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-            )
-
-            matches = response['Items']
-
-            # Limit to time_range if specified
-            if time_range:
-                matches = matches[:time_range]
-
-            return matches
+            return list(self.match_repository.iter_summaries(puuid, limit=time_range or None))
 
         except Exception as e:
             logger.error(f"Error fetching matches: {e}", exc_info=True)
@@ -0,0 +1,171 @@
+"""
+Heatmap Density Grids
+Binned event counts over Summoner's Rift coordinates (numpy histogram2d) at several resolutions, encoded as compact typed arrays
+"""
+import base64
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Summoner's Rift spans 0-15000 game units on both axes
+MAP_SIZE = 15000
+
+# Pyramid levels (cells per side). The finest level is binned; every coarser level that
+# divides it is summed from it, so all levels agree exactly.
+DENSITY_RESOLUTIONS = tuple(sorted(
+    int(level) for level in os.getenv('HEATMAP_DENSITY_RESOLUTIONS', '16,32,64,128').split(',') if level.strip()
+))
+
+# Cells per side of the per-minute grids that drive timeline playback
+MINUTE_GRID_RESOLUTION = int(os.getenv('HEATMAP_MINUTE_GRID_RESOLUTION', '32'))
+
+DensityKey = Tuple[str, str, Tuple[Tuple[str, object], ...]]
+
+
+def density_pyramid(xs: Sequence[float], ys: Sequence[float],
+                    resolutions: Iterable[int] = DENSITY_RESOLUTIONS) -> Dict[int, np.ndarray]:
+    """
+    resolution -> counts[row = y bin, column = x bin] (row 0 at y = 0).
+    Points outside the map are clipped onto the edge cells.
+    """
+    resolutions = sorted(set(resolutions))
+    finest = resolutions[-1]
+    x = np.clip(np.asarray(xs, dtype=np.float64), 0, MAP_SIZE)
+    y = np.clip(np.asarray(ys, dtype=np.float64), 0, MAP_SIZE)
+
+    counts, _, _ = np.histogram2d(y, x, bins=finest, range=[[0, MAP_SIZE], [0, MAP_SIZE]])
+    base = counts.astype(np.uint32)
+
+    pyramid = {finest: base}
+    for resolution in resolutions[:-1]:
+        if finest % resolution == 0:
+            factor = finest // resolution
+            pyramid[resolution] = base.reshape(resolution, factor, resolution, factor).sum(axis=(1, 3), dtype=np.uint32)
+        else:
+            level, _, _ = np.histogram2d(y, x, bins=resolution, range=[[0, MAP_SIZE], [0, MAP_SIZE]])
+            pyramid[resolution] = level.astype(np.uint32)
+    return pyramid
+
+
+def encode_grid(counts: np.ndarray) -> Dict:
+    """
+    Row-major little-endian counts, base64 encoded; decode in the browser with
+    new Uint8Array / Uint16Array / Uint32Array (per `dtype`) over the decoded bytes.
+    """
+    peak = int(counts.max()) if counts.size else 0
+    dtype = '<u1' if peak <= 0xFF else '<u2' if peak <= 0xFFFF else '<u4'
+    resolution = counts.shape[0]
+    return {
+        'resolution': resolution,
+        'cell_size': MAP_SIZE / resolution,
+        'dtype': {'<u1': 'uint8', '<u2': 'uint16', '<u4': 'uint32'}[dtype],
+        'max': peak,
+        'total': int(counts.sum()),
+        'data': base64.b64encode(np.ascontiguousarray(counts, dtype=dtype).tobytes()).decode('ascii')
+    }
+
+
+def encode_pyramid(points: List[Dict], resolutions: Iterable[int] = DENSITY_RESOLUTIONS) -> Dict[str, Dict]:
+    """Encoded density grids for a list of heatmap points, keyed by resolution (as a string for JSON)"""
+    xs = [point['x'] for point in points if point.get('x') is not None and point.get('y') is not None]
+    ys = [point['y'] for point in points if point.get('x') is not None and point.get('y') is not None]
+    return {str(resolution): encode_grid(counts) for resolution, counts in density_pyramid(xs, ys, resolutions).items()}
+
+
+def minute_grid(points: List[Dict], resolution: int = MINUTE_GRID_RESOLUTION) -> Dict:
+    """
+    Sparse per-minute cell counts as parallel arrays sorted by minute: playback
+    up to minute m sums the counts of every entry with minutes[i] <= m.
+    cell = row * resolution + column (row 0 at y = 0), binned like density_pyramid.
+    """
+    located = [
+        point for point in points
+        if point.get('x') is not None and point.get('y') is not None and point.get('timestamp') is not None
+    ]
+    grid = {'resolution': resolution, 'cell_size': MAP_SIZE / resolution, 'minutes': [], 'cells': [], 'counts': []}
+    if not located:
+        return grid
+
+    def bins(values):
+        scaled = np.clip(np.asarray(values, dtype=np.float64), 0, MAP_SIZE) * resolution / MAP_SIZE
+        return np.minimum(scaled.astype(np.int64), resolution - 1)
+
+    columns = bins([point['x'] for point in located])
+    rows = bins([point['y'] for point in located])
+    minutes = np.asarray([point['timestamp'] for point in located], dtype=np.int64) // 60000
+    cells_per_grid = resolution * resolution
+
+    keys, counts = np.unique(minutes * cells_per_grid + rows * resolution + columns, return_counts=True)
+    grid['minutes'] = (keys // cells_per_grid).tolist()
+    grid['cells'] = (keys % cells_per_grid).tolist()
+    grid['counts'] = counts.tolist()
+    return grid
+
+
+def select_levels(grids: Dict[str, Dict], resolutions: Optional[Iterable[int]]) -> Dict[str, Dict]:
+    """The requested pyramid levels (all of them when `resolutions` is empty)"""
+    if not resolutions:
+        return grids
+    wanted = {str(resolution) for resolution in resolutions}
+    return {level: grid for level, grid in grids.items() if level in wanted}
+
+
+def density_key(puuid: str, event_type: str, **filters) -> DensityKey:
+    """Cache key: player, event category and the filters that shaped the point set"""
+    return puuid, event_type, tuple(sorted((name, value) for name, value in filters.items() if value is not None))
+
+
+class DensityGridCache:
+    """
+    Encoded grids (plus whatever summary the caller stores alongside) keyed by
+    (puuid, event_type, filters); LRU + TTL bounded, invalidate(puuid) drops a
+    player's entries when new timelines are ingested.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv('HEATMAP_DENSITY_TTL_SECONDS', '900'))
+        self.max_entries = max_entries or int(os.getenv('HEATMAP_DENSITY_MAX_ENTRIES', '512'))
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[DensityKey, Tuple[float, Dict]]' = OrderedDict()
+
+    def get(self, key: DensityKey) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: DensityKey, value: Dict):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, puuid: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == puuid]:
+                del self._entries[key]
+
+
+# Shared instance
+_density_cache = None
+
+
+def get_density_cache() -> DensityGridCache:
+    """Get or create the DensityGridCache singleton"""
+    global _density_cache
+    if _density_cache is None:
+        _density_cache = DensityGridCache()
+    return _density_cache
@@ -0,0 +1,176 @@
+"""
+Heatmap Engine
+One pass over a player's positioned timeline events, classified into every heatmap category at once
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+from services.clients import ClientRegistry
+from services.heatmap_density import (
+    DensityGridCache, density_key, encode_pyramid, get_density_cache, minute_grid, select_levels
+)
+from services.heatmap_queries import HEATMAP_CATEGORIES
+from services.timeline_events import resolve_timeline_participants
+from services.timeline_store import TimelineStore, get_timeline_store
+
+logger = logging.getLogger(__name__)
+
+
+def empty_heatmap(categories: Iterable[str] = HEATMAP_CATEGORIES, resolutions: Optional[Iterable[int]] = None,
+                  include_points: bool = False) -> Dict:
+    """Engine result with no matches (same shape as HeatmapEngine.run)"""
+    density = select_levels(encode_pyramid([]), resolutions)
+    return {
+        'matches_analyzed': 0,
+        'categories': {
+            category: {
+                'count': 0, 'density': density, 'minutes': {}, 'minute_grid': minute_grid([]),
+                **({'points': []} if include_points else {})
+            }
+            for category in categories
+        }
+    }
+
+
+class HeatmapEngine:
+    """
+    Builds heatmaps for a player's kills, deaths, assists and objectives.
+
+    Matches are selected once (champion / role / recent-N filters), then a
+    single aggregation pass streams every positioned event the player took
+    part in, already classified into its category. All four categories are
+    binned into density grids, per-minute counts and per-minute cell grids
+    (for timeline playback without raw points) and cached together, so
+    asking for one category and then its siblings costs one MongoDB pass.
+    Raw points are never cached; requests for them always scan.
+    Timelines are read through the configured TimelineStore (MongoDB or local).
+    """
+
+    def __init__(self, clients: Optional[ClientRegistry] = None, density_cache: Optional[DensityGridCache] = None,
+                 timelines: Optional[TimelineStore] = None):
+        self.timelines = timelines or get_timeline_store(clients)
+        self.density_cache = density_cache or get_density_cache()
+
+    def run(self, puuid: str, categories: Iterable[str] = HEATMAP_CATEGORIES, include_points: bool = False,
+            resolutions: Optional[Iterable[int]] = None, champion_name: str = None, role: str = None,
+            match_count: int = None, game_time_start: int = None, game_time_end: int = None) -> Dict:
+        """
+        Heatmaps for the requested categories.
+
+        Args:
+            categories: Subset of HEATMAP_CATEGORIES to return (all are computed)
+            include_points: Also return the raw event points per category
+            resolutions: Density pyramid levels to return (default: all)
+            champion_name / role / match_count: Match filters
+            game_time_start / game_time_end: Event time window in minutes
+
+        Returns:
+            {'matches_analyzed': n, 'categories': {category: {'count', 'density', 'minutes', 'minute_grid'[, 'points']}}}
+            where minutes is {game minute: event count} and minute_grid is heatmap_density.minute_grid
+        """
+        categories = [category for category in HEATMAP_CATEGORIES if category in categories]
+        filters = {
+            'champion': champion_name,
+            'role': role,
+            'match_count': match_count,
+            'game_time_start': game_time_start,
+            'game_time_end': game_time_end
+        }
+
+        # Grids alone are served from the cache without touching MongoDB
+        if not include_points:
+            cached = {category: self.density_cache.get(density_key(puuid, category, **filters)) for category in categories}
+            if all(summary is not None for summary in cached.values()):
+                return self._result(cached, resolutions)
+
+        matches, points = self._scan(
+            puuid, champion_name, role, match_count,
+            game_time_start * 60000 if game_time_start is not None else None,
+            game_time_end * 60000 if game_time_end is not None else None,
+            need_details=bool(champion_name or role or include_points)
+        )
+        if not matches:
+            return empty_heatmap(categories, resolutions, include_points)
+
+        summaries = {}
+        for category in HEATMAP_CATEGORIES:
+            minutes = {}
+            for point in points[category]:
+                minute = int(point['timestamp'] // 60000)
+                minutes[minute] = minutes.get(minute, 0) + 1
+            summaries[category] = {
+                'matches_analyzed': matches,
+                'count': len(points[category]),
+                'density': encode_pyramid(points[category]),
+                'minutes': minutes,
+                'minute_grid': minute_grid(points[category])
+            }
+            self.density_cache.put(density_key(puuid, category, **filters), summaries[category])
+
+        result = self._result({category: summaries[category] for category in categories}, resolutions)
+        if include_points:
+            for category in categories:
+                result['categories'][category]['points'] = points[category]
+        return result
+
+    def _scan(self, puuid: str, champion_name: Optional[str], role: Optional[str], match_count: Optional[int],
+              start_ms: Optional[int], end_ms: Optional[int], need_details: bool):
+        """(matches scanned, category -> points) from one aggregation pass"""
+        # Participant fields only; events are filtered server-side below
+        timelines = self.timelines.find_participants(puuid, limit=match_count)
+        points = {category: [] for category in HEATMAP_CATEGORIES}
+        if not timelines:
+            return 0, points
+
+        # Participant ID, champion and role are stored on the timeline at ingest
+        # (older documents are resolved with one batched DynamoDB read when details are needed)
+        selected = {}
+        match_metadata = {}
+        for match_id, fields in resolve_timeline_participants(puuid, timelines, need_details=need_details).items():
+            if champion_name and fields.get('championName') != champion_name:
+                continue
+            if role and fields.get('teamPosition') != role:
+                continue
+            selected[match_id] = fields['participantId']
+            match_metadata[match_id] = {
+                'champion_name': fields.get('championName', 'Unknown'),
+                'role': fields.get('teamPosition', 'Unknown')
+            }
+
+        for point in self.timelines.iter_heatmap_points(puuid, selected, HEATMAP_CATEGORIES, start_ms, end_ms):
+            metadata = match_metadata[point['match_id']]
+            point['champion_name'] = metadata['champion_name']
+            point['role'] = metadata['role']
+            points[point.pop('category')].append(point)
+
+        logger.info(
+            f"Heatmap scan for {puuid[:8]}...: {len(selected)} of {len(timelines)} matches, "
+            + ", ".join(f"{len(points[category])} {category}" for category in HEATMAP_CATEGORIES)
+        )
+        return len(selected), points
+
+    def _result(self, summaries: Dict[str, Dict], resolutions: Optional[Iterable[int]]) -> Dict:
+        return {
+            'matches_analyzed': next(iter(summaries.values()))['matches_analyzed'] if summaries else 0,
+            'categories': {
+                category: {
+                    'count': summary['count'],
+                    'density': select_levels(summary['density'], resolutions),
+                    'minutes': summary['minutes'],
+                    'minute_grid': summary['minute_grid']
+                }
+                for category, summary in summaries.items()
+            }
+        }
+
+
+# Shared instance
+_heatmap_engine = None
+
+
+def get_heatmap_engine() -> HeatmapEngine:
+    """Get or create the HeatmapEngine singleton"""
+    global _heatmap_engine
+    if _heatmap_engine is None:
+        _heatmap_engine = HeatmapEngine()
+    return _heatmap_engine
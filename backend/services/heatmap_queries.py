@@ -0,0 +1,282 @@
+"""
+Heatmap Queries
+MongoDB projections and aggregation pipelines that filter and classify positioned timeline events server-side
+"""
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from services.timeline_codec import PACKED_FORMAT, PackedTimeline
+from services.timeline_events import EVENTS_COLLECTION
+
+HEATMAP_CATEGORIES = ('deaths', 'kills', 'assists', 'objectives')
+
+# Event types that can land in a heatmap category
+HEATMAP_EVENT_TYPES = ('CHAMPION_KILL', 'ELITE_MONSTER_KILL', 'BUILDING_KILL')
+
+# Just enough of a timeline document to find the player (no frames)
+TIMELINE_PARTICIPANT_PROJECTION = {
+    '_id': 0,
+    'matchId': 1,
+    'puuid': 1,
+    'participantId': 1,
+    'championName': 1,
+    'teamPosition': 1,
+    'data.metadata.participants': 1
+}
+
+CURSOR_BATCH_SIZE = 1000
+
+
+def find_timeline_participants(db, puuid: str, limit: Optional[int] = None) -> List[Dict]:
+    """Timeline documents for a player with participant fields only (frames stay on the server)"""
+    cursor = db.timelines.find({'puuid': puuid}, TIMELINE_PARTICIPANT_PROJECTION)
+    if limit:
+        cursor = cursor.limit(limit)
+    return list(cursor)
+
+
+def _category_expression(categories: Iterable[str], field: Callable[[str], str]) -> Dict:
+    """
+    Classify an event for the player `$pid` into one of `categories`; `field`
+    maps an event field name to its path ('$event.type' on unwound timelines,
+    '$type' on timeline_events rows). With several categories the old Python
+    precedence holds: death, kill, assist, then objective (monster kill or
+    building involvement).
+    """
+    event_type = field('type')
+    assisting = {'$ifNull': [field('assistingParticipantIds'), []]}
+    killed_by_player = {'$eq': [field('killerId'), '$pid']}
+    champion_kill = {'$eq': [event_type, 'CHAMPION_KILL']}
+
+    conditions = {
+        'deaths': [{'$and': [champion_kill, {'$eq': [field('victimId'), '$pid']}]}],
+        'kills': [{'$and': [champion_kill, killed_by_player]}],
+        'assists': [{'$and': [champion_kill, {'$in': ['$pid', assisting]}]}],
+        'objectives': [
+            {'$and': [{'$eq': [event_type, 'ELITE_MONSTER_KILL']}, killed_by_player]},
+            {'$and': [
+                {'$eq': [event_type, 'BUILDING_KILL']},
+                {'$or': [{'$in': ['$pid', assisting]}, killed_by_player]}
+            ]}
+        ]
+    }
+
+    return {'$switch': {
+        'branches': [
+            {'case': case, 'then': category}
+            for category in HEATMAP_CATEGORIES if category in categories
+            for case in conditions[category]
+        ],
+        'default': None
+    }}
+
+
+def _point_projection(field: Callable[[str], str], x: str, y: str) -> Dict:
+    """Project a classified event to the heatmap point fields the API always returned"""
+    event_type = field('type')
+    return {'$project': {
+        '_id': 0,
+        'category': 1,
+        'x': x,
+        'y': y,
+        'timestamp': field('timestamp'),
+        'match_id': '$matchId',
+        'killer_id': {'$cond': [
+            {'$eq': ['$category', 'deaths']}, {'$ifNull': [field('killerId'), None]}, '$$REMOVE'
+        ]},
+        'victim_id': {'$cond': [
+            {'$in': ['$category', ['kills', 'assists']]}, {'$ifNull': [field('victimId'), None]}, '$$REMOVE'
+        ]},
+        'monster_type': {'$cond': [
+            {'$eq': [event_type, 'ELITE_MONSTER_KILL']}, {'$ifNull': [field('monsterType'), None]}, '$$REMOVE'
+        ]},
+        'building_type': {'$cond': [
+            {'$eq': [event_type, 'BUILDING_KILL']}, {'$ifNull': [field('buildingType'), None]}, '$$REMOVE'
+        ]}
+    }}
+
+
+def _timestamp_range(start_ms: Optional[int], end_ms: Optional[int]) -> Dict:
+    timestamp_range = {}
+    if start_ms is not None:
+        timestamp_range['$gte'] = start_ms
+    if end_ms is not None:
+        timestamp_range['$lte'] = end_ms
+    return timestamp_range
+
+
+def _timeline_field(name: str) -> str:
+    return f'$event.{name}'
+
+
+def _row_field(name: str) -> str:
+    return f'${name}'
+
+
+def event_rows_pipeline(puuid: str, participant_ids: Dict[str, int], categories: Iterable[str] = HEATMAP_CATEGORIES,
+                        start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[Dict]:
+    """
+    Heatmap points from `timeline_events` rows. Every category involves the
+    player, so rows are matched on `participantIds` per participant slot (ten
+    $or branches at most), served by the (matchId, participantIds, type) and
+    (puuid, type, timestamp) indexes from create_event_indexes.
+    """
+    matches_by_pid: Dict[int, List[str]] = {}
+    for match_id, pid in participant_ids.items():
+        matches_by_pid.setdefault(pid, []).append(match_id)
+
+    row_filter = {
+        'puuid': puuid,
+        'type': {'$in': list(HEATMAP_EVENT_TYPES)},
+        '$or': [
+            {'matchId': {'$in': match_ids}, 'participantIds': pid}
+            for pid, match_ids in matches_by_pid.items()
+        ]
+    }
+    timestamp_range = _timestamp_range(start_ms, end_ms)
+    if timestamp_range:
+        row_filter['timestamp'] = timestamp_range
+
+    return [
+        {'$match': row_filter},
+        {'$addFields': {'pid': {'$switch': {
+            'branches': [
+                {'case': {'$in': ['$matchId', match_ids]}, 'then': pid}
+                for pid, match_ids in matches_by_pid.items()
+            ],
+            'default': None
+        }}}},
+        {'$addFields': {'category': _category_expression(categories, _row_field)}},
+        {'$match': {'category': {'$ne': None}}},
+        _point_projection(_row_field, '$x', '$y')
+    ]
+
+
+def _event_stages(
+    puuid: str,
+    participant_ids: Dict[str, int],
+    categories: Iterable[str],
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None
+) -> List[Dict]:
+    """Unwind frame events of the given matches and keep the player's events in `categories`"""
+    match_ids = list(participant_ids)
+    event_filter = {
+        'event.position': {'$exists': True, '$ne': None},
+        'event.type': {'$in': list(HEATMAP_EVENT_TYPES)}
+    }
+    timestamp_range = _timestamp_range(start_ms, end_ms)
+    if timestamp_range:
+        event_filter['event.timestamp'] = timestamp_range
+
+    return [
+        # Packed timelines can't be unwound server-side; iter_heatmap_points decodes them
+        {'$match': {'puuid': puuid, 'matchId': {'$in': match_ids}, 'format': {'$ne': PACKED_FORMAT}}},
+        # Only frame event lists leave the document (participantFrames are dropped here)
+        {'$project': {
+            '_id': 0,
+            'matchId': 1,
+            'pid': {'$arrayElemAt': [
+                [participant_ids[match_id] for match_id in match_ids],
+                {'$indexOfArray': [match_ids, '$matchId']}
+            ]},
+            'event': '$data.info.frames.events'
+        }},
+        {'$unwind': '$event'},
+        {'$unwind': '$event'},
+        {'$match': event_filter},
+        {'$addFields': {'category': _category_expression(categories, _timeline_field)}},
+        {'$match': {'category': {'$ne': None}}}
+    ]
+
+
+def heatmap_points_pipeline(puuid: str, participant_ids: Dict[str, int], categories: Iterable[str] = HEATMAP_CATEGORIES,
+                            start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> List[Dict]:
+    """Pipeline yielding one heatmap point per matching event of whole timeline documents"""
+    return _event_stages(puuid, participant_ids, categories, start_ms, end_ms) + [
+        _point_projection(_timeline_field, '$event.position.x', '$event.position.y')
+    ]
+
+
+def classify_event(event: Dict, pid: int, categories: Iterable[str] = HEATMAP_CATEGORIES) -> Optional[str]:
+    """Python twin of _category_expression (same precedence), for events decoded from packed timelines"""
+    event_type = event.get('type')
+    assisting = event.get('assistingParticipantIds') or []
+    killed_by_player = event.get('killerId') == pid
+    champion_kill = event_type == 'CHAMPION_KILL'
+
+    conditions = {
+        'deaths': champion_kill and event.get('victimId') == pid,
+        'kills': champion_kill and killed_by_player,
+        'assists': champion_kill and pid in assisting,
+        'objectives': (event_type == 'ELITE_MONSTER_KILL' and killed_by_player)
+        or (event_type == 'BUILDING_KILL' and (pid in assisting or killed_by_player))
+    }
+    return next((category for category in HEATMAP_CATEGORIES if category in categories and conditions[category]), None)
+
+
+def heatmap_point(category: str, event: Dict, x, y, match_id: str) -> Dict:
+    """A classified event as the point heatmap_points_pipeline projects"""
+    point = {'category': category, 'x': x, 'y': y, 'timestamp': event.get('timestamp'), 'match_id': match_id}
+    if category == 'deaths':
+        point['killer_id'] = event.get('killerId')
+    if category in ('kills', 'assists'):
+        point['victim_id'] = event.get('victimId')
+    if event.get('type') == 'ELITE_MONSTER_KILL':
+        point['monster_type'] = event.get('monsterType')
+    if event.get('type') == 'BUILDING_KILL':
+        point['building_type'] = event.get('buildingType')
+    return point
+
+
+def iter_packed_heatmap_points(db, puuid: str, participant_ids: Dict[str, int], categories: Iterable[str],
+                               start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Dict]:
+    """Heatmap points from packed timelines: only the compressed event column is fetched and decoded"""
+    categories = list(categories)
+    cursor = db.timelines.find(
+        {'puuid': puuid, 'matchId': {'$in': list(participant_ids)}, 'format': PACKED_FORMAT},
+        {'_id': 0, 'matchId': 1, 'format': 1, 'packed.frames': 1, 'packed.events': 1, 'packed.event_offsets': 1}
+    )
+    for doc in cursor:
+        pid = participant_ids[doc['matchId']]
+        for frame_events in PackedTimeline(doc).events():
+            for event in frame_events:
+                position = event.get('position')
+                timestamp = event.get('timestamp')
+                if position is None or event.get('type') not in HEATMAP_EVENT_TYPES:
+                    continue
+                if (start_ms is not None and (timestamp is None or timestamp < start_ms)) or \
+                        (end_ms is not None and (timestamp is None or timestamp > end_ms)):
+                    continue
+                category = classify_event(event, pid, categories)
+                if category is not None:
+                    yield heatmap_point(category, event, position.get('x'), position.get('y'), doc['matchId'])
+
+
+def iter_heatmap_points(db, puuid: str, participant_ids: Dict[str, int], categories: Iterable[str] = HEATMAP_CATEGORIES,
+                        start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Stream heatmap points from the server in cursor batches. Matches with
+    timeline_events rows are read from that index; timelines ingested before
+    it existed (until --backfill-events runs) fall back to unwinding the
+    timeline documents, packed ones decoded here.
+    """
+    categories = [category for category in categories if category in HEATMAP_CATEGORIES]
+    if not participant_ids or not categories:
+        return iter(())
+
+    indexed = set(db[EVENTS_COLLECTION].distinct('matchId', {'puuid': puuid, 'matchId': {'$in': list(participant_ids)}}))
+    streams = []
+    if indexed:
+        pipeline = event_rows_pipeline(
+            puuid, {match_id: pid for match_id, pid in participant_ids.items() if match_id in indexed},
+            categories, start_ms, end_ms
+        )
+        streams.append(db[EVENTS_COLLECTION].aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE))
+
+    unindexed = {match_id: pid for match_id, pid in participant_ids.items() if match_id not in indexed}
+    if unindexed:
+        pipeline = heatmap_points_pipeline(puuid, unindexed, categories, start_ms, end_ms)
+        streams.append(db.timelines.aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE))
+        streams.append(iter_packed_heatmap_points(db, puuid, unindexed, categories, start_ms, end_ms))
+    return chain.from_iterable(streams)
@@ -0,0 +1,58 @@
+"""
+Keyed Locks
+Per-key locks (one loader or writer per player) that are dropped once nobody holds or waits on them
+"""
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Hashable, List
+
+
+class KeyedLocks:
+    """
+    A lock per key, created on first use and removed when its last holder or
+    waiter leaves, so long-running processes don't keep one lock per player
+    ever seen. Use `with locks(key)` for threading locks and
+    `async with locks.hold_async(key)` when built with asyncio.Lock.
+    """
+
+    def __init__(self, factory: Callable = threading.Lock):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._locks: Dict[Hashable, List] = {}  # key -> [lock, holders + waiters]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._locks)
+
+    def _checkout(self, key: Hashable):
+        with self._lock:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [self._factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _checkin(self, key: Hashable):
+        with self._lock:
+            entry = self._locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    @contextmanager
+    def __call__(self, key: Hashable):
+        lock = self._checkout(key)
+        try:
+            with lock:
+                yield
+        finally:
+            self._checkin(key)
+
+    @asynccontextmanager
+    async def hold_async(self, key: Hashable):
+        lock = self._checkout(key)
+        try:
+            async with lock:
+                yield
+        finally:
+            self._checkin(key)
@@ -0,0 +1,507 @@
+"""
+Local Store
+Read-optimized filesystem tier: per-player Parquet partitions, compressed timeline files and a columnar event index, memory-mapped on read
+"""
+import json
+import os
+import tempfile
+import threading
+import logging
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import bson
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import zstandard
+
+from services.heatmap_queries import HEATMAP_CATEGORIES, HEATMAP_EVENT_TYPES, classify_event, heatmap_point
+from services.keyed_locks import KeyedLocks
+from services.match_columns import ITEM_SLOTS, MatchColumns
+from services.match_summary import MATCH_PREFIX, SUMMARY_PREFIX, build_summary_item
+from services.storage import PlayerDataStore, RevisionConflict
+from services.timeline_codec import ZSTD_LEVEL, pack_document, timeline_data
+from services.timeline_events import extract_positioned_events
+from services.timeline_store import TimelineStore
+
+logger = logging.getLogger(__name__)
+
+# Rows per page when streaming a partition (iter_pages / early stop on limit)
+PAGE_SIZE = 1000
+COMPRESSION = 'zstd'
+
+ITEM_SCHEMA = pa.schema([('dataType', pa.string()), ('matchId', pa.string()), ('item', pa.string())])
+
+INDEX_SCHEMA = pa.schema([
+    ('matchId', pa.string()),
+    ('participantId', pa.int64()),
+    ('championName', pa.string()),
+    ('teamPosition', pa.string()),
+    ('participants', pa.list_(pa.string()))
+])
+
+# timeline_events rows (see services.timeline_events.extract_positioned_events)
+EVENT_SCHEMA = pa.schema([
+    ('matchId', pa.string()),
+    ('type', pa.string()),
+    ('timestamp', pa.int64()),
+    ('minute', pa.int64()),
+    ('x', pa.int64()),
+    ('y', pa.int64()),
+    ('killerId', pa.int64()),
+    ('victimId', pa.int64()),
+    ('assistingParticipantIds', pa.list_(pa.int64())),
+    ('monsterType', pa.string()),
+    ('monsterSubType', pa.string()),
+    ('buildingType', pa.string()),
+    ('towerType', pa.string()),
+    ('laneType', pa.string()),
+    ('killerTeamId', pa.int64()),
+    ('teamId', pa.int64()),
+    ('participantIds', pa.list_(pa.int64())),
+    ('uploadedAt', pa.timestamp('us'))
+])
+
+# Event columns a heatmap scan reads (the rest stay on disk)
+POINT_COLUMNS = ['matchId', 'type', 'timestamp', 'x', 'y', 'killerId', 'victimId',
+                 'assistingParticipantIds', 'monsterType', 'buildingType']
+
+# Non-stat columns of columns.parquet
+COLUMN_KEYS = ('matchId', 'champion', 'role', 'items', 'runes')
+
+
+def _json_default(value):
+    # DynamoDB exports carry Decimals; ingest timestamps may be datetimes
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+
+def _write_atomic(path: Path, write: Callable[[str], None]):
+    """Write to a temp file in the same directory, then rename over `path` (readers never see a partial file)"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _write_table(path: Path, table: pa.Table):
+    _write_atomic(path, lambda tmp: pq.write_table(table, tmp, compression=COMPRESSION))
+
+
+def _read_table(path: Path, columns: Optional[List[str]] = None, filters=None) -> Optional[pa.Table]:
+    """Memory-mapped read of only the requested columns (and row groups passing `filters`)"""
+    if not path.exists():
+        return None
+    return pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+
+
+def _replace_rows(path: Path, schema: pa.Schema, rows: List[Dict], key: str, replaced: Iterable[str],
+                  sort: bool = False) -> pa.Table:
+    """Rewrite a partition file: existing rows whose `key` is in `replaced` give way to `rows`"""
+    new = pa.Table.from_pylist(rows, schema=schema)
+    existing = _read_table(path)
+    if existing is not None:
+        existing = existing.filter(pc.invert(pc.is_in(existing[key], value_set=pa.array(list(replaced), pa.string()))))
+        # Files written before a column existed get it as nulls
+        for field in schema:
+            if field.name not in existing.column_names:
+                existing = existing.append_column(field.name, pa.nulls(len(existing), field.type))
+        new = pa.concat_tables([existing.select(schema.names).cast(schema), new])
+    if sort:
+        new = new.sort_by(key)
+    _write_table(path, new)
+    return new
+
+
+def _fixed_width_list(matrix: np.ndarray) -> pa.Array:
+    rows, width = matrix.shape
+    return pa.ListArray.from_arrays(pa.array(np.arange(rows + 1, dtype=np.int32) * width), pa.array(matrix.ravel()))
+
+
+def _matrix(column: pa.ChunkedArray, rows: int, width: int) -> np.ndarray:
+    values = column.combine_chunks().flatten().to_numpy(zero_copy_only=False)
+    return values.astype(np.int64, copy=False).reshape(rows, width)
+
+
+def columns_table(columns: MatchColumns) -> pa.Table:
+    """MatchColumns as a Parquet-ready table: one typed column per stat, items/runes as fixed-width lists"""
+    arrays = {name: pa.array(values) for name, values in columns.columns.items()}
+    arrays['matchId'] = pa.array(columns.match_ids, pa.string())
+    arrays['champion'] = pa.array([columns.champions[code] for code in columns.champion_codes], pa.string())
+    arrays['role'] = pa.array([columns.roles[code] for code in columns.role_codes], pa.string())
+    arrays['items'] = _fixed_width_list(columns.items)
+    arrays['runes'] = _fixed_width_list(columns.runes)
+    return pa.table(arrays).replace_schema_metadata({'rune_width': str(columns.runes.shape[1])})
+
+
+def columns_from_table(table: pa.Table) -> MatchColumns:
+    """Inverse of columns_table; numeric columns come straight off the (memory-mapped) buffers"""
+    rows = table.num_rows
+    # dictionary_encode numbers values in order of first appearance, like MatchColumns.from_matches
+    champions = table['champion'].combine_chunks().dictionary_encode()
+    roles = table['role'].combine_chunks().dictionary_encode()
+    rune_width = int((table.schema.metadata or {}).get(b'rune_width', b'0'))
+
+    return MatchColumns(
+        columns={
+            name: table[name].to_numpy()
+            for name in table.column_names if name not in COLUMN_KEYS
+        },
+        champions=champions.dictionary.to_pylist(),
+        champion_codes=champions.indices.to_numpy(zero_copy_only=False).astype(np.int32, copy=False),
+        roles=roles.dictionary.to_pylist(),
+        role_codes=roles.indices.to_numpy(zero_copy_only=False).astype(np.int32, copy=False),
+        items=_matrix(table['items'], rows, ITEM_SLOTS),
+        runes=_matrix(table['runes'], rows, rune_width),
+        match_ids=table['matchId'].to_pylist()
+    )
+
+
+class LocalPlayerData(PlayerDataStore):
+    """
+    `lol-player-data` as one directory per player:
+
+        players/puuid=<puuid>/matches.parquet    match#<id> items (dataType, matchId, item JSON)
+        players/puuid=<puuid>/summaries.parquet  summary#<id> items, same columns
+        players/puuid=<puuid>/columns.parquet    MatchColumns of the summaries, one typed column per stat
+        players/puuid=<puuid>/profile.json       every other item (account, summoner, ranked, aggregate#...)
+
+    Rows are kept sorted by dataType, so reads come back in DynamoDB query
+    order. Every match gets a summary row at write time, and analytics read
+    columns.parquet directly instead of re-parsing items.
+    """
+
+    name = 'local store'
+
+    def __init__(self, root):
+        self.root = Path(root) / 'players'
+        self._locks = KeyedLocks()  # One writer at a time per player (reads go lock-free against atomically replaced files)
+
+    def _dir(self, puuid: str) -> Path:
+        return self.root / f"puuid={puuid}"
+
+    def _file(self, puuid: str, prefix: str) -> Optional[Path]:
+        """Parquet partition holding dataTypes that start with `prefix` (None: profile items)"""
+        if prefix.startswith(MATCH_PREFIX):
+            return self._dir(puuid) / 'matches.parquet'
+        if prefix.startswith(SUMMARY_PREFIX):
+            return self._dir(puuid) / 'summaries.parquet'
+        return None
+
+    def _profile(self, puuid: str) -> Dict[str, Dict]:
+        path = self._dir(puuid) / 'profile.json'
+        if not path.exists():
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            return {item['dataType']: item for item in json.load(f)}
+
+    @staticmethod
+    def _item(puuid: str, payload: str) -> Dict:
+        item = json.loads(payload)
+        item['puuid'] = puuid
+        return item
+
+    def _parquet_pages(self, puuid: str, path: Path, prefix: str) -> Iterator[List[Dict]]:
+        if not path.exists():
+            return
+        parquet = pq.ParquetFile(path, memory_map=True)
+        for batch in parquet.iter_batches(batch_size=PAGE_SIZE, columns=['dataType', 'item']):
+            yield [
+                self._item(puuid, payload)
+                for data_type, payload in zip(batch['dataType'].to_pylist(), batch['item'].to_pylist())
+                if data_type.startswith(prefix)
+            ]
+
+    def _pages(self, puuid: str, prefix: str) -> Iterator[List[Dict]]:
+        path = self._file(puuid, prefix)
+        if path is not None:
+            yield from self._parquet_pages(puuid, path, prefix)
+            return
+
+        items = [item for data_type, item in self._profile(puuid).items() if data_type.startswith(prefix)]
+        for partition_prefix in (MATCH_PREFIX, SUMMARY_PREFIX):
+            if partition_prefix.startswith(prefix):
+                for page in self._parquet_pages(puuid, self._file(puuid, partition_prefix), partition_prefix):
+                    items.extend(page)
+        items.sort(key=lambda item: item['dataType'])
+        for start in range(0, len(items), PAGE_SIZE):
+            yield items[start:start + PAGE_SIZE]
+
+    def iter_pages(self, puuid: str, prefix: str = '', limit: Optional[int] = None) -> Iterator[List[Dict]]:
+        remaining = limit
+        for page in self._pages(puuid, prefix):
+            if remaining is not None:
+                page = page[:remaining]
+                remaining -= len(page)
+            yield page
+            if remaining is not None and remaining <= 0:
+                return
+
+    def iter_keys(self, puuid: str, prefix: str = '') -> Iterator[str]:
+        path = self._file(puuid, prefix)
+        if path is None:
+            yield from super().iter_keys(puuid, prefix)
+            return
+        table = _read_table(path, columns=['dataType'])
+        if table is not None:
+            yield from (data_type for data_type in table['dataType'].to_pylist() if data_type.startswith(prefix))
+
+    def batch_get(self, puuid: str, data_types: List[str]) -> List[Dict]:
+        profile = None
+        by_file: Dict[Path, List[str]] = {}
+        items = []
+        for data_type in data_types:
+            path = self._file(puuid, data_type)
+            if path is not None:
+                by_file.setdefault(path, []).append(data_type)
+                continue
+            if profile is None:
+                profile = self._profile(puuid)
+            if data_type in profile:
+                items.append(profile[data_type])
+
+        for path, wanted in by_file.items():
+            table = _read_table(path, columns=['item'], filters=[('dataType', 'in', wanted)])
+            if table is not None:
+                items.extend(self._item(puuid, payload) for payload in table['item'].to_pylist())
+
+        logger.info(f"Batch-loaded {len(items)}/{len(data_types)} items for {puuid[:8]}... from the local store")
+        return items
+
+    def get_columns(self, puuid: str) -> Optional[MatchColumns]:
+        table = _read_table(self._dir(puuid) / 'columns.parquet')
+        return columns_from_table(table) if table is not None else None
+
+    def put_item(self, item: Dict, expected_revision: Optional[int] = None):
+        puuid = item['puuid']
+        with self._locks(puuid):
+            if expected_revision is not None:
+                current = self.get_item(puuid, item['dataType'])
+                if (int(current.get('revision', 0)) if current is not None else 0) != expected_revision:
+                    raise RevisionConflict(item['dataType'])
+            self._merge(puuid, [item])
+
+    def write_items(self, items: List[Dict], name: str = 'items') -> Dict[str, int]:
+        by_player: Dict[str, List[Dict]] = {}
+        for item in items:
+            by_player.setdefault(item['puuid'], []).append(item)
+        for puuid, player_items in by_player.items():
+            with self._locks(puuid):
+                self._merge(puuid, player_items)
+        logger.info(f"Wrote {len(items)} items ({name}) to the local store under {self.root}")
+        return {'written': len(items), 'oversized': 0, 'failed': 0}
+
+    def find_player(self, player_name: str) -> Optional[Dict]:
+        for path in self.root.glob('puuid=*/profile.json'):
+            account = self._profile(path.parent.name.split('=', 1)[1]).get('account')
+            if account is not None and account.get('playerName') == player_name:
+                return account
+        return None
+
+    def _merge(self, puuid: str, items: List[Dict]):
+        """Fold items into the player's partitions (caller holds the player's lock)"""
+        partitions: Dict[str, Dict[str, Dict]] = {MATCH_PREFIX: {}, SUMMARY_PREFIX: {}}
+        profile_items = {}
+        for item in items:
+            prefix = next((p for p in partitions if item['dataType'].startswith(p)), None)
+            if prefix is None:
+                profile_items[item['dataType']] = item
+            else:
+                partitions[prefix][item['dataType']] = item
+
+        # Every match gets its summary row (DynamoDB players ingested before summaries existed included)
+        for item in partitions[MATCH_PREFIX].values():
+            summary_type = SUMMARY_PREFIX + item['dataType'][len(MATCH_PREFIX):]
+            if summary_type not in partitions[SUMMARY_PREFIX]:
+                summary = build_summary_item(puuid, item.get('matchId', ''), item.get('data', {}), item.get('uploadedAt', ''))
+                if summary is not None:
+                    partitions[SUMMARY_PREFIX][summary_type] = summary
+
+        for prefix, written in partitions.items():
+            if not written:
+                continue
+            rows = [
+                {
+                    'dataType': data_type,
+                    'matchId': item.get('matchId'),
+                    'item': _dumps({key: value for key, value in item.items() if key != 'puuid'})
+                }
+                for data_type, item in written.items()
+            ]
+            table = _replace_rows(self._file(puuid, prefix), ITEM_SCHEMA, rows, 'dataType', written, sort=True)
+            if prefix == SUMMARY_PREFIX:
+                summaries = [self._item(puuid, payload) for payload in table['item'].to_pylist()]
+                _write_table(self._dir(puuid) / 'columns.parquet',
+                             columns_table(MatchColumns.from_matches(summaries, puuid)))
+
+        if profile_items:
+            profile = self._profile(puuid)
+            profile.update(profile_items)
+            path = self._dir(puuid) / 'profile.json'
+
+            def write(tmp):
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(sorted(profile.values(), key=lambda item: item['dataType']), f, default=_json_default)
+
+            _write_atomic(path, write)
+
+
+class LocalTimelines(TimelineStore):
+    """
+    Timelines as one directory per player:
+
+        timelines/puuid=<puuid>/<matchId>.bson.zst  timelines document (packed when it fits), zstd-compressed BSON
+        timelines/puuid=<puuid>/index.parquet       matchId, participant fields, metadata participants
+        timelines/puuid=<puuid>/events.parquet      positioned event rows (the timeline_events layout)
+
+    Heatmaps read only the event columns they classify, filtered to the
+    selected matches and time window; timeline files are opened only when a
+    full timeline is asked for, found through a matchId -> file index that is
+    refreshed only from player directories changed since the last scan.
+    """
+
+    name = 'local store'
+
+    def __init__(self, root):
+        self.root = Path(root) / 'timelines'
+        self._locks = KeyedLocks()
+        self._paths_lock = threading.Lock()
+        self._paths: Dict[str, Path] = {}  # matchId -> timeline file
+        self._scanned: Dict[Path, int] = {}  # player directory -> mtime when its files were indexed
+
+    def _dir(self, puuid: str) -> Path:
+        return self.root / f"puuid={puuid}"
+
+    @staticmethod
+    def _read_document(path: Path) -> Dict:
+        return bson.decode(zstandard.ZstdDecompressor().decompress(path.read_bytes()))
+
+    def find_participants(self, puuid: str, limit: Optional[int] = None) -> List[Dict]:
+        table = _read_table(self._dir(puuid) / 'index.parquet')
+        if table is None:
+            return []
+        if limit:
+            table = table.slice(0, limit)
+
+        docs = []
+        for row in table.to_pylist():
+            doc = {
+                'matchId': row['matchId'],
+                'puuid': puuid,
+                'data': {'metadata': {'participants': row['participants'] or []}}
+            }
+            for key in ('participantId', 'championName', 'teamPosition'):
+                if row[key] is not None:
+                    doc[key] = row[key]
+            docs.append(doc)
+        return docs
+
+    def iter_heatmap_points(self, puuid: str, participant_ids: Dict[str, int],
+                            categories: Iterable[str] = HEATMAP_CATEGORIES,
+                            start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Dict]:
+        categories = [category for category in categories if category in HEATMAP_CATEGORIES]
+        if not participant_ids or not categories:
+            return iter(())
+
+        filters = [('matchId', 'in', list(participant_ids)), ('type', 'in', list(HEATMAP_EVENT_TYPES))]
+        if start_ms is not None:
+            filters.append(('timestamp', '>=', start_ms))
+        if end_ms is not None:
+            filters.append(('timestamp', '<=', end_ms))
+        table = _read_table(self._dir(puuid) / 'events.parquet', columns=POINT_COLUMNS, filters=filters)
+        if table is None:
+            return iter(())
+        return self._points(table, participant_ids, categories)
+
+    @staticmethod
+    def _points(table: pa.Table, participant_ids: Dict[str, int], categories: List[str]) -> Iterator[Dict]:
+        for row in table.to_pylist():
+            category = classify_event(row, participant_ids[row['matchId']], categories)
+            if category is not None:
+                yield heatmap_point(category, row, row['x'], row['y'], row['matchId'])
+
+    def _refresh_paths(self):
+        """Index the timeline files of player directories written since the last scan (e.g. by another process)"""
+        if not self.root.exists():
+            return
+        for directory in self.root.glob('puuid=*'):
+            mtime = directory.stat().st_mtime_ns
+            if self._scanned.get(directory) == mtime:
+                continue
+            for path in directory.glob('*.bson.zst'):
+                self._paths[path.name[:-len('.bson.zst')]] = path
+            self._scanned[directory] = mtime
+
+    def get_timeline(self, match_id: str) -> Optional[Dict]:
+        with self._paths_lock:
+            path = self._paths.get(match_id)
+            if path is None:
+                self._refresh_paths()
+                path = self._paths.get(match_id)
+        try:
+            return self._read_document(path) if path is not None else None
+        except FileNotFoundError:
+            return None
+
+    def iter_timelines(self, puuid: str) -> Iterator[Dict]:
+        for path in sorted(self._dir(puuid).glob('*.bson.zst')):
+            yield self._read_document(path)
+
+    def put_timelines(self, docs: List[Dict], uploaded_at: Optional[datetime] = None) -> Tuple[int, int]:
+        by_player: Dict[str, List[Dict]] = {}
+        for doc in docs:
+            by_player.setdefault(doc['puuid'], []).append(doc)
+
+        compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        uploaded_at = uploaded_at or datetime.utcnow()
+        events = 0
+        for puuid, player_docs in by_player.items():
+            directory = self._dir(puuid)
+            with self._locks(puuid):
+                index_rows: Dict[str, Dict] = {}
+                event_rows: Dict[str, List[Dict]] = {}
+                for doc in player_docs:
+                    doc = {key: value for key, value in doc.items() if key != '_id'}
+                    doc.setdefault('uploadedAt', uploaded_at)
+                    match_id = doc['matchId']
+                    event_rows[match_id] = extract_positioned_events(match_id, puuid, timeline_data(doc, fields=()))
+                    for row in event_rows[match_id]:
+                        row['uploadedAt'] = doc['uploadedAt']
+                    index_rows[match_id] = {
+                        'matchId': match_id,
+                        'participantId': doc.get('participantId'),
+                        'championName': doc.get('championName'),
+                        'teamPosition': doc.get('teamPosition'),
+                        'participants': ((doc.get('data') or {}).get('metadata') or {}).get('participants', [])
+                    }
+
+                    pack_document(doc)
+                    encoded = compressor.compress(bson.encode(doc))
+                    path = directory / f"{match_id}.bson.zst"
+                    _write_atomic(path, lambda tmp: Path(tmp).write_bytes(encoded))
+                    with self._paths_lock:
+                        self._paths[match_id] = path
+
+                rows = [row for match_rows in event_rows.values() for row in match_rows]
+                _replace_rows(directory / 'index.parquet', INDEX_SCHEMA, list(index_rows.values()), 'matchId', index_rows)
+                _replace_rows(directory / 'events.parquet', EVENT_SCHEMA, rows, 'matchId', index_rows)
+                events += len(rows)
+
+        logger.info(f"Wrote {len(docs)} timelines ({events:,} positioned events) to the local store under {self.root}")
+        return len(docs), events
@@ -0,0 +1,193 @@
+"""
+Match Cache
+Persistent cache for immutable Riot match and timeline payloads, keyed by match ID
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from services.blocking import run_blocking
+
+logger = logging.getLogger(__name__)
+
+
+class MatchCache:
+    """
+    Two-tier cache for finished-game payloads.
+
+    Hot tier: small in-memory LRU of decoded JSON.
+    Disk tier: one JSON file per (kind, match ID), evicted least-recently-used
+    once the directory grows past `max_bytes`.
+
+    Async callers use aget/aput, which serve hot hits inline and run disk
+    reads, JSON encoding and writes on the blocking worker pool.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: Optional[int] = None,
+        hot_items: Optional[int] = None
+    ):
+        self.cache_dir = Path(cache_dir or os.getenv('MATCH_CACHE_DIR', '.cache/riot'))
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv('MATCH_CACHE_MAX_MB', '512')) * 1024 * 1024
+        self.hot_items = hot_items if hot_items is not None else int(os.getenv('MATCH_CACHE_HOT_ITEMS', '256'))
+
+        self._hot: "OrderedDict[str, Dict]" = OrderedDict()
+        self._disk: "OrderedDict[Path, int]" = OrderedDict()  # path -> size, least recently used first
+        self._disk_bytes = 0
+        self._lock = threading.Lock()  # Guards both LRU indexes (disk I/O runs outside it)
+
+        if self.max_bytes > 0:
+            self._load_index()
+
+    def _load_index(self):
+        """Rebuild the disk LRU order from file modification times"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            entries = []
+            for path in self.cache_dir.glob('*/*/*.json'):
+                stat = path.stat()
+                entries.append((stat.st_mtime, path, stat.st_size))
+
+            for _, path, size in sorted(entries, key=lambda e: e[0]):
+                self._disk[path] = size
+                self._disk_bytes += size
+
+            for path in self._evict():  # Budget may have shrunk since the last run
+                self._unlink(path)
+            logger.info(f"Match cache: {len(self._disk)} entries ({self._disk_bytes / 1024 / 1024:.1f} MB) in {self.cache_dir}")
+        except OSError as e:
+            logger.warning(f"Match cache disabled, can't use {self.cache_dir}: {e}")
+            self.max_bytes = 0
+
+    @staticmethod
+    def _key(kind: str, match_id: str) -> str:
+        return f"{kind}:{match_id}"
+
+    def _path(self, kind: str, match_id: str) -> Path:
+        # Hash the ID so any match ID maps to a safe filename, sharded to keep directories small
+        digest = hashlib.sha1(match_id.encode('utf-8')).hexdigest()
+        return self.cache_dir / kind / digest[:2] / f"{digest}.json"
+
+    def _remember(self, key: str, value: Dict):
+        with self._lock:
+            self._hot[key] = value
+            self._hot.move_to_end(key)
+            while len(self._hot) > self.hot_items:
+                self._hot.popitem(last=False)
+
+    def _get_hot(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._hot.get(key)
+            if value is not None:
+                self._hot.move_to_end(key)
+            return value
+
+    def get(self, kind: str, match_id: str) -> Optional[Dict]:
+        """Return a cached payload, or None on a miss"""
+        key = self._key(kind, match_id)
+        value = self._get_hot(key)
+        if value is not None:
+            return value
+
+        if self.max_bytes <= 0:
+            return None
+
+        path = self._path(kind, match_id)
+        with self._lock:
+            if path not in self._disk:
+                return None
+
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            os.utime(path)  # Keep mtime in sync with LRU order across restarts
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            self._discard(path)
+            return None
+
+        with self._lock:
+            if path in self._disk:
+                self._disk.move_to_end(path)
+        self._remember(key, value)
+        return value
+
+    def put(self, kind: str, match_id: str, value: Dict):
+        """Store a payload in both tiers"""
+        self._remember(self._key(kind, match_id), value)
+        self._write(kind, match_id, value)
+
+    async def aget(self, kind: str, match_id: str) -> Optional[Dict]:
+        """get() for async callers: hot hits inline, disk reads off the event loop"""
+        value = self._get_hot(self._key(kind, match_id))
+        if value is not None or self.max_bytes <= 0:
+            return value
+        return await run_blocking(self.get, kind, match_id)
+
+    async def aput(self, kind: str, match_id: str, value: Dict):
+        """put() for async callers: encoding and the file write run off the event loop"""
+        self._remember(self._key(kind, match_id), value)
+        if self.max_bytes > 0:
+            await run_blocking(self._write, kind, match_id, value)
+
+    def _write(self, kind: str, match_id: str, value: Dict):
+        """Disk tier write"""
+        if self.max_bytes <= 0:
+            return
+
+        path = self._path(kind, match_id)
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.max_bytes:
+            return
+
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write a unique temp file then rename, so readers never see a partial file
+            # and concurrent writers of the same match never share a temp path
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+            if tmp_path is not None:
+                Path(tmp_path).unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(path, 0)
+            self._disk[path] = len(data)
+            self._disk_bytes += len(data)
+            evicted = self._evict()
+        for old in evicted:
+            self._unlink(old)
+
+    def _discard(self, path: Path):
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(path, 0)
+        self._unlink(path)
+
+    @staticmethod
+    def _unlink(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _evict(self) -> List[Path]:
+        """Drop least-recently-used entries until the disk tier fits its budget (caller holds the lock); returns their paths"""
+        evicted = []
+        while self._disk_bytes > self.max_bytes and self._disk:
+            path, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(path)
+        return evicted
@@ -1,23 +1,26 @@
 """
 Match Chat Agent - AI assistant for match analysis with agentic capabilities
 """
-import boto3
 import json
 import logging
-import boto3
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from .tool_handlers import ToolHandlers
+from .bedrock_ai import invoke_model_json
+from .bedrock_stream import stream_message
+from .blocking import run_blocking
+from .chat_context import cached_system, cached_tools, compact_history, get_chat_metrics, prompt_cache_enabled
+from .clients import ClientRegistry, get_clients
+from .response_cache import ResponseCache, get_response_cache, replay_response
 
 logger = logging.getLogger(__name__)
 
 
 class MatchChatAgent:
-    def __init__(self):
-        self.bedrock = boto3.client(
-            service_name='bedrock-runtime',
-            region_name='us-east-1'
-        )
+    def __init__(self, clients: Optional[ClientRegistry] = None, response_cache: Optional[ResponseCache] = None):
+        self.bedrock = (clients or get_clients()).bedrock_runtime('us-east-1')
         self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
+        self.prompt_cache = prompt_cache_enabled(self.model_id)
+        self.response_cache = response_cache or get_response_cache()
         
         self.tools = [
             # Navigation Tools
@@ -215,77 +218,26 @@ class MatchChatAgent:
         Returns:
             Dict with response and optional action
         """
-        if conversation_history is None:
-            conversation_history = []
+        # Opening questions about the same match snapshot are answered from the cache
+        cache_key = None
+        if not conversation_history:
+            cache_key = self.response_cache.key('match_chat', message, context)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return replay_response(cached, message)
         
-        # Build system prompt with context
-        system_prompt = self._build_system_prompt(context)
-        
-        # Build messages - handle tool_result continuation
-        # If the last message in history has tool_use, we need to prepend tool_result to new message
-        if conversation_history and len(conversation_history) > 0:
-            last_msg = conversation_history[-1]
-            if last_msg.get('role') == 'assistant':
-                # Check if assistant used tools
-                content_list = last_msg.get('content', [])
-                if isinstance(content_list, list):
-                    has_tool_use = any(c.get('type') == 'tool_use' for c in content_list)
-                    
-                    if has_tool_use:
-                        # Extract tool_use IDs and create tool_results
-                        tool_results = []
-                        for c in content_list:
-                            if c.get('type') == 'tool_use':
-                                tool_results.append({
-                                    "type": "tool_result",
-                                    "tool_use_id": c['id'],
-                                    "content": "Action was shown to user"
-                                })
-                        
-                        # Combine tool_results with new message in ONE user message
-                        user_content = tool_results + [{"type": "text", "text": message}]
-                        messages = conversation_history + [{"role": "user", "content": user_content}]
-                    else:
-                        # No tools, just add regular user message
-                        messages = conversation_history + [{"role": "user", "content": message}]
-                else:
-                    messages = conversation_history + [{"role": "user", "content": message}]
-            else:
-                # Last message was user, just add new message
-                messages = conversation_history + [{"role": "user", "content": message}]
-        else:
-            # First message
-            messages = [{"role": "user", "content": message}]
+        messages, compacted_tokens = compact_history(self._build_messages(message, conversation_history or []))
         
         try:
-            # Call Bedrock
-            body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1024,
-                "temperature": 0.7,
-                "system": system_prompt,
-                "messages": messages,
-                "tools": self.tools
-            }
-            
-            response = self.bedrock.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(body)
-            )
+            body = self._request_body(context, messages)
             
-            result = json.loads(response['body'].read())
+            # Off the event loop: Bedrock calls take seconds
+            result = await run_blocking(invoke_model_json, self.bedrock, self.model_id, json.dumps(body))
             
-            # Extract response and actions
-            response_text = ""
+            # Extract actions from tool calls
             actions = []
-            tool_uses = []
-            assistant_content = []
-            
             for content in result.get('content', []):
-                if content.get('type') == 'text':
-                    response_text += content['text']
-                    assistant_content.append(content)
-                elif content.get('type') == 'tool_use':
+                if content.get('type') == 'tool_use':
                     tool_action = ToolHandlers.process_tool_call(
                         content['name'],
                         content.get('input', {}),
@@ -293,43 +245,129 @@ class MatchChatAgent:
                     )
                     if tool_action:
                         actions.append(tool_action)
-                    tool_uses.append(content)
-                    assistant_content.append(content)
-            
-            # Handle single or multiple actions
-            action = None
-            if len(actions) == 1:
-                action = actions[0]
-                if action.get('description'):
-                    response_text = action['description']
-            elif len(actions) > 1:
-                # Multiple actions - create a multi_action wrapper
-                action = {
-                    'type': 'multi_action',
-                    'actions': actions,
-                    'requiresPermission': any(a.get('requiresPermission') for a in actions),
-                    'description': ' '.join(a.get('description', '') for a in actions if a.get('description'))
-                }
-                response_text = action['description']
             
-            # Build proper conversation history
-            # Just add the assistant message - tool_result will be added with next user message
-            new_history = messages + [{"role": "assistant", "content": assistant_content}]
+            response = self._build_result(messages, result.get('content', []), actions)
+            response["token_usage"] = get_chat_metrics().record('match_chat', result.get('usage'), compacted_tokens)
+            if cache_key is not None:
+                self.response_cache.put(cache_key, response)
+            return response
             
+        except Exception as e:
+            logger.error(f"Chat error: {e}", exc_info=True)
             return {
-                "response": response_text or "I can help you analyze this match. What would you like to know?",
-                "action": action,
-                "conversation_history": new_history
+                "response": "I encountered an error processing your request. Please try again.",
+                "action": None,
+                "conversation_history": messages
             }
+    
+    async def chat_stream(
+        self,
+        message: str,
+        context: Dict,
+        conversation_history: Optional[List[Dict]] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Streaming chat interface
+        
+        Yields {'type': 'text'} deltas as Bedrock produces them, an {'type': 'action'}
+        as soon as each tool call is complete, then {'type': 'done'} carrying the same
+        fields chat() returns ({'type': 'error'} with them on failure).
+        """
+        messages, compacted_tokens = compact_history(self._build_messages(message, conversation_history or []))
+        
+        try:
+            body = self._request_body(context, messages)
+            actions = []
+            assistant_content = []
+            usage = {}
+            
+            async for event in stream_message(self.bedrock, self.model_id, json.dumps(body)):
+                if event['type'] == 'text':
+                    yield event
+                elif event['type'] == 'tool_use':
+                    tool_action = ToolHandlers.process_tool_call(event['name'], event['input'], context)
+                    if tool_action:
+                        actions.append(tool_action)
+                        yield {"type": "action", "action": tool_action}
+                elif event['type'] == 'message':
+                    assistant_content = event['message']['content']
+                    usage = event['message']['usage']
+            
+            token_usage = get_chat_metrics().record('match_chat', usage, compacted_tokens)
+            yield {"type": "done", **self._build_result(messages, assistant_content, actions), "token_usage": token_usage}
             
         except Exception as e:
-            logger.error(f"Chat error: {e}", exc_info=True)
-            return {
+            logger.error(f"Chat stream error: {e}", exc_info=True)
+            yield {
+                "type": "error",
                 "response": "I encountered an error processing your request. Please try again.",
                 "action": None,
                 "conversation_history": messages
             }
     
+    def _build_messages(self, message: str, conversation_history: List[Dict]) -> List[Dict]:
+        """Append the user's message, answering any tool_use left in the last assistant turn"""
+        # If the last message in history has tool_use, we need to prepend tool_result to new message
+        if conversation_history:
+            last_msg = conversation_history[-1]
+            content_list = last_msg.get('content', [])
+            if last_msg.get('role') == 'assistant' and isinstance(content_list, list):
+                tool_results = [
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": c['id'],
+                        "content": "Action was shown to user"
+                    }
+                    for c in content_list if c.get('type') == 'tool_use'
+                ]
+                if tool_results:
+                    # Combine tool_results with new message in ONE user message
+                    user_content = tool_results + [{"type": "text", "text": message}]
+                    return conversation_history + [{"role": "user", "content": user_content}]
+        
+        return conversation_history + [{"role": "user", "content": message}]
+    
+    def _request_body(self, context: Dict, messages: List[Dict]) -> Dict:
+        return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1024,
+            "temperature": 0.7,
+            # Match context and tool schemas are the same every turn: cache them
+            "system": cached_system(self._build_system_prompt(context), self.prompt_cache),
+            "messages": messages,
+            "tools": cached_tools(self.tools, self.prompt_cache)
+        }
+    
+    def _build_result(self, messages: List[Dict], content: List[Dict], actions: List[Dict]) -> Dict:
+        """Response text, combined action and history for one assistant turn"""
+        assistant_content = [c for c in content if c.get('type') in ('text', 'tool_use')]
+        response_text = ''.join(c['text'] for c in assistant_content if c.get('type') == 'text')
+        
+        # Handle single or multiple actions
+        action = None
+        if len(actions) == 1:
+            action = actions[0]
+            if action.get('description'):
+                response_text = action['description']
+        elif len(actions) > 1:
+            # Multiple actions - create a multi_action wrapper
+            action = {
+                'type': 'multi_action',
+                'actions': actions,
+                'requiresPermission': any(a.get('requiresPermission') for a in actions),
+                'description': ' '.join(a.get('description', '') for a in actions if a.get('description'))
+            }
+            response_text = action['description']
+        
+        # Just add the assistant message - tool_result will be added with next user message
+        new_history = messages + [{"role": "assistant", "content": assistant_content}]
+        
+        return {
+            "response": response_text or "I can help you analyze this match. What would you like to know?",
+            "action": action,
+            "conversation_history": new_history
+        }
+    
     def _build_system_prompt(self, context: Dict) -> str:
         """Build system prompt with match context"""
         main_player = context.get('mainPlayer', {})
@@ -0,0 +1,202 @@
+"""
+Columnar Match Stats
+Turns a player's stored matches into NumPy columns once so analytics can filter and aggregate vectorized
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Participant stats kept as integer columns (Decimal from DynamoDB -> int once, at build time)
+INT_FIELDS = (
+    'kills', 'deaths', 'assists',
+    'wardsPlaced', 'wardsKilled', 'detectorWardsPlaced', 'visionScore', 'visionWardsBoughtInGame',
+    'turretKills', 'inhibitorKills', 'totalDamageDealtToChampions', 'goldEarned',
+    'totalMinionsKilled', 'neutralMinionsKilled', 'pentaKills', 'quadraKills', 'tripleKills'
+)
+
+BOOL_FIELDS = ('win', 'firstBloodKill', 'firstTowerKill')
+
+# challenges.* fields; missing/None count as 0
+CHALLENGE_INT_FIELDS = (
+    'stealthWardsPlaced', 'dragonTakedowns', 'teamBaronKills', 'teamElderDragonKills',
+    'objectivesStolen', 'killsBeforeLevel10'
+)
+CHALLENGE_FLOAT_FIELDS = ('kda', 'goldPerMinute', 'teamDamagePercentage')
+
+ITEM_SLOTS = 7
+
+
+class MatchColumns:
+    """
+    One row per match the player appears in, in stored order.
+
+    Numeric stats live in `columns` (name -> 1-D array). Champion and role are
+    integer codes into `champions` / `roles`. Items and primary-tree runes are
+    2-D id matrices padded with 0.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        champions: List[str],
+        champion_codes: np.ndarray,
+        roles: List[str],
+        role_codes: np.ndarray,
+        items: np.ndarray,
+        runes: np.ndarray,
+        match_ids: List[Optional[str]]
+    ):
+        self.columns = columns
+        self.champions = champions
+        self.champion_codes = champion_codes
+        self.roles = roles
+        self.role_codes = role_codes
+        self.items = items
+        self.runes = runes
+        self.match_ids = match_ids
+
+    def __len__(self) -> int:
+        return len(self.match_ids)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @classmethod
+    def from_matches(cls, matches: List[Dict], puuid: str) -> 'MatchColumns':
+        """Build columns from `match#`/`summary#` items (one Python pass, then arrays)"""
+        rows = {name: [] for name in INT_FIELDS + BOOL_FIELDS + CHALLENGE_INT_FIELDS + CHALLENGE_FLOAT_FIELDS}
+        rows['gameDuration'] = []
+        rows['gameCreation'] = []
+
+        champion_index: Dict[str, int] = {}
+        role_index: Dict[str, int] = {}
+        champion_codes, role_codes, item_rows, rune_rows, match_ids = [], [], [], [], []
+
+        for match_item in matches:
+            match_data = match_item.get('data', {})
+            info = match_data.get('info', {})
+            participant = next(
+                (p for p in info.get('participants', []) if p.get('puuid') == puuid),
+                None
+            )
+            if participant is None:
+                continue
+
+            for name in INT_FIELDS:
+                rows[name].append(int(participant.get(name, 0) or 0))
+            for name in BOOL_FIELDS:
+                rows[name].append(bool(participant.get(name)))
+
+            challenges = participant.get('challenges', {}) or {}
+            for name in CHALLENGE_INT_FIELDS:
+                rows[name].append(int(challenges.get(name, 0) or 0))
+            for name in CHALLENGE_FLOAT_FIELDS:
+                rows[name].append(float(challenges.get(name, 0) or 0))
+
+            rows['gameDuration'].append(int(info.get('gameDuration', 0) or 0))
+            rows['gameCreation'].append(int(info.get('gameCreation', 0) or 0))
+
+            champion = participant.get('championName', 'Unknown')
+            champion_codes.append(champion_index.setdefault(champion, len(champion_index)))
+            role = participant.get('teamPosition', '') or ''
+            role_codes.append(role_index.setdefault(role, len(role_index)))
+
+            item_rows.append([int(participant.get(f'item{i}', 0) or 0) for i in range(ITEM_SLOTS)])
+
+            styles = (participant.get('perks') or {}).get('styles') or []
+            selections = styles[0].get('selections', []) if styles else []
+            rune_rows.append([int(selection.get('perk') or 0) for selection in selections])
+
+            match_ids.append(match_data.get('metadata', {}).get('matchId'))
+
+        columns = {}
+        for name, values in rows.items():
+            if name in BOOL_FIELDS:
+                columns[name] = np.array(values, dtype=bool)
+            elif name in CHALLENGE_FLOAT_FIELDS:
+                columns[name] = np.array(values, dtype=np.float64)
+            else:
+                columns[name] = np.array(values, dtype=np.int64)
+
+        rune_width = max((len(r) for r in rune_rows), default=0)
+        runes = np.zeros((len(rune_rows), rune_width), dtype=np.int64)
+        for i, row in enumerate(rune_rows):
+            runes[i, :len(row)] = row
+
+        return cls(
+            columns=columns,
+            champions=list(champion_index),
+            champion_codes=np.array(champion_codes, dtype=np.int32),
+            roles=list(role_index),
+            role_codes=np.array(role_codes, dtype=np.int32),
+            items=np.array(item_rows, dtype=np.int64).reshape(-1, ITEM_SLOTS),
+            runes=runes,
+            match_ids=match_ids
+        )
+
+    def select(
+        self,
+        champion: Optional[str] = None,
+        role: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> np.ndarray:
+        """Row indices matching the champion/role filters, capped at the first `limit` rows"""
+        mask = np.ones(len(self), dtype=bool)
+        if champion is not None:
+            code = self.champions.index(champion) if champion in self.champions else -1
+            mask &= self.champion_codes == code
+        if role is not None:
+            code = self.roles.index(role) if role in self.roles else -1
+            mask &= self.role_codes == code
+
+        rows = np.flatnonzero(mask)
+        if limit:
+            rows = rows[:limit]
+        return rows
+
+    def total(self, name: str, rows: np.ndarray):
+        """Column sum over rows as a plain Python number (JSON-serializable)"""
+        return self.columns[name][rows].sum().item()
+
+    def group_by_champion(self, rows: np.ndarray, values: Dict[str, np.ndarray]) -> List[Dict]:
+        """
+        Per-champion match counts and sums of `values` (arrays aligned with rows),
+        in order of each champion's first appearance.
+        """
+        codes = self.champion_codes[rows]
+        if len(codes) == 0:
+            return []
+
+        unique_codes, first_seen = np.unique(codes, return_index=True)
+        order = unique_codes[np.argsort(first_seen)]
+        counts = np.bincount(codes, minlength=len(self.champions))
+        sums = {
+            name: np.bincount(codes, weights=np.asarray(array, dtype=np.float64), minlength=len(self.champions))
+            for name, array in values.items()
+        }
+
+        return [
+            {
+                'champion': self.champions[code],
+                'matches': int(counts[code]),
+                **{name: float(sums[name][code]) for name in values}
+            }
+            for code in order
+        ]
+
+
+def count_ids(matrix: np.ndarray, top: int) -> List[Tuple[int, int]]:
+    """
+    Count non-zero ids in an (n, k) matrix and return the `top` most frequent
+    (id, count) pairs; ties keep first-seen order (row by row, slot by slot).
+    """
+    flat = matrix.ravel()
+    flat = flat[flat > 0]
+    if flat.size == 0:
+        return []
+
+    ids, first_seen, counts = np.unique(flat, return_index=True, return_counts=True)
+    order = np.argsort(first_seen, kind='stable')
+    ids, counts = ids[order], counts[order]
+    ranked = np.argsort(-counts, kind='stable')[:top]
+    return [(int(ids[i]), int(counts[i])) for i in ranked]
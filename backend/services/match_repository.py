@@ -0,0 +1,287 @@
+"""
+Match Repository
+Single read path for a player's stored matches (DynamoDB or the local tier), with request-scoped and TTL caching
+"""
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.clients import ClientRegistry
+from services.keyed_locks import KeyedLocks
+from services.match_summary import MATCH_PREFIX, SUMMARY_PREFIX, build_summary_item
+from services.match_columns import MatchColumns
+from services.storage import DynamoPlayerData, PlayerDataStore, get_player_data_store
+
+# Cache slot for the columnar view (not a DynamoDB prefix)
+COLUMNS_KEY = 'columns'
+
+logger = logging.getLogger(__name__)
+
+# Items already loaded during the current HTTP request, keyed by (dataType prefix, puuid)
+_request_matches: ContextVar[Optional[Dict[Tuple[str, str], List[Dict]]]] = ContextVar('request_matches', default=None)
+
+
+@contextmanager
+def request_scope():
+    """Share match lists between every caller within one request"""
+    token = _request_matches.set({})
+    try:
+        yield
+    finally:
+        _request_matches.reset(token)
+
+
+class MatchRepository:
+    """
+    Loads a player's per-match items from `lol-player-data`: full matches
+    (`match#<id>`) and compact ingest-time summaries (`summary#<id>`), through
+    the configured PlayerDataStore (an injected `table` means DynamoDB).
+
+    Results are kept for the current request and in a small TTL cache shared
+    across requests, so a dashboard that fires several analytics calls (or a chat
+    turn that runs several tools) reads the store once per player.
+    Returned items are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(
+        self,
+        table=None,
+        ttl_seconds: Optional[float] = None,
+        max_players: Optional[int] = None,
+        clients: Optional[ClientRegistry] = None,
+        store: Optional[PlayerDataStore] = None
+    ):
+        if store is None:
+            store = DynamoPlayerData(table=table) if table is not None else get_player_data_store(clients)
+        self.store = store
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('MATCH_REPO_TTL_SECONDS', '300'))
+        self.max_players = max_players if max_players is not None else int(os.getenv('MATCH_REPO_MAX_PLAYERS', '64'))
+
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[float, List[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = KeyedLocks()
+
+    def get_matches(self, puuid: str) -> List[Dict]:
+        """Get all stored match items for a player (raw DynamoDB items with a `data` field)"""
+        return self._get_items(puuid, MATCH_PREFIX)
+
+    def iter_matches(self, puuid: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """
+        Yield a player's match items page by page, stopping after `limit` items.
+        Serves from the cache when the full list is already loaded; otherwise
+        reads only as many pages as needed.
+        """
+        return self._iter_items(puuid, MATCH_PREFIX, limit)
+
+    def get_summaries(self, puuid: str) -> List[Dict]:
+        """
+        Get compact summary items for a player. Each item's `data` is a trimmed
+        match (see services.match_summary) holding only this player's analytics fields.
+        Matches stored before summaries existed (no `summary#` row yet) are
+        projected from their full `match#` item, one match at a time.
+        """
+        return self._get_items(puuid, SUMMARY_PREFIX, self._load_summaries)
+
+    def iter_summaries(self, puuid: str, limit: Optional[int] = None) -> Iterator[Dict]:
+        """Streaming variant of get_summaries() with the same early stop as iter_matches()"""
+        if self._cached_items((SUMMARY_PREFIX, puuid)) is None and self._unsummarized(puuid):
+            # Some matches need projecting: load the merged list so order matches get_summaries()
+            yield from islice(self.get_summaries(puuid), limit)
+            return
+        yield from self._iter_items(puuid, SUMMARY_PREFIX, limit)
+
+    def load_summaries(self, puuid: str, consistent: bool = False) -> List[Dict]:
+        """
+        get_summaries() read straight from the store, bypassing both caches. With
+        `consistent`, the read sees every write already acknowledged (DynamoDB ConsistentRead).
+        """
+        store = self.store.consistent_reads() if consistent else self.store
+        return MatchRepository(store=store, ttl_seconds=0)._load_summaries(puuid, SUMMARY_PREFIX)
+
+    def get_columns(self, puuid: str) -> MatchColumns:
+        """Columnar (NumPy) view of the player's summaries, built once and cached like the items"""
+        key = (COLUMNS_KEY, puuid)
+        scoped = _request_matches.get()
+        if scoped is not None and key in scoped:
+            return scoped[key]
+
+        columns = self._get_cached(key)
+        if columns is None:
+            # Columnar stores keep the view prebuilt; otherwise one pass over the summaries
+            columns = self.store.get_columns(puuid)
+            if columns is None:
+                columns = MatchColumns.from_matches(self.get_summaries(puuid), puuid)
+            # Only a fresh build starts a TTL window, so other writers' matches show up once it lapses
+            self._store(key, columns)
+
+        if scoped is not None:
+            scoped[key] = columns
+        return columns
+
+    def get_summaries_by_id(self, puuid: str, match_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Summary items for specific matches, keyed by match ID. Served from the
+        loaded summary list when there is one; otherwise fetched with BatchGetItem
+        (100 keys per call), falling back to full matches for pre-summary players.
+        """
+        wanted = set(match_ids)
+        cached = self._cached_items((SUMMARY_PREFIX, puuid))
+        if cached is not None:
+            return {item.get('matchId'): item for item in cached if item.get('matchId') in wanted}
+
+        found = {
+            item.get('matchId'): item
+            for item in self.store.batch_get(puuid, [f'{SUMMARY_PREFIX}{match_id}' for match_id in match_ids])
+        }
+        missing = [match_id for match_id in match_ids if match_id not in found]
+        if missing:
+            for item in self.store.batch_get(puuid, [f'{MATCH_PREFIX}{match_id}' for match_id in missing]):
+                summary = self._summarize(puuid, item)
+                if summary is not None:
+                    found[summary['matchId']] = summary
+        return found
+
+    def invalidate(self, puuid: str):
+        """Forget cached matches for a player (call after writing new match items)"""
+        keys = [(prefix, puuid) for prefix in (MATCH_PREFIX, SUMMARY_PREFIX, COLUMNS_KEY)]
+        with self._lock:
+            for key in keys:
+                self._cache.pop(key, None)
+        scoped = _request_matches.get()
+        if scoped is not None:
+            for key in keys:
+                scoped.pop(key, None)
+
+    @staticmethod
+    def _summarize(puuid: str, item: Dict) -> Optional[Dict]:
+        """Turn a full `match#` item into the equivalent `summary#` item"""
+        return build_summary_item(
+            puuid, item.get('matchId', ''), item.get('data', {}), item.get('uploadedAt', '')
+        )
+
+    def _unsummarized(self, puuid: str, summaries: Optional[List[Dict]] = None) -> List[str]:
+        """`match#` dataTypes that have no `summary#` row (keys only, no match payloads)"""
+        if summaries is None:
+            summarized = {data_type[len(SUMMARY_PREFIX):] for data_type in self.store.iter_keys(puuid, SUMMARY_PREFIX)}
+        else:
+            summarized = {item['dataType'][len(SUMMARY_PREFIX):] for item in summaries}
+        return [
+            data_type for data_type in self.store.iter_keys(puuid, MATCH_PREFIX)
+            if data_type[len(MATCH_PREFIX):] not in summarized
+        ]
+
+    def _load_summaries(self, puuid: str, prefix: str) -> List[Dict]:
+        """Stored summaries plus projections of any matches still missing one, in dataType order"""
+        summaries = self._query_items(puuid, prefix)
+        missing = self._unsummarized(puuid, summaries)
+        if not missing:
+            return summaries
+
+        projected = [
+            summary for summary in (self._summarize(puuid, item) for item in self.store.batch_get(puuid, missing))
+            if summary is not None
+        ]
+        logger.info(f"Projected {len(projected)} matches without summary rows for {puuid[:8]}... "
+                    f"(run upload_to_dynamodb.py --backfill-summaries {puuid})")
+        return sorted(summaries + projected, key=lambda item: item['dataType'])
+
+    def _cached_items(self, key: Tuple[str, str]):
+        """Items already loaded in this request or the TTL cache"""
+        scoped = _request_matches.get()
+        cached = scoped.get(key) if scoped is not None else None
+        return cached if cached is not None else self._get_cached(key)
+
+    def _get_items(self, puuid: str, prefix: str, load=None) -> List[Dict]:
+        key = (prefix, puuid)
+        scoped = _request_matches.get()
+        if scoped is not None and key in scoped:
+            return scoped[key]
+
+        items = self._get_cached(key)
+        if items is None:
+            # One loader per player; concurrent callers wait and reuse its result
+            with self._load_locks(key):
+                items = self._get_cached(key)
+                if items is None:
+                    items = (load or self._query_items)(puuid, prefix)
+                    self._store(key, items)
+
+        if scoped is not None:
+            scoped[key] = items
+        return items
+
+    def _iter_items(self, puuid: str, prefix: str, limit: Optional[int]) -> Iterator[Dict]:
+        key = (prefix, puuid)
+        cached = self._cached_items(key)
+        if cached is not None:
+            yield from islice(cached, limit)
+            return
+
+        if limit is not None and limit <= 0:
+            return
+
+        loaded = []
+        for page in self.store.iter_pages(puuid, prefix, limit):
+            loaded.extend(page)
+            yield from page
+
+        # A complete read is as good as _get_items(), so keep it
+        if limit is None or len(loaded) < limit:
+            self._remember(puuid, prefix, loaded)
+
+    def _remember(self, puuid: str, prefix: str, items):
+        """Cache a complete item list (or view of one) for this request and the TTL window"""
+        key = (prefix, puuid)
+        self._store(key, items)
+        scoped = _request_matches.get()
+        if scoped is not None:
+            scoped[key] = items
+
+    def _get_cached(self, key: Tuple[str, str]):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            expires_at, items = entry
+            if time.monotonic() >= expires_at:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return items
+
+    def _store(self, key: Tuple[str, str], items):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl_seconds, items)
+            self._cache.move_to_end(key)
+            # Three entries (matches, summaries, columns) per player at most
+            while len(self._cache) > self.max_players * 3:
+                self._cache.popitem(last=False)
+
+    def _query_items(self, puuid: str, prefix: str) -> List[Dict]:
+        """Query every page of items with a dataType prefix for a player"""
+        items = []
+        for page in self.store.iter_pages(puuid, prefix):
+            items.extend(page)
+
+        logger.info(f"Loaded {len(items)} {prefix} items for {puuid[:8]}... from {self.store.name}")
+        return items
+
+
+# Shared instance (reuses one store and cache across the app)
+_match_repository = None
+
+
+def get_match_repository() -> MatchRepository:
+    """Get or create the MatchRepository singleton"""
+    global _match_repository
+    if _match_repository is None:
+        _match_repository = MatchRepository()
+    return _match_repository
@@ -0,0 +1,147 @@
+"""
+Match Snapshots
+Per-player match sets loaded once per conversation and sliced by every agent tool (TTL-bound, invalidated on ingest)
+"""
+import asyncio
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+from services.keyed_locks import KeyedLocks
+
+logger = logging.getLogger(__name__)
+
+# Window key for "every match stored for the player" (DynamoDB), as opposed to a recent-N game count
+ALL_STORED = 'stored'
+
+Window = Union[int, str]
+
+
+class MatchSnapshot:
+    """A player's matches, newest first, with the player's participant resolved once per match"""
+
+    def __init__(self, puuid: str, matches: List[Dict], participants: Optional[List[Optional[Dict]]] = None):
+        self.puuid = puuid
+        self.matches = matches
+        if participants is None:
+            participants = [
+                next((p for p in match.get('info', {}).get('participants', []) if p.get('puuid') == puuid), None)
+                for match in matches
+            ]
+        self.participants = participants
+
+    def __len__(self) -> int:
+        return len(self.matches)
+
+    def window(self, games: int) -> 'MatchSnapshot':
+        """The `games` most recent matches (no copying of match data)"""
+        if games >= len(self.matches):
+            return self
+        return MatchSnapshot(self.puuid, self.matches[:games], self.participants[:games])
+
+    @property
+    def rows(self) -> List[Tuple[Dict, Dict]]:
+        """(match, participant) for every match the player appears in"""
+        return [(match, participant) for match, participant in zip(self.matches, self.participants) if participant]
+
+
+class MatchSnapshotStore:
+    """
+    Snapshots keyed by (puuid, window). A game-count window is served from any
+    live snapshot of the same player with a window at least as large, so tools
+    asking for 20, 30 and 50 games share one load. Recent-N loads are rounded up
+    to `min_window` games for the same reason.
+
+    Entries expire after `ttl_seconds`; invalidate(puuid) drops a player's
+    snapshots as soon as new matches are ingested.
+    """
+
+    def __init__(self, ttl_seconds: Optional[int] = None, min_window: Optional[int] = None,
+                 max_players: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv('AGENT_SNAPSHOT_TTL_SECONDS', '600'))
+        self.min_window = min_window or int(os.getenv('AGENT_SNAPSHOT_MIN_WINDOW', '50'))
+        self.max_players = max_players or int(os.getenv('AGENT_SNAPSHOT_MAX_PLAYERS', '64'))
+        self._lock = threading.Lock()
+        # puuid -> {window: (expires_at, snapshot)}, least recently used player first
+        self._players: 'OrderedDict[str, Dict[Window, Tuple[float, MatchSnapshot]]]' = OrderedDict()
+        # One loader per player; locks go away with their last waiter
+        self._load_locks = KeyedLocks()
+        self._async_load_locks = KeyedLocks(asyncio.Lock)
+
+    def get(self, puuid: str, window: Window) -> Optional[MatchSnapshot]:
+        now = time.monotonic()
+        with self._lock:
+            windows = self._players.get(puuid)
+            if not windows:
+                return None
+            for key in [key for key, (expires_at, _) in windows.items() if expires_at <= now]:
+                del windows[key]
+            self._players.move_to_end(puuid)
+
+            if window in windows:
+                return windows[window][1]
+            if isinstance(window, int):
+                larger = [key for key in windows if isinstance(key, int) and key >= window]
+                if larger:
+                    return windows[min(larger)][1].window(window)
+        return None
+
+    def put(self, puuid: str, window: Window, snapshot: MatchSnapshot):
+        with self._lock:
+            self._players.setdefault(puuid, {})[window] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._players.move_to_end(puuid)
+            while len(self._players) > self.max_players:
+                self._players.popitem(last=False)
+
+    def invalidate(self, puuid: str):
+        """Forget a player's snapshots (call after new matches are written)"""
+        with self._lock:
+            self._players.pop(puuid, None)
+
+    async def get_recent(self, puuid: str, games: int,
+                         load: Callable[[int], Awaitable[List[Dict]]]) -> MatchSnapshot:
+        """
+        The player's `games` most recent matches. On a miss, `load(window)` fetches
+        max(games, min_window) matches once; concurrent tool calls wait for it.
+        """
+        snapshot = self.get(puuid, games)
+        if snapshot is not None:
+            return snapshot
+
+        async with self._async_load_locks.hold_async(puuid):
+            snapshot = self.get(puuid, games)
+            if snapshot is None:
+                window = max(games, self.min_window)
+                full = MatchSnapshot(puuid, await load(window))
+                logger.info(f"Match snapshot loaded: {len(full)} matches for {puuid[:8]}... (window {window})")
+                self.put(puuid, window, full)
+                snapshot = full.window(games)
+        return snapshot
+
+    def get_stored(self, puuid: str, load: Callable[[], List[Dict]]) -> MatchSnapshot:
+        """Every stored match for the player (blocking `load()`, run once for concurrent callers)"""
+        snapshot = self.get(puuid, ALL_STORED)
+        if snapshot is not None:
+            return snapshot
+
+        with self._load_locks((puuid, ALL_STORED)):
+            snapshot = self.get(puuid, ALL_STORED)
+            if snapshot is None:
+                snapshot = MatchSnapshot(puuid, load())
+                self.put(puuid, ALL_STORED, snapshot)
+        return snapshot
+
+
+# Shared instance
+_match_snapshots = None
+
+
+def get_match_snapshots() -> MatchSnapshotStore:
+    """Get or create the MatchSnapshotStore singleton"""
+    global _match_snapshots
+    if _match_snapshots is None:
+        _match_snapshots = MatchSnapshotStore()
+    return _match_snapshots
@@ -0,0 +1,89 @@
+"""
+Match Summary Projection
+Compact per-player match rows written at ingest so analytics don't re-parse full Riot match JSON
+"""
+from typing import Dict, Optional
+
+MATCH_PREFIX = 'match#'
+SUMMARY_PREFIX = 'summary#'
+
+# Match-level fields analytics read from `info`
+INFO_FIELDS = (
+    'gameCreation', 'gameDuration', 'gameMode', 'queueId'
+)
+
+# Participant fields read by the analytics endpoints, HabitsDetector,
+# StrengthAnalyzer, NarrativeGenerator and the year recap tools
+PARTICIPANT_FIELDS = (
+    'puuid', 'participantId', 'championName', 'championId', 'teamPosition', 'win',
+    'kills', 'deaths', 'assists',
+    'pentaKills', 'quadraKills', 'tripleKills',
+    'firstBloodKill', 'firstTowerKill', 'turretKills', 'inhibitorKills',
+    'goldEarned', 'totalMinionsKilled', 'neutralMinionsKilled', 'totalDamageDealtToChampions',
+    'visionScore', 'wardsPlaced', 'wardsKilled', 'detectorWardsPlaced', 'visionWardsBoughtInGame',
+    'item0', 'item1', 'item2', 'item3', 'item4', 'item5', 'item6'
+)
+
+CHALLENGE_FIELDS = (
+    'kda', 'goldPerMinute', 'teamDamagePercentage', 'killsBeforeLevel10',
+    'dragonTakedowns', 'teamBaronKills', 'teamElderDragonKills',
+    'objectivesStolen', 'stealthWardsPlaced'
+)
+
+
+def build_match_summary(match_data: Dict, puuid: str) -> Optional[Dict]:
+    """
+    Project a full Riot match down to one player's analytics fields.
+
+    The result keeps the Riot match shape (metadata.matchId, info.*, and an
+    info.participants list holding just this player), so code written against
+    full matches works on summaries unchanged. Returns None if the player
+    isn't in the match.
+    """
+    info = match_data.get('info', {})
+    participant = next(
+        (p for p in info.get('participants', []) if p.get('puuid') == puuid),
+        None
+    )
+    if participant is None:
+        return None
+
+    compact = {field: participant[field] for field in PARTICIPANT_FIELDS if field in participant}
+
+    challenges = participant.get('challenges') or {}
+    compact['challenges'] = {field: challenges[field] for field in CHALLENGE_FIELDS if field in challenges}
+
+    # Only the primary rune tree is used (keystone + primary runes)
+    styles = (participant.get('perks') or {}).get('styles') or []
+    if styles:
+        compact['perks'] = {
+            'styles': [{
+                'selections': [
+                    {'perk': selection.get('perk')}
+                    for selection in styles[0].get('selections', [])
+                ]
+            }]
+        }
+
+    summary_info = {field: info[field] for field in INFO_FIELDS if field in info}
+    summary_info['participants'] = [compact]
+
+    return {
+        'metadata': {'matchId': match_data.get('metadata', {}).get('matchId')},
+        'info': summary_info
+    }
+
+
+def build_summary_item(puuid: str, match_id: str, match_data: Dict, uploaded_at: str) -> Optional[Dict]:
+    """Build the `summary#<matchId>` DynamoDB item stored next to `match#<matchId>`"""
+    summary = build_match_summary(match_data, puuid)
+    if summary is None:
+        return None
+
+    return {
+        'puuid': puuid,
+        'dataType': f'{SUMMARY_PREFIX}{match_id}',
+        'matchId': match_id,
+        'data': summary,
+        'uploadedAt': uploaded_at
+    }
@@ -4,11 +4,12 @@ Spotify Wrapped-style storytelling for League of Legends year recap
 """
 import logging
 from typing import Dict, List, Optional
-import boto3
-from boto3.dynamodb.conditions import Key
 from collections import defaultdict, Counter
 from datetime import datetime
 import statistics
+from services.clients import ClientRegistry, get_clients
+from services.match_repository import MatchRepository, get_match_repository
+from services.year_recap_aggregate import YearRecapAggregates, get_year_recap_aggregates, to_matches_data
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +17,14 @@ logger = logging.getLogger(__name__)
 class NarrativeGenerator:
     """Generates engaging Spotify Wrapped-style narratives from player data"""
 
-    def __init__(self):
-        self.dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-        self.table = self.dynamodb.Table('lol-player-data')
+    def __init__(self, match_repository: Optional[MatchRepository] = None,
+                 clients: Optional[ClientRegistry] = None, aggregates: Optional[YearRecapAggregates] = None):
+        self.match_repository = match_repository or get_match_repository()
+        self.aggregates = aggregates or get_year_recap_aggregates()
 
         # Optional: Try to initialize Bedrock for AI narratives
         try:
-            self.bedrock = boto3.client(
-                service_name='bedrock-runtime',
-                region_name='us-east-1'
-            )
+            self.bedrock = (clients or get_clients()).bedrock_runtime('us-east-1')
             self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
             logger.info("Bedrock AI initialized for narrative generation")
         except Exception as e:
@@ -45,8 +44,8 @@ class NarrativeGenerator:
             Dict with multiple narrative "cards" and data for visualization
         """
         try:
-            # Fetch and analyze all match data
-            matches_data = self._fetch_all_matches(puuid)
+            # Materialized totals (one read; built from all matches on first use)
+            matches_data = self._load_aggregate(puuid)
 
             if not matches_data or matches_data['total_matches'] == 0:
                 return {
@@ -86,30 +85,18 @@ class NarrativeGenerator:
                 "error": str(e)
             }
 
+    def _load_aggregate(self, puuid: str) -> Dict:
+        """The player's year recap aggregate in the shape _fetch_all_matches returns"""
+        aggregate = self.aggregates.get_or_build(puuid)
+        if aggregate['total_matches'] == 0:
+            return {'total_matches': 0}
+        return to_matches_data(aggregate)
+
     def _fetch_all_matches(self, puuid: str) -> Dict:
-        """Fetch and aggregate all match data"""
+        """Fetch and aggregate all match data (full scan; rebuild_year_recap_aggregates.py checks the aggregate against it)"""
         try:
-            # Fetch ALL matches with pagination
-            matches = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = self.table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                        ExclusiveStartKey=last_evaluated_key
-                    )
-                else:
-                    response = self.table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                    )
-
-                matches.extend(response['Items'])
-
-                # Check if there are more results
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            # Fetch ALL matches (compact summary rows, paginated and cached)
+            matches = self.match_repository.get_summaries(puuid)
 
             logger.info(f"Fetched {len(matches)} total matches for narrative generation")
 
@@ -2,38 +2,138 @@
 Dynamic Player Data Service
 - Fetches player data from Riot API
 - Saves to local filesystem
-- Uploads to DynamoDB and MongoDB Atlas
+- Uploads to DynamoDB and MongoDB Atlas (or the local store, STORAGE_BACKEND=local)
 """
 
 import os
 import json
+import asyncio
 import httpx
-import boto3
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
-from pymongo import MongoClient
 from dotenv import load_dotenv
+from services.blocking import run_blocking
+from services.clients import ClientRegistry, get_clients
+from services.riot_api import RiotAPIClient, get_riot_client
+from services.fetch_engine import fetch_all
+from services.match_repository import get_match_repository
+from services.heatmap_density import get_density_cache
+from services.match_snapshot import get_match_snapshots
+from services.match_summary import build_summary_item
+from services.response_cache import get_response_cache
+from services.year_recap_aggregate import get_year_recap_aggregates
+from services.storage import PlayerDataStore, get_player_data_store
+from services.timeline_ingest import build_timeline_document
+from services.timeline_store import TimelineStore, get_timeline_store
 
 load_dotenv()
 
+
+def build_player_items(player_data: Dict) -> List[Dict]:
+    """`lol-player-data` items for fetched player data (everything except timelines)"""
+    puuid = player_data['puuid']
+    player_name = f"{player_data['gameName']}#{player_data['tagLine']}"
+
+    # 1 + 2. Account and summoner
+    items = [
+        {
+            'puuid': puuid,
+            'dataType': 'account',
+            'playerName': player_name,
+            'data': player_data['account'],
+            'uploadedAt': datetime.utcnow().isoformat()
+        },
+        {
+            'puuid': puuid,
+            'dataType': 'summoner',
+            'data': player_data['summoner'],
+            'uploadedAt': datetime.utcnow().isoformat()
+        }
+    ]
+
+    # 3. Matches, each with a compact summary row for analytics
+    for match in player_data['matches']:
+        match_id = match['metadata']['matchId']
+        uploaded_at = datetime.utcnow().isoformat()
+        items.append({
+            'puuid': puuid,
+            'dataType': f'match#{match_id}',
+            'matchId': match_id,
+            'data': match,
+            'uploadedAt': uploaded_at
+        })
+
+        summary_item = build_summary_item(puuid, match_id, match, uploaded_at)
+        if summary_item:
+            items.append(summary_item)
+
+    # 4. Champion mastery
+    items.append({
+        'puuid': puuid,
+        'dataType': 'champion_mastery',
+        'data': player_data['championMastery'],
+        'uploadedAt': datetime.utcnow().isoformat()
+    })
+
+    # 5. Ranked
+    if player_data['ranked']:
+        items.append({
+            'puuid': puuid,
+            'dataType': 'ranked',
+            'data': player_data['ranked'],
+            'uploadedAt': datetime.utcnow().isoformat()
+        })
+
+    # 6. Challenges
+    if player_data['challenges']:
+        items.append({
+            'puuid': puuid,
+            'dataType': 'challenges',
+            'data': player_data['challenges'],
+            'uploadedAt': datetime.utcnow().isoformat()
+        })
+
+    return items
+
+
+def build_timeline_documents(player_data: Dict, uploaded_at: Optional[datetime] = None) -> List[Dict]:
+    """`timelines` documents for fetched player data"""
+    matches_by_id = {
+        match.get('metadata', {}).get('matchId'): match for match in player_data.get('matches', [])
+    }
+    uploaded_at = uploaded_at or datetime.utcnow()
+    return [
+        build_timeline_document(
+            timeline_obj['matchId'], player_data['puuid'], timeline_obj['data'],
+            matches_by_id.get(timeline_obj['matchId']), uploaded_at
+        )
+        for timeline_obj in player_data['timelines']
+    ]
+
+
 class PlayerDataService:
-    def __init__(self):
+    def __init__(self, riot_client: Optional[RiotAPIClient] = None, clients: Optional[ClientRegistry] = None,
+                 player_store: Optional[PlayerDataStore] = None, timeline_store: Optional[TimelineStore] = None):
         self.riot_api_key = os.getenv('RIOT_API_KEY')
-        self.aws_region = os.getenv('AWS_REGION', 'us-east-1')
-        self.mongodb_connection = os.getenv('MONGODB_CONNECTION_STRING')
 
-        # Riot API base URLs
-        self.base_url_americas = "https://americas.api.riotgames.com"
-        self.base_url_na = "https://na1.api.riotgames.com"
+        # Riot API client (pooled connections + rate-limit scheduler), shared process-wide by default
+        self.riot_client = riot_client or get_riot_client()
+
+        # Shared DynamoDB / MongoDB Atlas clients
+        self.clients = clients or get_clients()
 
-        # AWS DynamoDB
-        self.dynamodb = boto3.resource('dynamodb', region_name=self.aws_region)
-        self.dynamodb_table = self.dynamodb.Table('lol-player-data')
+        # Where uploads go (STORAGE_BACKEND: DynamoDB + MongoDB Atlas, or the local store)
+        self.player_store = player_store or get_player_data_store(clients)
+        self.timeline_store = timeline_store or get_timeline_store(clients)
 
-        # MongoDB Atlas
-        self.mongo_client = MongoClient(self.mongodb_connection)
-        self.mongo_db = self.mongo_client['lol_timelines']
+    @property
+    def dynamodb_table(self):
+        return self.clients.dynamodb_table()
+
+    @property
+    def mongo_db(self):
+        return self.clients.mongo_db()
 
     async def fetch_player_data(self, game_name: str, tag_line: str, match_count: int = 10):
         """
@@ -47,103 +147,90 @@ class PlayerDataService:
         Returns:
             Dict with all fetched data and status
         """
-        async with httpx.AsyncClient() as client:
-            headers = {"X-Riot-Token": self.riot_api_key}
+        riot = self.riot_client
 
-            try:
-                # 1. Get account by Riot ID
-                print(f"Fetching account for {game_name}#{tag_line}...")
-                account_url = f"{self.base_url_americas}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-                account_response = await client.get(account_url, headers=headers)
-                account_response.raise_for_status()
-                account_data = account_response.json()
-                puuid = account_data['puuid']
-
-                print(f"✓ Found account: {puuid}")
-
-                # 2. Get summoner by PUUID
-                print("Fetching summoner data...")
-                summoner_url = f"{self.base_url_na}/lol/summoner/v4/summoners/by-puuid/{puuid}"
-                summoner_response = await client.get(summoner_url, headers=headers)
-                summoner_response.raise_for_status()
-                summoner_data = summoner_response.json()
-
-                # 3. Get match IDs
-                print(f"Fetching last {match_count} match IDs...")
-                match_ids_url = f"{self.base_url_americas}/lol/match/v5/matches/by-puuid/{puuid}/ids?start=0&count={match_count}"
-                match_ids_response = await client.get(match_ids_url, headers=headers)
-                match_ids_response.raise_for_status()
-                match_ids = match_ids_response.json()
-
-                print(f"✓ Found {len(match_ids)} matches")
-
-                # 4. Get match details
-                matches = []
-                for i, match_id in enumerate(match_ids, 1):
-                    print(f"Fetching match {i}/{len(match_ids)}: {match_id}")
-                    match_url = f"{self.base_url_americas}/lol/match/v5/matches/{match_id}"
-                    match_response = await client.get(match_url, headers=headers)
-                    if match_response.status_code == 200:
-                        matches.append(match_response.json())
-                    else:
-                        print(f"  ⚠️ Failed to fetch match {match_id}")
-
-                # 5. Get match timelines
-                timelines = []
-                for i, match_id in enumerate(match_ids, 1):
-                    print(f"Fetching timeline {i}/{len(match_ids)}: {match_id}")
-                    timeline_url = f"{self.base_url_americas}/lol/match/v5/matches/{match_id}/timeline"
-                    timeline_response = await client.get(timeline_url, headers=headers)
-                    if timeline_response.status_code == 200:
-                        timelines.append({
-                            'matchId': match_id,
-                            'data': timeline_response.json()
-                        })
-                    else:
-                        print(f"  ⚠️ Failed to fetch timeline {match_id}")
-
-                # 6. Get champion mastery
-                print("Fetching champion mastery...")
-                mastery_url = f"{self.base_url_na}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top?count=10"
-                mastery_response = await client.get(mastery_url, headers=headers)
-                champion_mastery = mastery_response.json() if mastery_response.status_code == 200 else []
-
-                # 7. Get ranked data
-                print("Fetching ranked data...")
-                ranked_url = f"{self.base_url_na}/lol/league/v4/entries/by-summoner/{summoner_data['id']}"
-                ranked_response = await client.get(ranked_url, headers=headers)
-                ranked_data = ranked_response.json() if ranked_response.status_code == 200 else []
-
-                # 8. Get challenges
-                print("Fetching challenges...")
-                challenges_url = f"{self.base_url_na}/lol/challenges/v1/player-data/{puuid}"
-                challenges_response = await client.get(challenges_url, headers=headers)
-                challenges_data = challenges_response.json() if challenges_response.status_code == 200 else {}
-
-                print(f"\n✅ Successfully fetched all data for {game_name}#{tag_line}")
-
-                return {
-                    'success': True,
-                    'puuid': puuid,
-                    'gameName': game_name,
-                    'tagLine': tag_line,
-                    'account': account_data,
-                    'summoner': summoner_data,
-                    'matches': matches,
-                    'timelines': timelines,
-                    'championMastery': champion_mastery,
-                    'ranked': ranked_data,
-                    'challenges': challenges_data
-                }
-
-            except httpx.HTTPStatusError as e:
-                error_msg = f"API Error: {e.response.status_code} - {e.response.text}"
-                print(f"❌ {error_msg}")
-                return {'success': False, 'error': error_msg}
-            except Exception as e:
-                error_msg = f"Error: {str(e)}"
-                print(f"❌ {error_msg}")
-                return {'success': False, 'error': error_msg}
+        try:
+            # 1. Get account by Riot ID
+            print(f"Fetching account for {game_name}#{tag_line}...")
+            account_data = await riot.get_account_by_riot_id(game_name, tag_line)
+            puuid = account_data['puuid']
+
+            print(f"✓ Found account: {puuid}")
+
+            # 2. Get summoner by PUUID
+            print("Fetching summoner data...")
+            summoner_data = await riot.get_summoner_by_puuid(puuid)
+
+            # 3. Get match IDs
+            print(f"Fetching last {match_count} match IDs...")
+            match_ids = await riot.get_match_history(puuid, count=match_count)
+
+            print(f"✓ Found {len(match_ids)} matches")
+
+            # 4 + 5. Get match details and timelines concurrently (one shared in-flight budget)
+            print(f"Fetching {len(match_ids)} matches and timelines...")
+            match_results, timeline_results = await asyncio.gather(
+                fetch_all(match_ids, riot.get_match_details, semaphore=riot.fetch_slots),
+                riot.get_multiple_timelines(match_ids)
+            )
+
+            matches = []
+            for match_id, match_data in zip(match_ids, match_results):
+                if match_data is not None:
+                    matches.append(match_data)
+                else:
+                    print(f"  ⚠️ Failed to fetch match {match_id}")
+
+            timelines = []
+            for match_id, timeline_data in zip(match_ids, timeline_results):
+                if timeline_data is not None:
+                    timelines.append({
+                        'matchId': match_id,
+                        'data': timeline_data
+                    })
+                else:
+                    print(f"  ⚠️ Failed to fetch timeline {match_id}")
+
+            # 6-8. Champion mastery, ranked data and challenges (optional, default on failure)
+            print("Fetching champion mastery, ranked data and challenges...")
+            champion_mastery, ranked_data, challenges_data = await asyncio.gather(
+                self._fetch_optional(riot.get_top_champion_masteries(puuid, count=10), []),
+                self._fetch_optional(riot.get_league_entries_by_summoner(summoner_data['id']), []),
+                self._fetch_optional(riot.get_player_challenges(puuid), {})
+            )
+
+            print(f"\n✅ Successfully fetched all data for {game_name}#{tag_line}")
+
+            return {
+                'success': True,
+                'puuid': puuid,
+                'gameName': game_name,
+                'tagLine': tag_line,
+                'account': account_data,
+                'summoner': summoner_data,
+                'matches': matches,
+                'timelines': timelines,
+                'championMastery': champion_mastery,
+                'ranked': ranked_data,
+                'challenges': challenges_data
+            }
+
+        except httpx.HTTPStatusError as e:
+            error_msg = f"API Error: {e.response.status_code} - {e.response.text}"
+            print(f"❌ {error_msg}")
+            return {'success': False, 'error': error_msg}
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            print(f"❌ {error_msg}")
+            return {'success': False, 'error': error_msg}
+
+    @staticmethod
+    async def _fetch_optional(request, default):
+        """Await an optional Riot call, falling back to a default on any error"""
+        try:
+            return await request
+        except Exception:
+            return default
 
     def save_to_filesystem(self, player_data: Dict, base_dir: str = 'player_data') -> str:
         """Save fetched data to filesystem in organized structure"""
@@ -218,142 +305,91 @@ class PlayerDataService:
         print(f"✅ Saved all data to filesystem")
         return str(player_dir)
 
+    @staticmethod
+    def load_from_filesystem(player_dir: str) -> Dict:
+        """Read a directory written by save_to_filesystem back into fetch_player_data's shape"""
+        player_dir = Path(player_dir)
+
+        def read(relative: str, default=None):
+            path = player_dir / relative
+            if not path.exists():
+                return default
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        readme = read('README.json', {})
+        account = read('account/account.json', {})
+        game_name, _, tag_line = readme.get('player', '').partition('#')
+
+        matches = [read(path.relative_to(player_dir)) for path in sorted((player_dir / 'match_summary').glob('match_*.json'))]
+        timelines = [
+            {'matchId': path.stem[len('timeline_'):], 'data': read(path.relative_to(player_dir))}
+            for path in sorted((player_dir / 'match_timeline').glob('timeline_*.json'))
+        ]
+
+        return {
+            'success': True,
+            'puuid': readme.get('puuid') or account['puuid'],
+            'gameName': account.get('gameName', game_name),
+            'tagLine': account.get('tagLine', tag_line),
+            'account': account,
+            'summoner': read('summoner/summoner.json', {}),
+            'matches': matches,
+            'timelines': timelines,
+            'championMastery': read('champion_mastery/champion.json', []),
+            'ranked': read('ranked/ranked.json', []),
+            'challenges': read('challenges/challenges.json', {})
+        }
+
     def upload_to_dynamodb(self, player_data: Dict) -> int:
         """Upload player data to DynamoDB (except timelines)"""
 
         puuid = player_data['puuid']
-        game_name = player_data['gameName']
-        tag_line = player_data['tagLine']
-        player_name = f"{game_name}#{tag_line}"
 
-        print(f"\nUploading to DynamoDB...")
+        print(f"\nUploading to {self.player_store.name}...")
         upload_count = 0
 
-        # Helper to convert floats to Decimal
-        def convert_floats(obj):
-            from decimal import Decimal
-            if isinstance(obj, float):
-                return Decimal(str(obj))
-            elif isinstance(obj, dict):
-                return {k: convert_floats(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [convert_floats(item) for item in obj]
-            return obj
-
         try:
-            # 1. Upload account
-            self.dynamodb_table.put_item(Item=convert_floats({
-                'puuid': puuid,
-                'dataType': 'account',
-                'playerName': player_name,
-                'data': player_data['account'],
-                'uploadedAt': datetime.utcnow().isoformat()
-            }))
-            upload_count += 1
-            print(f"  ✓ Uploaded account")
-
-            # 2. Upload summoner
-            self.dynamodb_table.put_item(Item=convert_floats({
-                'puuid': puuid,
-                'dataType': 'summoner',
-                'data': player_data['summoner'],
-                'uploadedAt': datetime.utcnow().isoformat()
-            }))
-            upload_count += 1
-            print(f"  ✓ Uploaded summoner")
-
-            # 3. Upload matches
-            for match in player_data['matches']:
-                match_id = match['metadata']['matchId']
-                self.dynamodb_table.put_item(Item=convert_floats({
-                    'puuid': puuid,
-                    'dataType': f'match#{match_id}',
-                    'matchId': match_id,
-                    'data': match,
-                    'uploadedAt': datetime.utcnow().isoformat()
-                }))
-                upload_count += 1
+            stats = self.player_store.write_items(build_player_items(player_data), name=f"player {puuid[:8]}")
+            upload_count = stats['written']
             print(f"  ✓ Uploaded {len(player_data['matches'])} matches")
 
-            # 4. Upload champion mastery
-            self.dynamodb_table.put_item(Item=convert_floats({
-                'puuid': puuid,
-                'dataType': 'champion_mastery',
-                'data': player_data['championMastery'],
-                'uploadedAt': datetime.utcnow().isoformat()
-            }))
-            upload_count += 1
-            print(f"  ✓ Uploaded champion mastery")
-
-            # 5. Upload ranked
-            if player_data['ranked']:
-                self.dynamodb_table.put_item(Item=convert_floats({
-                    'puuid': puuid,
-                    'dataType': 'ranked',
-                    'data': player_data['ranked'],
-                    'uploadedAt': datetime.utcnow().isoformat()
-                }))
-                upload_count += 1
-                print(f"  ✓ Uploaded ranked data")
-
-            # 6. Upload challenges
-            if player_data['challenges']:
-                self.dynamodb_table.put_item(Item=convert_floats({
-                    'puuid': puuid,
-                    'dataType': 'challenges',
-                    'data': player_data['challenges'],
-                    'uploadedAt': datetime.utcnow().isoformat()
-                }))
-                upload_count += 1
-                print(f"  ✓ Uploaded challenges")
-
-            print(f"✅ Uploaded {upload_count} items to DynamoDB")
+            # New matches are visible to analytics, agent tools and chat answers right away instead of after the cache TTL
+            get_match_repository().invalidate(puuid)
+            get_match_snapshots().invalidate(puuid)
+            get_response_cache().invalidate(puuid)
+
+            # Fold the new matches into the year recap totals
+            get_year_recap_aggregates().apply_matches(puuid, player_data['matches'])
+
+            if stats['oversized'] or stats['failed']:
+                print(f"  ⚠️ {stats['oversized']} items too large, {stats['failed']} failed")
+            print(f"✅ Uploaded {upload_count} items to {self.player_store.name}")
             return upload_count
 
         except Exception as e:
-            print(f"❌ DynamoDB upload error: {e}")
+            print(f"❌ {self.player_store.name} upload error: {e}")
             return upload_count
 
     def upload_to_mongodb(self, player_data: Dict) -> int:
         """Upload timelines to MongoDB Atlas"""
 
         puuid = player_data['puuid']
-        print(f"\nUploading timelines to MongoDB Atlas...")
+        print(f"\nUploading timelines to {self.timeline_store.name}...")
         upload_count = 0
 
         try:
-            for timeline_obj in player_data['timelines']:
-                match_id = timeline_obj['matchId']
-                timeline_data = timeline_obj['data']
-
-                doc = {
-                    'matchId': match_id,
-                    'puuid': puuid,
-                    'data': timeline_data,
-                    'uploadedAt': datetime.utcnow()
-                }
-
-                # Add metadata
-                if 'info' in timeline_data:
-                    info = timeline_data['info']
-                    doc['gameCreation'] = info.get('gameCreation')
-                    doc['gameDuration'] = info.get('gameDuration')
-                    doc['frameInterval'] = info.get('frameInterval')
-                    doc['frames'] = len(info.get('frames', []))
-
-                # Upsert (update or insert)
-                self.mongo_db.timelines.update_one(
-                    {'matchId': match_id},
-                    {'$set': doc},
-                    upsert=True
-                )
-                upload_count += 1
-
-            print(f"✅ Uploaded {upload_count} timelines to MongoDB")
+            uploaded_at = datetime.utcnow()
+            docs = build_timeline_documents(player_data, uploaded_at)
+            upload_count, events_count = self.timeline_store.put_timelines(docs, uploaded_at)
+
+            # Heatmap density grids were binned from the previous event set
+            get_density_cache().invalidate(puuid)
+            print(f"✅ Uploaded {upload_count} timelines to {self.timeline_store.name} ({events_count} positioned events)")
             return upload_count
 
         except Exception as e:
-            print(f"❌ MongoDB upload error: {e}")
+            print(f"❌ {self.timeline_store.name} upload error: {e}")
             return upload_count
 
     async def process_player(self, game_name: str, tag_line: str, match_count: int = 10, save_local: bool = True):
@@ -386,21 +422,21 @@ class PlayerDataService:
         # Step 2: Save to filesystem (optional)
         if save_local:
             try:
-                player_dir = self.save_to_filesystem(player_data)
+                player_dir = await run_blocking(self.save_to_filesystem, player_data)
                 result['steps']['save'] = {'success': True, 'directory': player_dir}
             except Exception as e:
                 result['steps']['save'] = {'success': False, 'error': str(e)}
 
         # Step 3: Upload to DynamoDB
         try:
-            dynamo_count = self.upload_to_dynamodb(player_data)
+            dynamo_count = await run_blocking(self.upload_to_dynamodb, player_data)
             result['steps']['dynamodb'] = {'success': True, 'itemsUploaded': dynamo_count}
         except Exception as e:
             result['steps']['dynamodb'] = {'success': False, 'error': str(e)}
 
         # Step 4: Upload to MongoDB
         try:
-            mongo_count = self.upload_to_mongodb(player_data)
+            mongo_count = await run_blocking(self.upload_to_mongodb, player_data)
             result['steps']['mongodb'] = {'success': True, 'timelinesUploaded': mongo_count}
         except Exception as e:
             result['steps']['mongodb'] = {'success': False, 'error': str(e)}
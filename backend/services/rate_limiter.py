@@ -0,0 +1,166 @@
+"""
+Riot API rate-limit scheduler
+Paces requests using the app and method limits Riot advertises in response headers
+"""
+import asyncio
+import bisect
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate_limit_header(value: Optional[str]) -> List[Tuple[int, int]]:
+    """Parse a Riot rate-limit header like '20:1,100:120' into [(20, 1), (100, 120)]"""
+    windows = []
+    if not value:
+        return windows
+
+    for part in value.split(','):
+        try:
+            count, seconds = part.strip().split(':')
+            windows.append((int(count), int(seconds)))
+        except ValueError:
+            continue
+
+    return windows
+
+
+class RateLimitBucket:
+    """
+    Token bucket for one Riot limit scope (an app key or a single method on a host).
+    Each (limit, seconds) window holds `limit` tokens; a token is returned `seconds`
+    after it was spent, which matches how Riot counts requests per window.
+    """
+
+    def __init__(self, windows: Optional[List[Tuple[int, int]]] = None):
+        self.windows = windows or []
+        self.spent: List[float] = []  # Monotonic timestamps of spent tokens, oldest first
+        self.blocked_until = 0.0
+
+    def set_windows(self, windows: List[Tuple[int, int]]):
+        """Replace limits with the ones reported by the server"""
+        if windows:
+            self.windows = windows
+
+    def _trim(self, now: float):
+        """Drop tokens that have been returned to every window"""
+        if not self.windows or not self.spent:
+            return
+        longest = max(seconds for _, seconds in self.windows)
+        expired = bisect.bisect_right(self.spent, now - longest)
+        if expired:
+            del self.spent[:expired]
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available in every window"""
+        wait = max(0.0, self.blocked_until - now)
+        self._trim(now)
+
+        for limit, seconds in self.windows:
+            start = bisect.bisect_right(self.spent, now - seconds)
+            in_window = len(self.spent) - start
+            if in_window >= limit:
+                # Wait until enough of the oldest tokens in this window are returned
+                oldest = self.spent[start + in_window - limit]
+                wait = max(wait, oldest + seconds - now)
+
+        return wait
+
+    def spend(self, now: float):
+        self.spent.append(now)
+
+    def sync_counts(self, counts: List[Tuple[int, int]], now: float):
+        """
+        Reconcile with the server-side counts (X-*-Rate-Limit-Count).
+        If other processes share the key, the server sees more requests than we do,
+        so pad our history to match instead of trusting the local view.
+        """
+        for count, seconds in counts:
+            start = bisect.bisect_right(self.spent, now - seconds)
+            missing = count - (len(self.spent) - start)
+            if missing > 0:
+                self.spent.extend([now] * missing)
+
+    def block(self, until: float):
+        self.blocked_until = max(self.blocked_until, until)
+
+
+class RiotRateLimiter:
+    """
+    Schedules Riot API requests against both the application limit (per host)
+    and the method limit (per host + endpoint), following the limits and
+    Retry-After values the API returns.
+    """
+
+    # Development key limits, used until the first response tells us the real ones
+    DEFAULT_APP_LIMITS = [(20, 1), (100, 120)]
+
+    def __init__(self, app_limits: Optional[List[Tuple[int, int]]] = None):
+        if app_limits is None:
+            app_limits = parse_rate_limit_header(os.getenv('RIOT_APP_RATE_LIMIT')) or self.DEFAULT_APP_LIMITS
+        self.app_limits = app_limits
+        self._app_buckets: Dict[str, RateLimitBucket] = {}
+        self._method_buckets: Dict[Tuple[str, str], RateLimitBucket] = {}
+        self._lock = asyncio.Lock()
+
+    def _app_bucket(self, host: str) -> RateLimitBucket:
+        bucket = self._app_buckets.get(host)
+        if bucket is None:
+            bucket = RateLimitBucket(list(self.app_limits))
+            self._app_buckets[host] = bucket
+        return bucket
+
+    def _method_bucket(self, host: str, method: str) -> RateLimitBucket:
+        key = (host, method)
+        bucket = self._method_buckets.get(key)
+        if bucket is None:
+            # Method limits are unknown until the first response reports them
+            bucket = RateLimitBucket()
+            self._method_buckets[key] = bucket
+        return bucket
+
+    async def acquire(self, host: str, method: str):
+        """Wait until both the app and method buckets have a token, then spend it"""
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                app_bucket = self._app_bucket(host)
+                method_bucket = self._method_bucket(host, method)
+
+                wait = max(app_bucket.delay(now), method_bucket.delay(now))
+                if wait <= 0:
+                    app_bucket.spend(now)
+                    method_bucket.spend(now)
+                    return
+
+            await asyncio.sleep(wait)
+
+    def update(self, host: str, method: str, headers) -> None:
+        """Learn limits and counts from a Riot response's headers"""
+        now = time.monotonic()
+        app_bucket = self._app_bucket(host)
+        method_bucket = self._method_bucket(host, method)
+
+        app_bucket.set_windows(parse_rate_limit_header(headers.get('X-App-Rate-Limit')))
+        app_bucket.sync_counts(parse_rate_limit_header(headers.get('X-App-Rate-Limit-Count')), now)
+
+        method_bucket.set_windows(parse_rate_limit_header(headers.get('X-Method-Rate-Limit')))
+        method_bucket.sync_counts(parse_rate_limit_header(headers.get('X-Method-Rate-Limit-Count')), now)
+
+    def backoff(self, host: str, method: str, retry_after: float, limit_type: Optional[str] = None) -> None:
+        """
+        Pause a bucket after a 429.
+        X-Rate-Limit-Type says which limit was hit: 'application' blocks the whole key
+        on this host, 'method' and 'service' only block the endpoint.
+        """
+        until = time.monotonic() + max(retry_after, 0)
+
+        if limit_type == 'application':
+            self._app_bucket(host).block(until)
+        else:
+            self._method_bucket(host, method).block(until)
+
+        logger.warning(f"Riot rate limit hit ({limit_type or 'unknown'}) on {method}, retrying in {retry_after:.1f}s")
@@ -0,0 +1,203 @@
+"""
+Chat Response Cache
+Reuses answers to repeated first-turn chat questions (normalized exact match, then local token similarity) per context and player data version
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, FrozenSet, NamedTuple, Optional, Tuple
+
+from services.static_data import get_static_data
+
+logger = logging.getLogger(__name__)
+
+# Words that don't change what is being asked
+STOPWORDS = frozenset((
+    'a', 'an', 'the', 'my', 'me', 'i', 'im', 'your', 'you', 'please', 'can', 'could', 'would', 'will',
+    'show', 'tell', 'give', 'what', 'whats', 'which', 'is', 'was', 'were', 'are', 'do', 'did', 'does',
+    'of', 'for', 'in', 'on', 'at', 'to', 'this', 'that', 'it', 'about', 'some', 'us', 'let', 'lets'
+))
+
+
+# Words that pin a question to a specific slice of data: answers for a different one are wrong, however similar the wording
+ENTITY_WORDS = frozenset((
+    'top', 'jungle', 'jg', 'mid', 'middle', 'bot', 'bottom', 'adc', 'support', 'supp',
+    'ranked', 'solo', 'duo', 'flex', 'aram', 'normal', 'normals', 'blind', 'draft',
+    'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight', 'nine', 'ten',
+    'fifteen', 'twenty', 'thirty', 'fifty', 'hundred'
+))
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    return ' '.join(re.sub(r"[^a-z0-9\s]", ' ', question.lower().replace("'", '')).split())
+
+
+def question_terms(normalized: str) -> FrozenSet[str]:
+    """Content words used for similarity (stopwords dropped, simple plural folding)"""
+    terms = set()
+    for word in normalized.split():
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.add(word)
+    return frozenset(terms)
+
+
+def question_entities(normalized: str) -> FrozenSet[str]:
+    """
+    Numbers, champion names, roles and queues in a question. Similar
+    questions only share an answer when these match exactly ("deaths before
+    10 minutes" is not "deaths before 15 minutes").
+    """
+    words = normalized.split()
+    entities = {word for word in words if word in ENTITY_WORDS or any(c.isdigit() for c in word)}
+    champions = get_static_data().dataset('champions').index
+    # Champion names may be one or two words ("ahri", "lee sin" / "leesin")
+    for i, word in enumerate(words):
+        candidates = [word] if word.isalpha() else []
+        if i + 1 < len(words):
+            candidates += [f'{word} {words[i + 1]}', f'{word}{words[i + 1]}']
+        for candidate in candidates:
+            champion = champions.get(candidate)
+            if champion is not None:
+                entities.add(f"champion:{champion['key']}")
+    return frozenset(entities)
+
+
+def context_hash(context) -> str:
+    return hashlib.sha256(json.dumps(context, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def replay_response(response: Dict, message: str) -> Dict:
+    """A cached response as returned for `message`: history carries the question actually asked"""
+    history = response.get('conversation_history') or []
+    if history and history[0].get('role') == 'user' and isinstance(history[0].get('content'), str):
+        history[0] = {**history[0], 'content': message}
+    response.pop('token_usage', None)
+    response['cached'] = True
+    return response
+
+
+class CacheKey(NamedTuple):
+    agent: str
+    puuid: str
+    data_version: int
+    context: str
+    question: str
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of chat responses.
+
+    Entries live in buckets of (agent, puuid, data version, context hash). A
+    lookup tries the normalized question first, then the most similar cached
+    question in the same bucket (Jaccard over content words, at least
+    `similarity` - "best champion" and "worst champion" stay apart). Questions
+    naming different numbers, champions, roles or queues never match fuzzily,
+    and nothing does when the champion index (static_data/champion.json) is missing.
+    invalidate(puuid) bumps the player's data version, so answers computed
+    from older data are never served again.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[int] = None,
+                 similarity: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '3600'))
+        self.similarity = similarity or float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.8'))
+        self._lock = threading.Lock()
+        # key -> (expires_at, content terms, entities, response)
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, FrozenSet[str], FrozenSet[str], Dict]]' = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+
+    def key(self, agent: str, question: str, context, puuid: Optional[str] = None) -> CacheKey:
+        puuid = puuid or ''
+        with self._lock:
+            version = self._versions.get(puuid, 0)
+        return CacheKey(agent, puuid, version, context_hash(context), normalize_question(question))
+
+    def get(self, key: CacheKey) -> Optional[Dict]:
+        """A deep copy of the cached response, or None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[3])
+
+            terms = question_terms(key.question)
+            entities = question_entities(key.question)
+            best_key, best_score = None, 0.0
+            # Without the champion index, questions about different champions would look alike: exact matches only
+            if terms and get_static_data().dataset('champions').index:
+                for other, (expires_at, other_terms, other_entities, _) in self._entries.items():
+                    if other[:4] != key[:4] or expires_at <= now or not other_terms or other_entities != entities:
+                        continue
+                    score = len(terms & other_terms) / len(terms | other_terms)
+                    if score > best_score:
+                        best_key, best_score = other, score
+
+            if best_key is not None and best_score >= self.similarity:
+                self._entries.move_to_end(best_key)
+                self.similar_hits += 1
+                logger.info(f"Response cache: '{key.question}' answered by '{best_key.question}' ({best_score:.2f})")
+                return copy.deepcopy(self._entries[best_key][3])
+
+            self.misses += 1
+            return None
+
+    def put(self, key: CacheKey, response: Dict):
+        with self._lock:
+            if self._versions.get(key.puuid, 0) != key.data_version:
+                # Player data changed while this answer was being generated
+                return
+            self._entries[key] = (
+                time.monotonic() + self.ttl_seconds, question_terms(key.question),
+                question_entities(key.question), copy.deepcopy(response)
+            )
+            self._entries.move_to_end(key)
+            now = time.monotonic()
+            for stale in [k for k, (expires_at, *_) in self._entries.items() if expires_at <= now]:
+                del self._entries[stale]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, puuid: str):
+        """New data for the player: bump its version and drop its cached answers"""
+        with self._lock:
+            self._versions[puuid] = self._versions.get(puuid, 0) + 1
+            for key in [key for key in self._entries if key.puuid == puuid]:
+                del self._entries[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'similar_hits': self.similar_hits,
+                'misses': self.misses
+            }
+
+
+# Shared instance
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the ResponseCache singleton"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
@@ -1,6 +1,14 @@
-import httpx
-from typing import List, Dict, Optional
 import asyncio
+import httpx
+import os
+from typing import Awaitable, Callable, List, Dict, Optional
+from services.rate_limiter import RiotRateLimiter
+from services.fetch_engine import fetch_all, backoff_delay, is_retryable, DEFAULT_CONCURRENCY
+from services.match_cache import MatchCache
+
+
+class FetchAbandoned(Exception):
+    """The request fetching a shared match payload was cancelled before it finished"""
 
 
 class RiotAPIClient:
@@ -20,11 +28,146 @@ class RiotAPIClient:
         "br1": "https://br1.api.riotgames.com"
     }
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        rate_limiter: Optional[RiotRateLimiter] = None,
+        max_connections: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_retries: int = 3,
+        fetch_concurrency: Optional[int] = None,
+        match_cache: Optional[MatchCache] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
         self.api_key = api_key
         self.headers = {
             "X-Riot-Token": api_key
         }
+        self.rate_limiter = rate_limiter or RiotRateLimiter()
+        self.max_connections = max_connections or int(os.getenv('RIOT_MAX_CONNECTIONS', '20'))
+        self.timeout = timeout or float(os.getenv('RIOT_HTTP_TIMEOUT', '10'))
+        self.max_retries = max_retries
+        self.fetch_concurrency = fetch_concurrency or DEFAULT_CONCURRENCY
+        # One in-flight budget for every bulk match/timeline fan-out on this client
+        self.fetch_slots = asyncio.Semaphore(self.fetch_concurrency)
+
+        # Finished matches never change, so match/timeline payloads are cached by ID
+        self.match_cache = match_cache or MatchCache()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # One long-lived, connection-pooled client per regional/platform host
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._transport = transport  # Custom transport (e.g. a local stub server in tests)
+
+    def _get_client(self, base_url: str) -> httpx.AsyncClient:
+        """Get or create the pooled HTTP client for a host"""
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                headers=self.headers,
+                timeout=self.timeout,
+                transport=self._transport,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            self._clients[base_url] = client
+        return client
+
+    async def _get(
+        self,
+        base_url: str,
+        path: str,
+        method: str,
+        params: Optional[Dict] = None
+    ):
+        """
+        GET a Riot endpoint through the pooled client and rate-limit scheduler.
+        This is the only retry layer: 429s wait out Retry-After, server errors
+        and network failures back off with jitter, up to max_retries times.
+
+        Args:
+            base_url: Regional or platform host
+            path: Endpoint path
+            method: Rate-limit key for the endpoint (Riot limits each method separately)
+            params: Optional query parameters
+        """
+        client = self._get_client(base_url)
+
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(base_url, method)
+            try:
+                response = await client.get(path, params=params)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            self.rate_limiter.update(base_url, method, response.headers)
+
+            if response.status_code == 429 and attempt < self.max_retries:
+                retry_after = float(response.headers.get('Retry-After', 1))
+                self.rate_limiter.backoff(
+                    base_url, method, retry_after, response.headers.get('X-Rate-Limit-Type')
+                )
+                continue
+
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            return response.json()
+
+    async def _get_cached(self, kind: str, match_id: str, fetch: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Serve a match payload from the cache, fetching it on a miss.
+        Concurrent misses for the same match share one request; if the request
+        doing the fetch is cancelled, a waiter takes over instead of failing.
+        """
+        key = f"{kind}:{match_id}"
+        while True:
+            cached = await self.match_cache.aget(kind, match_id)
+            if cached is not None:
+                return cached
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except FetchAbandoned:
+                # Its fetcher was cancelled: fetch it here, or join whichever waiter got there first
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await fetch()
+            await self.match_cache.aput(kind, match_id, data)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            # Only this caller went away (e.g. a closed SSE stream): waiters retry the fetch themselves
+            future.set_exception(FetchAbandoned(key))
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved so unshared failures don't warn
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def aclose(self):
+        """Close all pooled HTTP clients"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
 
     async def get_account_by_riot_id(
         self,
@@ -34,22 +177,16 @@ class RiotAPIClient:
     ) -> Dict:
         """Get account information by Riot ID (game name + tag line)"""
         base_url = self.BASE_URLS.get(region, self.BASE_URLS["americas"])
-        url = f"{base_url}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        path = f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(base_url, path, "get_account_by_riot_id")
 
     async def get_summoner_by_puuid(self, puuid: str, platform: str = "na1") -> Dict:
         """Get summoner information by PUUID"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/summoner/v4/summoners/by-puuid/{puuid}"
+        path = f"/lol/summoner/v4/summoners/by-puuid/{puuid}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_summoner_by_puuid")
 
     async def get_match_history(
         self,
@@ -60,57 +197,65 @@ class RiotAPIClient:
     ) -> List[str]:
         """Get list of match IDs for a player"""
         base_url = self.BASE_URLS.get(region, self.BASE_URLS["americas"])
-        url = f"{base_url}/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        path = f"/lol/match/v5/matches/by-puuid/{puuid}/ids"
 
         params = {
             "start": start,
             "count": count
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(base_url, path, "get_match_history", params=params)
 
     async def get_match_details(self, match_id: str, region: str = "americas") -> Dict:
         """Get detailed information about a specific match"""
         base_url = self.BASE_URLS.get(region, self.BASE_URLS["americas"])
-        url = f"{base_url}/lol/match/v5/matches/{match_id}"
+        path = f"/lol/match/v5/matches/{match_id}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get_cached(
+            "match", match_id, lambda: self._get(base_url, path, "get_match_details")
+        )
 
     async def get_match_timeline(self, match_id: str, region: str = "americas") -> Dict:
         """Get timeline data for a specific match (minute-by-minute events)"""
         base_url = self.BASE_URLS.get(region, self.BASE_URLS["americas"])
-        url = f"{base_url}/lol/match/v5/matches/{match_id}/timeline"
+        path = f"/lol/match/v5/matches/{match_id}/timeline"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get_cached(
+            "timeline", match_id, lambda: self._get(base_url, path, "get_match_timeline")
+        )
 
     async def get_multiple_matches(
         self,
         match_ids: List[str],
         region: str = "americas"
     ) -> List[Dict]:
-        """Get details for multiple matches (with rate limiting)"""
-        matches = []
-
-        for match_id in match_ids:
-            try:
-                match_data = await self.get_match_details(match_id, region)
-                matches.append(match_data)
-                # Rate limiting - be respectful to Riot API
-                await asyncio.sleep(0.1)
-            except Exception as e:
-                print(f"Error fetching match {match_id}: {e}")
-                continue
-
-        return matches
+        """
+        Get details for multiple matches concurrently (paced by the rate-limit scheduler,
+        sharing fetch_slots with other bulk downloads). Matches that still fail after
+        retries are skipped; order follows match_ids.
+        """
+        results = await fetch_all(
+            match_ids,
+            lambda match_id: self.get_match_details(match_id, region),
+            semaphore=self.fetch_slots
+        )
+
+        return [match for match in results if match is not None]
+
+    async def get_multiple_timelines(
+        self,
+        match_ids: List[str],
+        region: str = "americas"
+    ) -> List[Optional[Dict]]:
+        """
+        Get timelines for multiple matches concurrently.
+        Returns one entry per match ID (None where the timeline couldn't be fetched).
+        """
+        return await fetch_all(
+            match_ids,
+            lambda match_id: self.get_match_timeline(match_id, region),
+            semaphore=self.fetch_slots
+        )
 
     # ============= CHAMPION MASTERY API =============
 
@@ -121,12 +266,9 @@ class RiotAPIClient:
     ) -> List[Dict]:
         """Get all champion mastery entries for a player sorted by mastery points"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
+        path = f"/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_champion_mastery_by_puuid")
 
     async def get_champion_mastery_by_champion(
         self,
@@ -136,12 +278,9 @@ class RiotAPIClient:
     ) -> Dict:
         """Get champion mastery for a specific champion"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/by-champion/{champion_id}"
+        path = f"/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/by-champion/{champion_id}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_champion_mastery_by_champion")
 
     async def get_top_champion_masteries(
         self,
@@ -151,14 +290,11 @@ class RiotAPIClient:
     ) -> List[Dict]:
         """Get top N champion masteries by mastery points"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top"
+        path = f"/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top"
 
         params = {"count": count}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_top_champion_masteries", params=params)
 
     async def get_champion_mastery_score(
         self,
@@ -167,12 +303,9 @@ class RiotAPIClient:
     ) -> int:
         """Get total mastery score (sum of all champion mastery levels)"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/champion-mastery/v4/scores/by-puuid/{puuid}"
+        path = f"/lol/champion-mastery/v4/scores/by-puuid/{puuid}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_champion_mastery_score")
 
     # ============= LEAGUE/RANKED API =============
 
@@ -183,12 +316,9 @@ class RiotAPIClient:
     ) -> List[Dict]:
         """Get ranked league entries for a summoner (Solo/Duo, Flex, etc.)"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/league/v4/entries/by-summoner/{summoner_id}"
+        path = f"/lol/league/v4/entries/by-summoner/{summoner_id}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_league_entries_by_summoner")
 
     async def get_league_entries_by_puuid(
         self,
@@ -197,12 +327,9 @@ class RiotAPIClient:
     ) -> List[Dict]:
         """Get ranked league entries by PUUID"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/league/v4/entries/by-puuid/{puuid}"
+        path = f"/lol/league/v4/entries/by-puuid/{puuid}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_league_entries_by_puuid")
 
     async def get_challenger_league(
         self,
@@ -211,12 +338,9 @@ class RiotAPIClient:
     ) -> Dict:
         """Get Challenger league for a specific queue"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/league/v4/challengerleagues/by-queue/{queue}"
+        path = f"/lol/league/v4/challengerleagues/by-queue/{queue}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_challenger_league")
 
     async def get_grandmaster_league(
         self,
@@ -225,12 +349,9 @@ class RiotAPIClient:
     ) -> Dict:
         """Get Grandmaster league for a specific queue"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/league/v4/grandmasterleagues/by-queue/{queue}"
+        path = f"/lol/league/v4/grandmasterleagues/by-queue/{queue}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_grandmaster_league")
 
     async def get_master_league(
         self,
@@ -239,12 +360,9 @@ class RiotAPIClient:
     ) -> Dict:
         """Get Master league for a specific queue"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/league/v4/masterleagues/by-queue/{queue}"
+        path = f"/lol/league/v4/masterleagues/by-queue/{queue}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_master_league")
 
     # ============= CHALLENGES API =============
 
@@ -255,12 +373,9 @@ class RiotAPIClient:
     ) -> Dict:
         """Get all challenge data for a player"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/challenges/v1/player-data/{puuid}"
+        path = f"/lol/challenges/v1/player-data/{puuid}"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_player_challenges")
 
     async def get_challenge_config(
         self,
@@ -268,12 +383,9 @@ class RiotAPIClient:
     ) -> List[Dict]:
         """Get configuration for all challenges"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/challenges/v1/challenges/config"
+        path = "/lol/challenges/v1/challenges/config"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_challenge_config")
 
     async def get_challenge_percentiles(
         self,
@@ -281,12 +393,9 @@ class RiotAPIClient:
     ) -> Dict:
         """Get percentile distribution for all challenges"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/challenges/v1/challenges/percentiles"
+        path = "/lol/challenges/v1/challenges/percentiles"
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_challenge_percentiles")
 
     async def get_challenge_leaderboard(
         self,
@@ -297,12 +406,20 @@ class RiotAPIClient:
     ) -> List[Dict]:
         """Get leaderboard for a specific challenge"""
         platform_url = self.PLATFORM_URLS.get(platform, self.PLATFORM_URLS["na1"])
-        url = f"{platform_url}/lol/challenges/v1/challenges/{challenge_id}/leaderboards/by-level/{level}"
+        path = f"/lol/challenges/v1/challenges/{challenge_id}/leaderboards/by-level/{level}"
 
         params = {"limit": limit}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            return response.json()
+        return await self._get(platform_url, path, "get_challenge_leaderboard", params=params)
+
+
+# Shared instance (one connection pool, rate limiter and match cache per process)
+_riot_client = None
+
 
+def get_riot_client() -> RiotAPIClient:
+    """Get or create the RiotAPIClient singleton; every caller paces against the same key budget"""
+    global _riot_client
+    if _riot_client is None:
+        _riot_client = RiotAPIClient(api_key=os.getenv("RIOT_API_KEY"))
+    return _riot_client
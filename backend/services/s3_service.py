@@ -1,17 +1,19 @@
-import boto3
 import os
 import logging
 from datetime import datetime
 from typing import Optional
 import uuid
 
+from services.clients import ClientRegistry, get_clients
+
 logger = logging.getLogger(__name__)
 
 class S3Service:
-    def __init__(self, bucket_name: Optional[str] = None, region_name: Optional[str] = None):
+    def __init__(self, bucket_name: Optional[str] = None, region_name: Optional[str] = None,
+                 clients: Optional[ClientRegistry] = None):
         """Initialize S3 client"""
         self.region_name = region_name or os.getenv('AWS_REGION', 'us-east-1')
-        self.s3_client = boto3.client('s3', region_name=self.region_name)
+        self.s3_client = (clients or get_clients()).s3(self.region_name)
         self.bucket_name = bucket_name or os.getenv('S3_BUCKET_NAME', 'rift-rewind-shares')
 
     def upload_file(self, file_content: bytes, file_key: str, content_type: str = 'image/png') -> str:
@@ -0,0 +1,194 @@
+"""
+Static Data Service
+Data Dragon files (items, runes, champions, challenges) loaded once into indexed lookups, reloaded when a file changes
+"""
+import hashlib
+import json
+import os
+import threading
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+STATIC_DATA_DIR = Path(os.getenv('STATIC_DATA_DIR', Path(__file__).resolve().parent.parent / 'static_data'))
+# Browser cache lifetime for static data responses (clients revalidate with the ETag afterwards)
+STATIC_DATA_MAX_AGE_SECONDS = int(os.getenv('STATIC_DATA_MAX_AGE_SECONDS', '3600'))
+
+
+def _index_items(raw: Dict) -> Dict:
+    """item id (str) -> name, description, image"""
+    return {
+        item_id: {
+            'name': item.get('name', f'Item {item_id}'),
+            'description': item.get('plaintext', ''),
+            'image': item.get('image', {}).get('full', f'{item_id}.png')
+        }
+        for item_id, item in raw.get('data', {}).items()
+    }
+
+
+def _index_runes(raw: List[Dict]) -> Dict:
+    """rune id -> id, name, key, icon, shortDesc (every rune of every tree and slot)"""
+    index = {}
+    for tree in raw:
+        for slot in tree.get('slots', []):
+            for rune in slot.get('runes', []):
+                rune_id = rune.get('id')
+                if rune_id:
+                    index[rune_id] = {
+                        'id': rune_id,
+                        'name': rune.get('name', f'Rune {rune_id}'),
+                        'key': rune.get('key', ''),
+                        'icon': rune.get('icon', ''),
+                        'shortDesc': rune.get('shortDesc', '')
+                    }
+    return index
+
+
+def _index_champions(raw: Dict) -> Dict:
+    """Numeric key ('266') and lowercase id/name ('aatrox') -> champion summary"""
+    index = {}
+    for champion in raw.get('data', {}).values():
+        summary = {
+            'key': int(champion['key']),
+            'id': champion.get('id'),
+            'name': champion.get('name'),
+            'title': champion.get('title', ''),
+            'image': champion.get('image', {}).get('full', ''),
+            'tags': champion.get('tags', [])
+        }
+        index[champion['key']] = summary
+        for alias in (champion.get('id'), champion.get('name')):
+            if alias:
+                index[alias.lower()] = summary
+    return index
+
+
+def _index_challenges(raw: List[Dict]) -> Dict:
+    """challenge id -> English name/description, state and tier thresholds"""
+    index = {}
+    for challenge in raw:
+        names = challenge.get('localizedNames', {}).get('en_US', {})
+        index[challenge['id']] = {
+            'id': challenge['id'],
+            'name': names.get('name', ''),
+            'description': names.get('description', ''),
+            'shortDescription': names.get('shortDescription', ''),
+            'state': challenge.get('state'),
+            'leaderboard': challenge.get('leaderboard', False),
+            'thresholds': challenge.get('thresholds', {})
+        }
+    return index
+
+
+class StaticDataset(NamedTuple):
+    index: Dict
+    etag: str
+    signature: Optional[Tuple[int, int]]  # (mtime_ns, size) of the file it was built from
+
+
+class StaticDataService:
+    """
+    Each dataset is parsed on first use and kept as a compact index (the raw
+    JSON is dropped). Every access stats the file; when its mtime or size
+    changed, a new index is built and swapped in whole, so readers always see
+    one consistent version. The ETag is a hash of the file contents.
+    """
+
+    DATASETS: Dict[str, Tuple[str, Callable]] = {
+        'items': ('item.json', _index_items),
+        'runes': ('runesReforged.json', _index_runes),
+        'champions': ('champion.json', _index_champions),
+        'challenges': ('challenge_config.json', _index_challenges)
+    }
+
+    def __init__(self, data_dir: Optional[Union[str, Path]] = None, max_age_seconds: Optional[int] = None):
+        self.data_dir = Path(data_dir or STATIC_DATA_DIR)
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else STATIC_DATA_MAX_AGE_SECONDS
+        self._lock = threading.Lock()
+        self._datasets: Dict[str, StaticDataset] = {}
+
+    def dataset(self, name: str) -> StaticDataset:
+        filename, build_index = self.DATASETS[name]
+        path = self.data_dir / filename
+        try:
+            stat = path.stat()
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+
+        current = self._datasets.get(name)
+        if current is not None and current.signature == signature:
+            return current
+
+        with self._lock:
+            current = self._datasets.get(name)
+            if current is not None and current.signature == signature:
+                return current
+
+            if signature is None:
+                logger.warning(f"Static data file {path} not found; {name} lookups will use fallbacks")
+                dataset = StaticDataset({}, '"empty"', None)
+            else:
+                raw = path.read_bytes()
+                dataset = StaticDataset(
+                    build_index(json.loads(raw)),
+                    f'"{hashlib.sha1(raw).hexdigest()[:16]}"',
+                    signature
+                )
+                logger.info(f"Static data loaded: {name} ({len(dataset.index)} entries from {filename})")
+            self._datasets[name] = dataset
+            return dataset
+
+    def etag(self, *names: str) -> str:
+        """ETag for a response built from the given datasets"""
+        tags = [self.dataset(name).etag.strip('"') for name in names]
+        return f'"{tags[0]}"' if len(tags) == 1 else f'"{hashlib.sha1("-".join(tags).encode()).hexdigest()[:16]}"'
+
+    def cache_headers(self, *names: str) -> Dict[str, str]:
+        return {
+            'ETag': self.etag(*names),
+            'Cache-Control': f'public, max-age={self.max_age_seconds}'
+        }
+
+    def item(self, item_id: Union[int, str]) -> Dict:
+        """Item summary, or a placeholder for unknown ids (keeps the id type the caller passed)"""
+        item = self.dataset('items').index.get(str(item_id))
+        if item is None:
+            return {'id': item_id, 'name': f'Item {item_id}', 'description': '', 'image': f'{item_id}.png'}
+        return {'id': item_id, **item}
+
+    def items(self, item_ids: List[int]) -> Dict[int, Dict]:
+        return {item_id: self.item(item_id) for item_id in item_ids}
+
+    def rune(self, rune_id: int) -> Dict:
+        rune = self.dataset('runes').index.get(rune_id)
+        if rune is None:
+            return {'id': rune_id, 'name': f'Rune {rune_id}', 'key': '', 'icon': '', 'shortDesc': ''}
+        return dict(rune)
+
+    def runes(self, rune_ids: List[int]) -> Dict[int, Dict]:
+        return {rune_id: self.rune(rune_id) for rune_id in rune_ids}
+
+    def champion(self, key_or_name: Union[int, str]) -> Optional[Dict]:
+        """Champion by numeric key (266 / '266') or by id/name, case-insensitive ('Aatrox')"""
+        champion = self.dataset('champions').index.get(str(key_or_name).lower())
+        return dict(champion) if champion else None
+
+    def challenge(self, challenge_id: int) -> Optional[Dict]:
+        challenge = self.dataset('challenges').index.get(challenge_id)
+        return dict(challenge) if challenge else None
+
+
+# Shared instance
+_static_data = None
+
+
+def get_static_data() -> StaticDataService:
+    """Get or create the StaticDataService singleton"""
+    global _static_data
+    if _static_data is None:
+        _static_data = StaticDataService()
+    return _static_data
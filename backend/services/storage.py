@@ -0,0 +1,242 @@
+"""
+Player Data Storage
+Pluggable store behind every `lol-player-data` read and write: DynamoDB (default) or the local Parquet tier
+"""
+import os
+import time
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+from dotenv import load_dotenv
+
+from services.clients import PLAYER_DATA_TABLE, ClientRegistry, get_clients
+from services.dynamo_ingest import DynamoIngest
+from services.match_columns import MatchColumns
+
+logger = logging.getLogger(__name__)
+
+# The backend is chosen at import, which can come before the app's own load_dotenv()
+load_dotenv()
+
+# 'aws' (DynamoDB + MongoDB Atlas) or 'local' (Parquet / compressed files under LOCAL_STORE_DIR)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'aws')
+LOCAL_STORE_DIR = os.getenv('LOCAL_STORE_DIR', '.cache/local_store')
+
+# DynamoDB BatchGetItem accepts at most 100 keys per call
+BATCH_GET_LIMIT = 100
+
+
+class RevisionConflict(Exception):
+    """A conditional put found a different revision than expected (concurrent writer)"""
+
+
+class PlayerDataStore(ABC):
+    """
+    Per-player items keyed by (puuid, dataType), in the `lol-player-data`
+    layout: account, summoner, match#<id>, summary#<id>, aggregate#... Each
+    item is a dict holding `puuid`, `dataType` and usually `data`.
+
+    Items come back ordered by dataType within a player, as a DynamoDB query
+    returns them, so every backend yields matches in the same order.
+    """
+
+    name = 'player data store'
+
+    @abstractmethod
+    def iter_pages(self, puuid: str, prefix: str = '', limit: Optional[int] = None) -> Iterator[List[Dict]]:
+        """A player's items whose dataType starts with `prefix`, a page at a time, at most `limit` in total"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def batch_get(self, puuid: str, data_types: List[str]) -> List[Dict]:
+        """Items for specific dataTypes (missing ones are left out)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_item(self, item: Dict, expected_revision: Optional[int] = None):
+        """
+        Write one item; with expected_revision, raise RevisionConflict unless the
+        stored revision matches (0: unless no item is stored yet, revisions start at 1)
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def write_items(self, items: List[Dict], name: str = 'items') -> Dict[str, int]:
+        """Bulk write; returns counts with at least `written`, `oversized` and `failed`"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_player(self, player_name: str) -> Optional[Dict]:
+        """The `account` item with this playerName ("gameName#tagLine")"""
+        raise NotImplementedError
+
+    def iter_keys(self, puuid: str, prefix: str = '') -> Iterator[str]:
+        """dataTypes of a player's items starting with `prefix`, without decoding the items"""
+        for page in self.iter_pages(puuid, prefix):
+            for item in page:
+                yield item['dataType']
+
+    def query(self, puuid: str) -> List[Dict]:
+        """Every item stored for a player"""
+        return [item for page in self.iter_pages(puuid) for item in page]
+
+    def get_item(self, puuid: str, data_type: str) -> Optional[Dict]:
+        items = self.batch_get(puuid, [data_type])
+        return items[0] if items else None
+
+    def get_columns(self, puuid: str) -> Optional[MatchColumns]:
+        """Prebuilt columnar view of the player's summaries, if the backend stores one (None: build from items)"""
+        return None
+
+    def consistent_reads(self) -> 'PlayerDataStore':
+        """This store with reads that see every write already acknowledged (the store itself if it always does)"""
+        return self
+
+
+class DynamoPlayerData(PlayerDataStore):
+    """`lol-player-data` in DynamoDB, through an injected table or the calling thread's shared one"""
+
+    name = 'DynamoDB'
+
+    def __init__(self, table=None, clients: Optional[ClientRegistry] = None, consistent_read: bool = False):
+        self._table = table
+        self._clients = clients
+        self.consistent_read = consistent_read
+
+    @property
+    def table(self):
+        """The injected table, or the calling thread's table from the shared client registry"""
+        if self._table is not None:
+            return self._table
+        return (self._clients or get_clients()).dynamodb_table()
+
+    def iter_pages(self, puuid: str, prefix: str = '', limit: Optional[int] = None) -> Iterator[List[Dict]]:
+        """Query items one page at a time, asking for no more than `limit` in total"""
+        condition = Key('puuid').eq(puuid)
+        if prefix:
+            condition = condition & Key('dataType').begins_with(prefix)
+        query_kwargs = {'KeyConditionExpression': condition, 'ConsistentRead': self.consistent_read}
+        remaining = limit
+
+        while True:
+            if remaining is not None:
+                query_kwargs['Limit'] = remaining
+            response = self.table.query(**query_kwargs)
+            items = response['Items']
+            yield items
+
+            if remaining is not None:
+                remaining -= len(items)
+                if remaining <= 0:
+                    break
+
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    def iter_keys(self, puuid: str, prefix: str = '') -> Iterator[str]:
+        """Query with a dataType-only projection (full match payloads never leave DynamoDB)"""
+        condition = Key('puuid').eq(puuid)
+        if prefix:
+            condition = condition & Key('dataType').begins_with(prefix)
+        query_kwargs = {
+            'KeyConditionExpression': condition, 'ProjectionExpression': 'dataType', 'ConsistentRead': self.consistent_read
+        }
+
+        while True:
+            response = self.table.query(**query_kwargs)
+            for item in response['Items']:
+                yield item['dataType']
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    def batch_get(self, puuid: str, data_types: List[str]) -> List[Dict]:
+        """BatchGetItem in chunks of 100 keys, retrying unprocessed keys"""
+        items = []
+        client = self.table.meta.client
+        for start in range(0, len(data_types), BATCH_GET_LIMIT):
+            request = {
+                self.table.name: {
+                    'Keys': [{'puuid': puuid, 'dataType': data_type} for data_type in data_types[start:start + BATCH_GET_LIMIT]],
+                    'ConsistentRead': self.consistent_read
+                }
+            }
+            attempt = 0
+            while request:
+                response = client.batch_get_item(RequestItems=request)
+                items.extend(response.get('Responses', {}).get(self.table.name, []))
+                request = response.get('UnprocessedKeys') or None
+                if request:
+                    attempt += 1
+                    time.sleep(min(0.05 * 2 ** attempt, 2.0))
+
+        logger.info(f"Batch-loaded {len(items)}/{len(data_types)} items for {puuid[:8]}... from DynamoDB")
+        return items
+
+    def get_item(self, puuid: str, data_type: str) -> Optional[Dict]:
+        return self.table.get_item(
+            Key={'puuid': puuid, 'dataType': data_type}, ConsistentRead=self.consistent_read
+        ).get('Item')
+
+    def consistent_reads(self) -> 'DynamoPlayerData':
+        """Strongly consistent Query / GetItem / BatchGetItem (twice the read capacity)"""
+        if self.consistent_read:
+            return self
+        return DynamoPlayerData(table=self._table, clients=self._clients, consistent_read=True)
+
+    def put_item(self, item: Dict, expected_revision: Optional[int] = None):
+        if expected_revision is None:
+            self.table.put_item(Item=item)
+            return
+        if expected_revision == 0:
+            condition = {'ConditionExpression': 'attribute_not_exists(dataType)'}
+        else:
+            condition = {
+                'ConditionExpression': 'revision = :revision',
+                'ExpressionAttributeValues': {':revision': expected_revision}
+            }
+        try:
+            self.table.put_item(Item=item, **condition)
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') != 'ConditionalCheckFailedException':
+                raise
+            raise RevisionConflict(item['dataType']) from e
+
+    def write_items(self, items: List[Dict], name: str = 'items') -> Dict[str, int]:
+        # Batched, parallel writes (unprocessed items retried) instead of one PutItem per item
+        table_name = self._table.name if self._table is not None else PLAYER_DATA_TABLE
+        return DynamoIngest(table_name, clients=self._clients).write_items(items, name=name)
+
+    def find_player(self, player_name: str) -> Optional[Dict]:
+        # Scan for player by name (not efficient for large databases)
+        # For production, consider adding a GSI on playerName
+        response = self.table.scan(FilterExpression=Attr('playerName').eq(player_name), Limit=1)
+        return response['Items'][0] if response['Items'] else None
+
+
+# Shared instance
+_player_data_store = None
+
+
+def get_player_data_store(clients: Optional[ClientRegistry] = None) -> PlayerDataStore:
+    """
+    The configured store (STORAGE_BACKEND). `clients` selects the registry a
+    DynamoDB store uses; the local store ignores it.
+    """
+    global _player_data_store
+    if clients is not None and STORAGE_BACKEND != 'local':
+        return DynamoPlayerData(clients=clients)
+    if _player_data_store is None:
+        if STORAGE_BACKEND == 'local':
+            # Imported on demand: pyarrow is only needed for the local tier
+            from services.local_store import LocalPlayerData
+            _player_data_store = LocalPlayerData(LOCAL_STORE_DIR)
+        else:
+            _player_data_store = DynamoPlayerData()
+    return _player_data_store
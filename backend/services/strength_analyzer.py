@@ -4,8 +4,8 @@ AI-powered performance analysis with contextual insights
 """
 import logging
 from typing import Dict, List, Optional
-import boto3
-from boto3.dynamodb.conditions import Key
+from services.clients import ClientRegistry, get_clients
+from services.match_repository import MatchRepository, get_match_repository
 from services.benchmarks import (
     get_rank_benchmarks,
     get_role_adjusted_benchmarks,
@@ -19,11 +19,10 @@ logger = logging.getLogger(__name__)
 class StrengthAnalyzer:
     """Analyzes player strengths and weaknesses with AI-powered insights"""
 
-    def __init__(self):
-        self.bedrock = boto3.client(
-            service_name='bedrock-runtime',
-            region_name='us-east-1'
-        )
+    def __init__(self, match_repository: Optional[MatchRepository] = None,
+                 clients: Optional[ClientRegistry] = None):
+        self.match_repository = match_repository or get_match_repository()
+        self.bedrock = (clients or get_clients()).bedrock_runtime('us-east-1')
         self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
 
     def analyze_player_performance(
@@ -110,23 +109,6 @@ class StrengthAnalyzer:
     def _fetch_player_stats(self, puuid: str, time_range: Optional[int] = None) -> Dict:
         """Fetch and aggregate player statistics from DynamoDB"""
         try:
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('lol-player-data')
-
-            # Query matches
-            response = table.query(
-                KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-            )
-
-            matches = response['Items']
-
-            # Limit to time_range if specified
-            if time_range:
-                matches = matches[:time_range]
-
-            if not matches:
-                return {}
-
             # Aggregate statistics
             stats = {
                 'total_matches': 0,
@@ -143,7 +125,8 @@ class StrengthAnalyzer:
                 'early_game_kills': 0,  # Kills before 10min
             }
 
-            for match_item in matches:
+            # Stream matches page by page, stopping once time_range matches are read
+            for match_item in self.match_repository.iter_summaries(puuid, limit=time_range or None):
                 match_data = match_item.get('data', {})
                 participants = match_data.get('info', {}).get('participants', [])
 
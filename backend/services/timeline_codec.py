@@ -0,0 +1,318 @@
+"""
+Timeline Codec
+Compact timeline storage: zstd-compressed, column-packed participant frames and per-frame events, decoded lazily by frame and field
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import zstandard
+from bson import Binary
+
+# `format` of a packed timelines document (raw documents have no `format`)
+PACKED_FORMAT = 'packed-v1'
+
+# Format new timelines are written in: 'raw' (Riot JSON as-is) or 'packed'
+STORAGE_FORMAT = os.getenv('TIMELINE_STORAGE_FORMAT', 'raw')
+ZSTD_LEVEL = int(os.getenv('TIMELINE_ZSTD_LEVEL', '9'))
+
+FRAME_KEYS = ('timestamp', 'events', 'participantFrames')
+
+_local = threading.local()
+
+
+def _compress(raw: bytes) -> Binary:
+    # zstd contexts are not thread-safe; one per thread
+    compressor = getattr(_local, 'compressor', None)
+    if compressor is None:
+        compressor = _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return Binary(compressor.compress(raw))
+
+
+def _decompress(blob) -> bytes:
+    decompressor = getattr(_local, 'decompressor', None)
+    if decompressor is None:
+        decompressor = _local.decompressor = zstandard.ZstdDecompressor()
+    return decompressor.decompress(bytes(blob))
+
+
+def _flatten(value: Dict, prefix: str = '') -> Iterator[Tuple[str, object]]:
+    for key, item in value.items():
+        if isinstance(item, dict) and item:
+            yield from _flatten(item, f"{prefix}{key}.")
+        else:
+            yield f"{prefix}{key}", item
+
+
+def _set_path(target: Dict, path: str, value):
+    *parents, leaf = path.split('.')
+    for parent in parents:
+        target = target.setdefault(parent, {})
+    target[leaf] = value
+
+
+def _select_frames(frames: Optional[Iterable[int]], count: int) -> List[int]:
+    """Frame indexes within [0, count); open-ended ranges are clipped without iterating them"""
+    if frames is None:
+        return list(range(count))
+    if isinstance(frames, range) and frames.step > 0:
+        return list(range(max(frames.start, 0), min(frames.stop, count), frames.step))
+    return [f for f in frames if 0 <= f < count]
+
+
+def _wanted(path: str, fields: Optional[Iterable[str]]) -> bool:
+    """`fields` names leaves ('position.x') or whole groups ('position', 'championStats'); None means all"""
+    return fields is None or any(path == name or path.startswith(name + '.') for name in fields)
+
+
+def pack_timeline(timeline_data: Dict) -> Optional[Tuple[Dict, Dict]]:
+    """
+    (data stub, packed) for a Riot timeline, or None when it doesn't fit the
+    columnar layout (non-numeric or mixed-type frame fields, odd frame keys).
+
+    The stub keeps metadata and info minus frames as plain BSON, so queries on
+    data.metadata.participants keep working. Every participant frame leaf
+    (position.x, totalGold, xp, championStats.armor, ...) becomes one
+    (frames x participants) array, delta-encoded along time for integers and
+    zstd-compressed on its own, so readers decompress only the fields they ask
+    for. Events are JSON per frame, concatenated with offsets, so a frame range
+    is parsed without parsing the rest.
+    """
+    info = timeline_data.get('info') or {}
+    frames = info.get('frames') or []
+    stub = {key: value for key, value in timeline_data.items() if key != 'info'}
+    stub['info'] = {key: value for key, value in info.items() if key != 'frames'}
+
+    participants: List[str] = []
+    participant_index: Dict[str, int] = {}
+    cells: Dict[str, Dict[Tuple[int, int], object]] = {}
+    timestamps = []
+    event_chunks = []
+
+    for f, frame in enumerate(frames):
+        timestamp = frame.get('timestamp')
+        if set(frame) - set(FRAME_KEYS) or type(timestamp) is not int:
+            return None
+        timestamps.append(timestamp)
+        event_chunks.append(json.dumps(frame.get('events', []), separators=(',', ':')).encode('utf-8'))
+
+        for key, participant_frame in (frame.get('participantFrames') or {}).items():
+            if not isinstance(participant_frame, dict) or not participant_frame:
+                return None
+            p = participant_index.get(key)
+            if p is None:
+                p = participant_index[key] = len(participants)
+                participants.append(key)
+            for path, value in _flatten(participant_frame):
+                cells.setdefault(path, {})[(f, p)] = value
+
+    shape = (len(frames), len(participants))
+    columns = {}
+    for path, column in cells.items():
+        values = list(column.values())
+        if any(isinstance(value, bool) or not isinstance(value, (int, float)) for value in values):
+            return None
+        is_float = isinstance(values[0], float)
+        if any(isinstance(value, float) != is_float for value in values):
+            return None
+
+        array = np.zeros(shape, dtype=np.float64 if is_float else np.int64)
+        missing = np.ones(shape, dtype=bool)
+        for (f, p), value in column.items():
+            array[f, p] = value
+            missing[f, p] = False
+
+        entry = {}
+        if is_float:
+            entry['dtype'] = '<f8'
+            payload = array.astype('<f8')
+        else:
+            # Cumulative stats (gold, xp, cs) shrink to small deltas frame over frame
+            deltas = np.diff(array, axis=0, prepend=np.zeros((1, shape[1]), dtype=np.int64))
+            fits = deltas.size == 0 or (deltas.min() >= np.iinfo(np.int32).min and deltas.max() <= np.iinfo(np.int32).max)
+            entry['dtype'] = '<i4' if fits else '<i8'
+            entry['delta'] = True
+            payload = deltas.astype(entry['dtype'])
+        entry['data'] = _compress(payload.tobytes())
+        if missing.any():
+            entry['missing'] = _compress(np.packbits(missing).tobytes())
+        columns[path] = entry
+
+    offsets = np.cumsum([0] + [len(chunk) for chunk in event_chunks], dtype=np.int64)
+    packed = {
+        'codec': 'zstd',
+        'frames': len(frames),
+        'participants': participants,
+        'timestamps': _compress(np.asarray(timestamps, dtype='<i8').tobytes()),
+        'events': _compress(b''.join(event_chunks)),
+        'event_offsets': _compress(offsets.astype('<i8').tobytes()),
+        'columns': columns
+    }
+    return stub, packed
+
+
+class PackedTimeline:
+    """
+    Lazy reader over a packed timelines document. Works on partial projections
+    too: events() needs only packed.events / event_offsets / frames.
+    """
+
+    def __init__(self, doc: Dict):
+        self.stub = doc.get('data') or {}
+        self.packed = doc['packed']
+        self.frame_count = self.packed.get('frames', 0)
+        self.participants = self.packed.get('participants', [])
+        self._columns: Dict[str, Tuple[np.ndarray, Optional[np.ndarray]]] = {}
+        self._events: Optional[bytes] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.packed.get('columns', {}))
+
+    def _frames(self, frames: Optional[Iterable[int]]) -> List[int]:
+        return _select_frames(frames, self.frame_count)
+
+    def timestamps(self) -> np.ndarray:
+        return np.frombuffer(_decompress(self.packed['timestamps']), dtype='<i8')
+
+    def column(self, path: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """(frames x participants) values for one field, plus the missing-cell mask if any cell is absent"""
+        if path not in self._columns:
+            entry = self.packed['columns'][path]
+            shape = (self.frame_count, len(self.participants))
+            values = np.frombuffer(_decompress(entry['data']), dtype=entry['dtype']).reshape(shape)
+            if entry.get('delta'):
+                values = np.cumsum(values, axis=0, dtype=np.int64)
+            missing = None
+            if 'missing' in entry:
+                bits = np.frombuffer(_decompress(entry['missing']), dtype=np.uint8)
+                missing = np.unpackbits(bits)[:values.size].reshape(shape).astype(bool)
+            self._columns[path] = (values, missing)
+        return self._columns[path]
+
+    def events(self, frames: Optional[Iterable[int]] = None) -> List[List[Dict]]:
+        """Events of the selected frames (only those frames are parsed)"""
+        if self._events is None:
+            self._events = _decompress(self.packed['events'])
+            self._offsets = np.frombuffer(_decompress(self.packed['event_offsets']), dtype='<i8')
+        return [
+            json.loads(self._events[self._offsets[f]:self._offsets[f + 1]])
+            for f in self._frames(frames)
+        ]
+
+    def participant_frames(self, frames: Optional[Iterable[int]] = None,
+                           fields: Optional[Iterable[str]] = None) -> List[Dict[str, Dict]]:
+        """Riot-shaped participantFrames of the selected frames, holding only the selected fields"""
+        frames = self._frames(frames)
+        fields = list(fields) if fields is not None else None
+        paths = [path for path in self.fields if _wanted(path, fields)]
+        decoded = {path: self.column(path) for path in paths}
+        lists = {path: values.tolist() for path, (values, _) in decoded.items()}
+
+        result = []
+        for f in frames:
+            participant_frames = {}
+            for p, key in enumerate(self.participants):
+                participant_frame = {}
+                for path in paths:
+                    missing = decoded[path][1]
+                    if missing is not None and missing[f, p]:
+                        continue
+                    _set_path(participant_frame, path, lists[path][f][p])
+                if participant_frame:
+                    participant_frames[key] = participant_frame
+            result.append(participant_frames)
+        return result
+
+    def to_riot(self, frames: Optional[Iterable[int]] = None, fields: Optional[Iterable[str]] = None,
+                events: bool = True) -> Dict:
+        """The timeline in Riot's shape, restricted to the selected frames / participant fields"""
+        frames = self._frames(frames)
+        timestamps = self.timestamps().tolist()
+        frame_events = self.events(frames) if events else None
+        participant_frames = self.participant_frames(frames, fields) if fields != () else None
+
+        out_frames = []
+        for i, f in enumerate(frames):
+            frame = {'timestamp': timestamps[f]}
+            if frame_events is not None:
+                frame['events'] = frame_events[i]
+            if participant_frames is not None:
+                frame['participantFrames'] = participant_frames[i]
+            out_frames.append(frame)
+
+        data = dict(self.stub)
+        data['info'] = {**self.stub.get('info', {}), 'frames': out_frames}
+        return data
+
+
+def is_packed(doc: Dict) -> bool:
+    return doc.get('format') == PACKED_FORMAT
+
+
+def timeline_data(doc: Dict, frames: Optional[Sequence[int]] = None, fields: Optional[Iterable[str]] = None,
+                  events: bool = True) -> Dict:
+    """
+    Riot-shaped timeline from a timelines document in either format.
+    frames: frame indexes to keep (default all); fields: participant frame
+    fields to keep (default all, () for none); events: keep frame events.
+    """
+    if is_packed(doc):
+        return PackedTimeline(doc).to_riot(frames, fields, events)
+
+    data = doc.get('data') or {}
+    if frames is None and fields is None and events:
+        return data
+
+    info = data.get('info') or {}
+    all_frames = info.get('frames') or []
+    selected = _select_frames(frames, len(all_frames))
+    fields = list(fields) if fields is not None else None
+
+    out_frames = []
+    for f in selected:
+        frame = {key: value for key, value in all_frames[f].items() if key not in ('events', 'participantFrames')}
+        if events:
+            frame['events'] = all_frames[f].get('events', [])
+        if fields != [] and 'participantFrames' in all_frames[f]:
+            participant_frames = {}
+            for key, participant_frame in all_frames[f]['participantFrames'].items():
+                kept = {}
+                for path, value in _flatten(participant_frame):
+                    if _wanted(path, fields):
+                        _set_path(kept, path, value)
+                if kept:
+                    participant_frames[key] = kept
+            frame['participantFrames'] = participant_frames
+        out_frames.append(frame)
+
+    return {**data, 'info': {**info, 'frames': out_frames}}
+
+
+def pack_document(doc: Dict) -> bool:
+    """Convert a raw timelines document to the packed format in place; False if it can't be packed"""
+    if is_packed(doc):
+        return True
+    result = pack_timeline(doc.get('data') or {})
+    if result is None:
+        return False
+    doc['data'], doc['packed'] = result
+    doc['format'] = PACKED_FORMAT
+    return True
+
+
+def unpack_document(doc: Dict) -> Dict:
+    """Convert a packed timelines document back to raw Riot JSON in place"""
+    if is_packed(doc):
+        doc['data'] = PackedTimeline(doc).to_riot()
+        del doc['packed']
+        del doc['format']
+    return doc
+
+
+def canonical(timeline: Dict) -> str:
+    """Order-insensitive, type-preserving serialization for round-trip checks"""
+    return json.dumps(timeline, sort_keys=True, separators=(',', ':'))
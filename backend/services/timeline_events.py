@@ -0,0 +1,176 @@
+"""
+Timeline Event Index
+Compact per-event rows (one per positioned timeline event) written at ingest so heatmaps don't scan full timelines
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING
+
+from services.match_repository import get_match_repository
+from services.timeline_codec import timeline_data
+
+logger = logging.getLogger(__name__)
+
+EVENTS_COLLECTION = 'timeline_events'
+
+# Event fields copied onto the row when present
+EVENT_FIELDS = (
+    'killerId', 'victimId', 'assistingParticipantIds',
+    'monsterType', 'monsterSubType', 'buildingType', 'towerType', 'laneType',
+    'killerTeamId', 'teamId'
+)
+
+
+def extract_positioned_events(match_id: str, puuid: str, timeline_data: Dict) -> List[Dict]:
+    """
+    Flatten a Riot timeline into one row per event that has a map position.
+
+    Each row carries the participant IDs involved (killer, victim, assisters,
+    plus `participantIds` with all of them for multikey lookups), the position,
+    the timestamp and its minute bucket.
+    """
+    rows = []
+    for frame in (timeline_data.get('info') or {}).get('frames', []):
+        for event in frame.get('events', []):
+            position = event.get('position')
+            if not position:
+                continue
+
+            row = {
+                'matchId': match_id,
+                'puuid': puuid,
+                'type': event.get('type'),
+                'timestamp': event.get('timestamp', 0),
+                'minute': event.get('timestamp', 0) // 60000,
+                'x': position.get('x'),
+                'y': position.get('y')
+            }
+            for field in EVENT_FIELDS:
+                if field in event:
+                    row[field] = event[field]
+
+            involved = [event.get('killerId'), event.get('victimId')] + list(event.get('assistingParticipantIds', []))
+            row['participantIds'] = sorted({pid for pid in involved if pid})
+            rows.append(row)
+
+    return rows
+
+
+def build_participant_fields(puuid: str, timeline_data: Dict, match_data: Optional[Dict] = None) -> Dict:
+    """
+    The player's participantId, championName and teamPosition, stored on the
+    timeline document so heatmaps need no per-match DynamoDB lookup.
+    participantId comes from the timeline itself; champion and role need the match.
+    """
+    fields = {}
+
+    timeline_puuids = (timeline_data.get('metadata') or {}).get('participants', [])
+    if puuid in timeline_puuids:
+        fields['participantId'] = timeline_puuids.index(puuid) + 1
+    else:
+        for participant in (timeline_data.get('info') or {}).get('participants', []):
+            if participant.get('puuid') == puuid:
+                fields['participantId'] = participant.get('participantId')
+                break
+
+    if match_data:
+        participant = next(
+            (p for p in match_data.get('info', {}).get('participants', []) if p.get('puuid') == puuid),
+            None
+        )
+        if participant:
+            fields['championName'] = participant.get('championName', 'Unknown')
+            fields['teamPosition'] = participant.get('teamPosition', 'Unknown')
+            if 'participantId' not in fields and participant.get('participantId'):
+                fields['participantId'] = participant['participantId']
+
+    return fields
+
+
+def resolve_timeline_participants(puuid: str, timeline_docs: List[Dict], repository=None,
+                                  need_details: bool = True) -> Dict[str, Dict]:
+    """
+    Map matchId -> {participantId, championName, teamPosition} for a player's timelines.
+
+    Uses the fields stored at ingest; documents written before that fall back to
+    the timeline's own participant list and, for champion/role, one batched
+    summary read (BatchGetItem, 100 keys per call) instead of a query per match.
+    """
+    resolved = {}
+    missing = []
+    for doc in timeline_docs:
+        match_id = doc['matchId']
+        fields = {key: doc[key] for key in ('participantId', 'championName', 'teamPosition') if key in doc}
+        if 'participantId' not in fields:
+            fields.update(build_participant_fields(puuid, doc.get('data', {})))
+        resolved[match_id] = fields
+        if 'participantId' not in fields or (need_details and 'championName' not in fields):
+            missing.append(match_id)
+
+    if missing:
+        try:
+            summaries = (repository or get_match_repository()).get_summaries_by_id(puuid, missing)
+        except Exception as e:
+            logger.error(f"Error fetching match summaries for {len(missing)} timelines: {e}")
+            summaries = {}
+        for match_id in missing:
+            summary = summaries.get(match_id)
+            if summary is None:
+                continue
+            for key, value in build_participant_fields(puuid, {}, summary.get('data', {})).items():
+                resolved[match_id].setdefault(key, value)
+
+    return {match_id: fields for match_id, fields in resolved.items() if fields.get('participantId')}
+
+
+def create_event_indexes(db):
+    """Indexes backing heatmap filters (per player, per match participant, per type/time)"""
+    collection = db[EVENTS_COLLECTION]
+    collection.create_index([("matchId", ASCENDING), ("timestamp", ASCENDING)])
+    collection.create_index([("puuid", ASCENDING), ("type", ASCENDING), ("timestamp", ASCENDING)])
+    collection.create_index([("matchId", ASCENDING), ("participantIds", ASCENDING), ("type", ASCENDING)])
+
+
+def replace_match_events(db, match_id: str, puuid: str, timeline_data: Dict,
+                         uploaded_at: Optional[datetime] = None) -> int:
+    """
+    Rewrite the event rows for one match (safe to re-run on re-ingest).
+    Returns the number of rows written.
+    """
+    rows = extract_positioned_events(match_id, puuid, timeline_data)
+    uploaded_at = uploaded_at or datetime.utcnow()
+    for row in rows:
+        row['uploadedAt'] = uploaded_at
+
+    collection = db[EVENTS_COLLECTION]
+    collection.delete_many({'matchId': match_id})
+    if rows:
+        collection.insert_many(rows, ordered=False)
+    return len(rows)
+
+
+def replace_events_bulk(db, timelines: List[Dict], uploaded_at: Optional[datetime] = None) -> int:
+    """
+    replace_match_events for many timeline documents (matchId, puuid, data; raw or packed) at
+    once: one delete and one unordered insert_many per call instead of two
+    round trips per match. Returns the number of rows written.
+    """
+    if not timelines:
+        return 0
+    uploaded_at = uploaded_at or datetime.utcnow()
+
+    rows = []
+    for doc in timelines:
+        # Packed documents: events only, participant frames stay compressed
+        data = timeline_data(doc, fields=())
+        for row in extract_positioned_events(doc['matchId'], doc.get('puuid'), data):
+            row['uploadedAt'] = doc.get('uploadedAt', uploaded_at)
+            rows.append(row)
+
+    collection = db[EVENTS_COLLECTION]
+    collection.delete_many({'matchId': {'$in': [doc['matchId'] for doc in timelines]}})
+    if rows:
+        collection.insert_many(rows, ordered=False)
+    return len(rows)
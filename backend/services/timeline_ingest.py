@@ -0,0 +1,190 @@
+"""
+Timeline Ingest
+Bulk MongoDB timeline writes: one existence query, BSON-sized documents, unordered batched inserts/upserts and parallel file parsing
+"""
+import json
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TypeVar
+
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from services.timeline_codec import PACKED_FORMAT, STORAGE_FORMAT, pack_document
+from services.timeline_events import build_participant_fields, replace_events_bulk
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# MongoDB's document limit is 16 MB of BSON; leave room for the wire envelope
+MAX_DOCUMENT_BYTES = 15_000_000
+DUPLICATE_KEY = 11000
+
+BATCH_SIZE = int(os.getenv('MONGO_INGEST_BATCH_SIZE', '25'))
+READ_WORKERS = int(os.getenv('MONGO_INGEST_READ_WORKERS', '8'))
+
+# $in lists are chunked so the query document stays small
+EXISTS_CHUNK = 1000
+
+
+def build_timeline_document(match_id: str, puuid: str, timeline_data: Dict, match_data: Optional[Dict] = None,
+                            uploaded_at: Optional[datetime] = None, **extra) -> Dict:
+    """The `timelines` document for one match: Riot timeline (raw or packed), frame metadata and the player's participant fields"""
+    doc = {
+        'matchId': match_id,
+        'puuid': puuid,
+        'data': timeline_data,
+        'uploadedAt': uploaded_at or datetime.utcnow(),
+        **extra
+    }
+
+    if 'info' in timeline_data:
+        info = timeline_data['info']
+        doc['gameCreation'] = info.get('gameCreation')
+        doc['gameDuration'] = info.get('gameDuration')
+        doc['frameInterval'] = info.get('frameInterval')
+        doc['frames'] = len(info.get('frames', []))
+
+    # Player's participantId / champion / role, so heatmaps skip the DynamoDB lookup
+    doc.update(build_participant_fields(puuid, timeline_data, match_data))
+
+    # Compact column-packed frames (TIMELINE_STORAGE_FORMAT=packed); timelines that don't fit stay raw
+    if STORAGE_FORMAT == 'packed':
+        pack_document(doc)
+    return doc
+
+
+def document_size(doc: Dict) -> int:
+    """Encoded BSON size: exactly what the server checks against its 16 MB limit"""
+    return len(bson.encode(doc))
+
+
+def existing_match_ids(db, match_ids: Iterable[str]) -> Set[str]:
+    """Match IDs that already have a timeline document (one $in query per 1000 IDs)"""
+    match_ids = list(match_ids)
+    existing = set()
+    for start in range(0, len(match_ids), EXISTS_CHUNK):
+        cursor = db.timelines.find(
+            {'matchId': {'$in': match_ids[start:start + EXISTS_CHUNK]}}, {'_id': 0, 'matchId': 1}
+        )
+        existing.update(doc['matchId'] for doc in cursor)
+    return existing
+
+
+def parallel_batches(items: List[T], load: Callable[[T], R], batch_size: int = BATCH_SIZE,
+                     workers: int = READ_WORKERS) -> Iterator[List[R]]:
+    """
+    load() every item on a thread pool, yielded in order a batch at a time; the
+    next batch is read while the caller writes the current one.
+    """
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='timeline-read') as pool:
+        batches = [items[start:start + batch_size] for start in range(0, len(items), batch_size)]
+        pending = [pool.submit(load, item) for item in batches[0]] if batches else []
+        for index in range(len(batches)):
+            current = pending
+            pending = [pool.submit(load, item) for item in batches[index + 1]] if index + 1 < len(batches) else []
+            yield [future.result() for future in current]
+
+
+def insert_new_timelines(db, docs: List[Dict]) -> List[Dict]:
+    """
+    Unordered insert_many. Documents that appeared since the existence check
+    (duplicate matchId) are left as they are; other errors are raised.
+    Returns the documents actually inserted.
+    """
+    if not docs:
+        return []
+    try:
+        db.timelines.insert_many(docs, ordered=False)
+        return docs
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(error.get('code') != DUPLICATE_KEY for error in errors):
+            raise
+        duplicates = {error.get('index') for error in errors}
+        return [doc for index, doc in enumerate(docs) if index not in duplicates]
+
+
+def _upsert(doc: Dict) -> UpdateOne:
+    # A raw document replacing a packed one (or vice versa) drops the other format's fields
+    stale = {'packed': '', 'format': ''} if doc.get('format') != PACKED_FORMAT else {}
+    update = {'$set': doc, **({'$unset': stale} if stale else {})}
+    return UpdateOne({'matchId': doc['matchId']}, update, upsert=True)
+
+
+def upsert_timelines(db, docs: List[Dict], batch_size: int = BATCH_SIZE) -> int:
+    """Replace-or-insert by matchId with one unordered bulk_write per batch; returns documents written"""
+    written = 0
+    for start in range(0, len(docs), batch_size):
+        batch = docs[start:start + batch_size]
+        result = db.timelines.bulk_write([_upsert(doc) for doc in batch], ordered=False)
+        written += result.upserted_count + result.matched_count
+    return written
+
+
+def upload_timeline_files(db, paths: List[Path], puuid: str, matches_by_id: Optional[Dict[str, Dict]] = None,
+                          skip_existing: bool = True, batch_size: int = BATCH_SIZE,
+                          workers: int = READ_WORKERS) -> Dict[str, int]:
+    """
+    Bulk-load timeline_<matchId>.json files for one player.
+
+    Existing matchIds are fetched with a single $in query and skipped without
+    being read; the rest are read and parsed on a thread pool, sized with BSON
+    encoding, inserted unordered in batches, and their positioned event rows
+    written with one delete + insert per batch.
+    """
+    started = time.perf_counter()
+    matches_by_id = matches_by_id or {}
+    stats = dict.fromkeys(('uploaded', 'events', 'skipped_exists', 'skipped_large', 'failed'), 0)
+
+    by_match = {path.name.replace('timeline_', '').replace('.json', ''): path for path in paths}
+    existing = existing_match_ids(db, by_match) if skip_existing else set()
+    stats['skipped_exists'] = len(existing)
+    todo = [(match_id, path) for match_id, path in by_match.items() if match_id not in existing]
+
+    def load(entry):
+        match_id, path = entry
+        try:
+            file_size = path.stat().st_size
+            with open(path, 'r', encoding='utf-8') as f:
+                timeline_data = json.load(f)
+            doc = build_timeline_document(match_id, puuid, timeline_data, matches_by_id.get(match_id),
+                                          fileSize=file_size)
+            if 'metadata' in timeline_data:
+                doc['metadata'] = timeline_data['metadata']
+            return doc, document_size(doc)
+        except Exception as e:
+            logger.error(f"Could not read timeline {path}: {e}")
+            return None, 0
+
+    for batch in parallel_batches(todo, load, batch_size, workers):
+        docs = []
+        for doc, size in batch:
+            if doc is None:
+                stats['failed'] += 1
+            elif size > MAX_DOCUMENT_BYTES:
+                logger.warning(f"Timeline {doc['matchId']} too large ({size:,} bytes BSON), skipping")
+                stats['skipped_large'] += 1
+            else:
+                docs.append(doc)
+
+        if docs:
+            # Events only for the documents this run inserted; a duplicate's rows belong to its existing timeline
+            inserted = insert_new_timelines(db, docs)
+            stats['uploaded'] += len(inserted)
+            stats['events'] += replace_events_bulk(db, inserted)
+        logger.info(f"Timelines: {stats['uploaded']}/{len(todo)} uploaded")
+
+    logger.info(
+        f"Uploaded {stats['uploaded']} timelines ({stats['events']:,} events) in "
+        f"{time.perf_counter() - started:.1f} s; {stats['skipped_exists']} existing, "
+        f"{stats['skipped_large']} too large, {stats['failed']} unreadable"
+    )
+    return stats
@@ -0,0 +1,113 @@
+"""
+Timeline Storage
+Pluggable store behind timeline reads and writes: MongoDB Atlas (default) or the local compressed-file tier
+"""
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.clients import ClientRegistry, get_clients
+from services.heatmap_queries import HEATMAP_CATEGORIES, find_timeline_participants, iter_heatmap_points
+from services.storage import LOCAL_STORE_DIR, STORAGE_BACKEND
+from services.timeline_events import create_event_indexes, replace_events_bulk
+from services.timeline_ingest import BATCH_SIZE, upsert_timelines
+
+logger = logging.getLogger(__name__)
+
+
+class TimelineStore(ABC):
+    """
+    `timelines` documents (matchId, puuid, participant fields, `data` raw or
+    packed; decode with timeline_codec.timeline_data) and the positioned
+    events heatmaps are built from.
+    """
+
+    name = 'timeline store'
+
+    @abstractmethod
+    def find_participants(self, puuid: str, limit: Optional[int] = None) -> List[Dict]:
+        """A player's timelines with participant fields only, shaped like heatmap_queries.TIMELINE_PARTICIPANT_PROJECTION"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_heatmap_points(self, puuid: str, participant_ids: Dict[str, int],
+                            categories: Iterable[str] = HEATMAP_CATEGORIES,
+                            start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Dict]:
+        """Classified heatmap points (same fields as heatmap_queries.iter_heatmap_points) for the given matches"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_timeline(self, match_id: str) -> Optional[Dict]:
+        """One timelines document by match ID"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_timelines(self, puuid: str) -> Iterator[Dict]:
+        """Every timelines document of a player"""
+        raise NotImplementedError
+
+    @abstractmethod
+    def put_timelines(self, docs: List[Dict], uploaded_at: Optional[datetime] = None) -> Tuple[int, int]:
+        """Insert or replace timelines and their event rows; returns (timelines, event rows) written"""
+        raise NotImplementedError
+
+
+class MongoTimelines(TimelineStore):
+    """`timelines` and `timeline_events` in MongoDB Atlas"""
+
+    name = 'MongoDB'
+
+    def __init__(self, clients: Optional[ClientRegistry] = None):
+        self._clients = clients
+
+    @property
+    def db(self):
+        return (self._clients or get_clients()).mongo_db()
+
+    def find_participants(self, puuid: str, limit: Optional[int] = None) -> List[Dict]:
+        return find_timeline_participants(self.db, puuid, limit=limit)
+
+    def iter_heatmap_points(self, puuid: str, participant_ids: Dict[str, int],
+                            categories: Iterable[str] = HEATMAP_CATEGORIES,
+                            start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Iterator[Dict]:
+        return iter_heatmap_points(self.db, puuid, participant_ids, categories, start_ms, end_ms)
+
+    def get_timeline(self, match_id: str) -> Optional[Dict]:
+        return self.db.timelines.find_one({'matchId': match_id}, {'_id': 0})
+
+    def iter_timelines(self, puuid: str) -> Iterator[Dict]:
+        return self.db.timelines.find({'puuid': puuid}, {'_id': 0}, batch_size=BATCH_SIZE)
+
+    def put_timelines(self, docs: List[Dict], uploaded_at: Optional[datetime] = None) -> Tuple[int, int]:
+        db = self.db
+        create_event_indexes(db)
+        timelines = events = 0
+        # Unordered bulk upserts and one event-row rewrite per batch instead of round trips per match
+        for start in range(0, len(docs), BATCH_SIZE):
+            batch = docs[start:start + BATCH_SIZE]
+            timelines += upsert_timelines(db, batch)
+            events += replace_events_bulk(db, batch, uploaded_at)
+        return timelines, events
+
+
+# Shared instance
+_timeline_store = None
+
+
+def get_timeline_store(clients: Optional[ClientRegistry] = None) -> TimelineStore:
+    """
+    The configured store (STORAGE_BACKEND). `clients` selects the registry a
+    MongoDB store uses; the local store ignores it.
+    """
+    global _timeline_store
+    if clients is not None and STORAGE_BACKEND != 'local':
+        return MongoTimelines(clients)
+    if _timeline_store is None:
+        if STORAGE_BACKEND == 'local':
+            # Imported on demand: pyarrow is only needed for the local tier
+            from services.local_store import LocalTimelines
+            _timeline_store = LocalTimelines(LOCAL_STORE_DIR)
+        else:
+            _timeline_store = MongoTimelines()
+    return _timeline_store
@@ -0,0 +1,75 @@
+"""
+Agent Tool Execution
+Runs the tool calls of one model turn concurrently (bounded, with a per-tool timeout) and returns results in call order
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tools running at once within a single turn
+AGENT_TOOL_CONCURRENCY = int(os.getenv('AGENT_TOOL_CONCURRENCY', '4'))
+# Seconds before a tool call is abandoned and reported to the model as an error
+AGENT_TOOL_TIMEOUT_SECONDS = float(os.getenv('AGENT_TOOL_TIMEOUT_SECONDS', '30'))
+
+
+class ToolCallBatch:
+    """
+    The tool calls of one turn. submit() starts a call right away (streaming turns
+    submit each tool_use block as soon as it completes); results() waits for all of
+    them and returns the results in submission order.
+
+    A call that times out or raises yields {"error": ...} in its slot instead of
+    failing the turn. Timing out a tool that runs on a worker thread stops waiting
+    for it; the thread itself finishes in the background.
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[str, Dict], Awaitable[Any]],
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ):
+        self.execute = execute
+        self.timeout = timeout or AGENT_TOOL_TIMEOUT_SECONDS
+        self._semaphore = asyncio.Semaphore(max_concurrency or AGENT_TOOL_CONCURRENCY)
+        self._tasks: List[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, tool_call: Dict):
+        self._tasks.append(asyncio.create_task(self._run(tool_call['name'], tool_call.get('input', {}))))
+
+    async def results(self) -> List[Any]:
+        return list(await asyncio.gather(*self._tasks))
+
+    def cancel(self):
+        for task in self._tasks:
+            task.cancel()
+
+    async def _run(self, name: str, tool_input: Dict) -> Any:
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(self.execute(name, tool_input), self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Tool {name} timed out after {self.timeout:g}s")
+                return {"error": f"Tool {name} timed out after {self.timeout:g} seconds"}
+            except Exception as e:
+                logger.error(f"Tool {name} failed: {e}", exc_info=True)
+                return {"error": str(e)}
+
+
+async def execute_tool_calls(
+    tool_calls: List[Dict],
+    execute: Callable[[str, Dict], Awaitable[Any]],
+    max_concurrency: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> List[Any]:
+    """Run every tool_use block concurrently; the turn takes about as long as its slowest tool"""
+    batch = ToolCallBatch(execute, max_concurrency, timeout)
+    for tool_call in tool_calls:
+        batch.submit(tool_call)
+    return await batch.results()
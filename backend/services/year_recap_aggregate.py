@@ -0,0 +1,327 @@
+"""
+Year Recap Aggregates
+Per-player materialized recap totals (running sums, champion/role/month buckets, streak state) updated as matches are ingested
+"""
+import time
+import logging
+from collections import Counter
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.clients import ClientRegistry
+from services.match_repository import MatchRepository, get_match_repository
+from services.match_summary import build_match_summary
+from services.storage import DynamoPlayerData, PlayerDataStore, RevisionConflict, get_player_data_store
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE_TYPE = 'aggregate#year_recap'
+# Bump when the document layout or fold changes; older documents are rebuilt on read
+AGGREGATE_VERSION = 1
+
+# Running sums: document key -> participant fields added per match
+SUM_FIELDS = {
+    'total_kills': ('kills',),
+    'total_deaths': ('deaths',),
+    'total_assists': ('assists',),
+    'total_damage': ('totalDamageDealtToChampions',),
+    'total_gold': ('goldEarned',),
+    'total_cs': ('totalMinionsKilled', 'neutralMinionsKilled'),
+    'total_vision_score': ('visionScore',),
+    'total_wards_placed': ('wardsPlaced',),
+    'pentakills': ('pentaKills',),
+    'quadrakills': ('quadraKills',),
+    'triple_kills': ('tripleKills',)
+}
+
+
+class OutOfOrderMatch(Exception):
+    """A match older than the last one folded in: streak state can't be updated incrementally"""
+
+
+def empty_aggregate() -> Dict:
+    return {
+        'version': AGGREGATE_VERSION,
+        'total_matches': 0,
+        'wins': 0,
+        'losses': 0,
+        **dict.fromkeys(SUM_FIELDS, 0),
+        'total_game_time': 0,
+        'first_bloods': 0,
+        'longest_game': 0,
+        'shortest_game': None,
+        # Buckets keep `first` (match ordinal when first seen) so tie order survives a DynamoDB round trip
+        'champions': {},
+        'roles': {},
+        'monthly': {},
+        'best_game': None,
+        'best_kda': 0,
+        'current_win_streak': 0,
+        'longest_win_streak': 0,
+        'last_match': None,  # [gameCreation, matchId] of the newest match folded in
+        'match_ids': []
+    }
+
+
+def _order_key(summary: Dict) -> Tuple[int, str]:
+    return (
+        int(summary.get('info', {}).get('gameCreation', 0)),
+        summary.get('metadata', {}).get('matchId') or ''
+    )
+
+
+def _bucket(buckets: Dict, key: str, ordinal: int) -> Dict:
+    return buckets.setdefault(key, {'games': 0, 'wins': 0, 'kills': 0, 'deaths': 0, 'assists': 0, 'first': ordinal})
+
+
+def apply_match(aggregate: Dict, summary: Dict, puuid: str) -> bool:
+    """
+    Fold one match summary into the aggregate (in place). Returns False for matches
+    already counted or without the player; raises OutOfOrderMatch for matches older
+    than the newest one already folded in.
+    """
+    match_id = summary.get('metadata', {}).get('matchId') or 'Unknown'
+    if match_id in aggregate['match_ids']:
+        return False
+
+    info = summary.get('info', {})
+    participant = next((p for p in info.get('participants', []) if p.get('puuid') == puuid), None)
+    if participant is None:
+        return False
+
+    order = _order_key(summary)
+    if aggregate['last_match'] is not None and order < tuple(aggregate['last_match']):
+        raise OutOfOrderMatch(match_id)
+
+    ordinal = aggregate['total_matches']
+    aggregate['total_matches'] += 1
+    aggregate['match_ids'].append(match_id)
+    aggregate['last_match'] = list(order)
+
+    won = bool(participant.get('win', False))
+    kills = int(participant.get('kills', 0))
+    deaths = int(participant.get('deaths', 0))
+    assists = int(participant.get('assists', 0))
+
+    aggregate['wins'] += 1 if won else 0
+    aggregate['losses'] += 0 if won else 1
+    for key, fields in SUM_FIELDS.items():
+        aggregate[key] += sum(int(participant.get(field, 0)) for field in fields)
+    aggregate['first_bloods'] += 1 if participant.get('firstBloodKill') else 0
+
+    game_duration = int(info.get('gameDuration', 0))
+    aggregate['total_game_time'] += game_duration
+    aggregate['longest_game'] = max(aggregate['longest_game'], game_duration)
+    if aggregate['shortest_game'] is None or game_duration < aggregate['shortest_game']:
+        aggregate['shortest_game'] = game_duration
+
+    champion = participant.get('championName', 'Unknown')
+    buckets = [_bucket(aggregate['champions'], champion, ordinal)]
+    role = participant.get('teamPosition', 'UNKNOWN')
+    if role:
+        buckets.append(_bucket(aggregate['roles'], role, ordinal))
+    for bucket in buckets:
+        bucket['games'] += 1
+        bucket['wins'] += 1 if won else 0
+        bucket['kills'] += kills
+        bucket['deaths'] += deaths
+        bucket['assists'] += assists
+
+    game_creation = order[0]
+    if game_creation:
+        month = aggregate['monthly'].setdefault(datetime.fromtimestamp(game_creation / 1000).strftime('%Y-%m'),
+                                                {'games': 0, 'wins': 0})
+        month['games'] += 1
+        month['wins'] += 1 if won else 0
+
+    kda = (kills + assists) / max(deaths, 1)
+    if kda > aggregate['best_kda']:
+        aggregate['best_kda'] = kda
+        aggregate['best_game'] = {
+            'kda': kda,
+            'kills': kills,
+            'deaths': deaths,
+            'assists': assists,
+            'champion': champion,
+            'won': won,
+            'match_id': match_id
+        }
+
+    if won:
+        aggregate['current_win_streak'] += 1
+        aggregate['longest_win_streak'] = max(aggregate['longest_win_streak'], aggregate['current_win_streak'])
+    else:
+        aggregate['current_win_streak'] = 0
+    return True
+
+
+def build_aggregate(puuid: str, summaries: Iterable[Dict]) -> Dict:
+    """Full recompute: fold every match summary, oldest first"""
+    aggregate = empty_aggregate()
+    for summary in sorted(summaries, key=_order_key):
+        apply_match(aggregate, summary, puuid)
+    return aggregate
+
+
+def _ordered_counter(buckets: Dict) -> Counter:
+    return Counter({key: bucket['games'] for key, bucket in sorted(buckets.items(), key=lambda kv: kv[1]['first'])})
+
+
+def to_matches_data(aggregate: Dict) -> Dict:
+    """The aggregate in the shape NarrativeGenerator's milestone/stat/card builders read"""
+    data = {key: value for key, value in aggregate.items() if key not in ('champions', 'roles', 'monthly', 'match_ids')}
+    data['shortest_game'] = aggregate['shortest_game'] if aggregate['shortest_game'] is not None else float('inf')
+    data['champions_played'] = _ordered_counter(aggregate['champions'])
+    data['roles_played'] = _ordered_counter(aggregate['roles'])
+    data['monthly_stats'] = {month: dict(aggregate['monthly'][month]) for month in sorted(aggregate['monthly'])}
+    data['champion_stats'] = aggregate['champions']
+    data['role_stats'] = aggregate['roles']
+    return data
+
+
+def _to_dynamo(value):
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: _to_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_dynamo(v) for v in value]
+    return value
+
+
+def _from_dynamo(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: _from_dynamo(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_dynamo(v) for v in value]
+    return value
+
+
+class YearRecapAggregates:
+    """
+    Reads and maintains the `aggregate#year_recap` item stored next to a
+    player's matches in `lol-player-data`.
+
+    apply_matches() folds newly ingested matches into the stored document
+    (read, fold, conditional put on `revision`, retried on conflict). Matches
+    already counted are skipped; a match older than the newest one counted
+    (back-filled history) triggers a rebuild from the stored summaries, since
+    streaks depend on match order. Rebuilds read consistently and write
+    conditionally too, so no ingested match is ever left out of the totals.
+    """
+
+    MAX_WRITE_ATTEMPTS = 3
+
+    def __init__(self, table=None, match_repository: Optional[MatchRepository] = None,
+                 clients: Optional[ClientRegistry] = None, store: Optional[PlayerDataStore] = None):
+        if store is None:
+            store = DynamoPlayerData(table=table) if table is not None else get_player_data_store(clients)
+        self.store = store
+        self.match_repository = match_repository or get_match_repository()
+
+    def get(self, puuid: str) -> Optional[Dict]:
+        """The stored aggregate (one GetItem), or None if missing or from an older layout"""
+        item = self._get_item(puuid)
+        if item is None:
+            return None
+        aggregate = _from_dynamo(item['data'])
+        return aggregate if aggregate.get('version') == AGGREGATE_VERSION else None
+
+    def get_or_build(self, puuid: str) -> Dict:
+        """Stored aggregate, built from the player's summaries on first use"""
+        aggregate = self.get(puuid)
+        if aggregate is None:
+            aggregate = self.rebuild(puuid)
+        return aggregate
+
+    def apply_matches(self, puuid: str, matches: List[Dict]) -> Dict:
+        """Fold newly ingested Riot matches into the player's aggregate"""
+        summaries = sorted(
+            (summary for summary in (build_match_summary(match, puuid) for match in matches) if summary),
+            key=_order_key
+        )
+
+        for _ in range(self.MAX_WRITE_ATTEMPTS):
+            item = self._get_item(puuid)
+            if item is None or item['data'].get('version') != AGGREGATE_VERSION:
+                return self.rebuild(puuid, summaries)
+
+            aggregate = _from_dynamo(item['data'])
+            try:
+                applied = sum(apply_match(aggregate, summary, puuid) for summary in summaries)
+            except OutOfOrderMatch as e:
+                logger.info(f"Year recap aggregate for {puuid[:8]}...: match {e} is older than the last counted, rebuilding")
+                return self.rebuild(puuid, summaries)
+
+            if not applied:
+                return aggregate
+            try:
+                revision = int(item['revision'])
+                self._put(puuid, aggregate, revision + 1, expected_revision=revision)
+                logger.info(f"Year recap aggregate for {puuid[:8]}...: +{applied} matches ({aggregate['total_matches']} total)")
+                return aggregate
+            except RevisionConflict:
+                logger.info(f"Year recap aggregate for {puuid[:8]}... changed concurrently, retrying")
+
+        return self.rebuild(puuid, summaries)
+
+    def rebuild(self, puuid: str, summaries: Iterable[Dict] = ()) -> Dict:
+        """
+        Full recompute from every stored summary plus `summaries` (just-ingested
+        match summaries a read may not return yet), replacing the stored document.
+        Reads are strongly consistent and the write is conditional on the revision
+        read first, so a concurrent apply_matches() is retried over, never overwritten.
+        """
+        started = time.perf_counter()
+        summaries = list(summaries)
+
+        for _ in range(self.MAX_WRITE_ATTEMPTS):
+            # Revision first: anything written after this read makes the put below conflict
+            current = self._get_item(puuid, consistent=True)
+            by_match = {item['matchId']: item['data'] for item in self.match_repository.load_summaries(puuid, consistent=True)}
+            for summary in summaries:
+                by_match.setdefault(summary.get('metadata', {}).get('matchId'), summary)
+            aggregate = build_aggregate(puuid, by_match.values())
+
+            revision = int(current['revision']) if current else 0
+            try:
+                self._put(puuid, aggregate, revision + 1, expected_revision=revision)
+            except RevisionConflict:
+                logger.info(f"Year recap aggregate for {puuid[:8]}... changed during rebuild, retrying")
+                continue
+            logger.info(
+                f"Year recap aggregate rebuilt for {puuid[:8]}...: {aggregate['total_matches']} matches "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            return aggregate
+
+        raise RevisionConflict(AGGREGATE_TYPE)
+
+    def _get_item(self, puuid: str, consistent: bool = False) -> Optional[Dict]:
+        store = self.store.consistent_reads() if consistent else self.store
+        return store.get_item(puuid, AGGREGATE_TYPE)
+
+    def _put(self, puuid: str, aggregate: Dict, revision: int, expected_revision: Optional[int] = None):
+        item = {
+            'puuid': puuid,
+            'dataType': AGGREGATE_TYPE,
+            'data': _to_dynamo(aggregate),
+            'revision': revision,
+            'updatedAt': datetime.utcnow().isoformat()
+        }
+        self.store.put_item(item, expected_revision)
+
+
+# Shared instance
+_year_recap_aggregates = None
+
+
+def get_year_recap_aggregates() -> YearRecapAggregates:
+    """Get or create the YearRecapAggregates singleton"""
+    global _year_recap_aggregates
+    if _year_recap_aggregates is None:
+        _year_recap_aggregates = YearRecapAggregates()
+    return _year_recap_aggregates
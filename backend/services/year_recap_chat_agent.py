@@ -4,12 +4,22 @@ Handles conversational queries about year-long performance and achievements
 Supports dynamic data fetching and UI manipulation tools
 """
 
-import boto3
 import json
-from typing import List, Dict, Optional, Any
+from typing import Any, AsyncIterator, Dict, List, Optional
 import logging
 import os
 from decimal import Decimal
+from services.bedrock_ai import invoke_model_json
+from services.bedrock_stream import stream_message
+from services.blocking import run_blocking
+from services.chat_context import (
+    add_usage, cached_system, cached_tools, compact_history, get_chat_metrics, prompt_cache_enabled
+)
+from services.clients import ClientRegistry, get_clients
+from services.match_repository import MatchRepository, get_match_repository
+from services.match_snapshot import MatchSnapshot, MatchSnapshotStore, get_match_snapshots
+from services.response_cache import ResponseCache, get_response_cache, replay_response
+from services.tool_execution import ToolCallBatch, execute_tool_calls
 
 logger = logging.getLogger(__name__)
 
@@ -26,12 +36,15 @@ def convert_decimals(obj):
 
 
 class YearRecapChatAgent:
-    def __init__(self):
-        self.bedrock = boto3.client(
-            service_name='bedrock-runtime',
-            region_name='us-east-1'
-        )
+    def __init__(self, match_repository: Optional[MatchRepository] = None,
+                 clients: Optional[ClientRegistry] = None, snapshots: Optional[MatchSnapshotStore] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        self.match_repository = match_repository or get_match_repository()
+        self.snapshots = snapshots or get_match_snapshots()
+        self.response_cache = response_cache or get_response_cache()
+        self.bedrock = (clients or get_clients()).bedrock_runtime('us-east-1')
         self.model_id = "anthropic.claude-3-sonnet-20240229-v1:0"
+        self.prompt_cache = prompt_cache_enabled(self.model_id)
         self.tools = self._define_tools()
 
     def _define_tools(self) -> List[Dict]:
@@ -203,7 +216,8 @@ class YearRecapChatAgent:
             }
         ]
 
-    def chat(self, message: str, year_recap_data: Dict, puuid: str, conversation_history: Optional[List[Dict]] = None) -> Dict:
+    async def chat(self, message: str, year_recap_data: Dict, puuid: str,
+                   conversation_history: Optional[List[Dict]] = None) -> Dict:
         """
         Process year recap chat messages with tool-calling capabilities
 
@@ -219,42 +233,24 @@ class YearRecapChatAgent:
         if conversation_history is None:
             conversation_history = []
 
-        # Build context from year recap data
-        context = self._build_year_context(year_recap_data)
+        # Opening questions are answered from the cache until the player's data changes
+        cache_key = None
+        if not conversation_history:
+            cache_key = self.response_cache.key('year_recap_chat', message, year_recap_data, puuid)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return replay_response(cached, message)
 
-        # System prompt for year recap assistant
-        system_prompt = """You are an agentic League of Legends Year Recap Assistant with tool-calling capabilities. You help players understand their year-long journey, achievements, and growth.
+        system_prompt = self._build_system_prompt(year_recap_data)
 
-Your capabilities:
-- Answer questions about yearly performance, patterns, and milestones
-- Use tools to fetch detailed data when users ask specific questions
-- Use UI action tools to help users visualize data on the page
-- Compare champions, roles, and time periods
-- Highlight memorable moments and achievements
-- Provide insights on champion pool, playstyle evolution, and trends
-
-Important guidelines:
-- When users ask about specific champions, roles, or time periods, USE THE APPROPRIATE TOOLS to fetch that data
-- When it would help the user, use UI action tools (filter_by_champion, switch_heatmap_category, etc.)
-- Keep responses concise (2-3 sentences)
-- Focus on year-long trends and patterns
-- Be encouraging and celebratory
-- **ALWAYS format your responses using Markdown** for better readability:
-  * Use **bold** for emphasis on key stats or achievements
-  * Use bullet points (-) for lists
-  * Use headings (##) for sections when appropriate
-  * Use `code formatting` for champion names, items, or specific game terms
-  * Use line breaks to separate ideas
-
-Available context about the player's year:
-""" + context
-
-        # Build conversation messages
-        messages = conversation_history + [{"role": "user", "content": message}]
+        # Build conversation messages (older turns compacted past the token budget)
+        messages, compacted_tokens = compact_history(conversation_history + [{"role": "user", "content": message}])
 
         # Tool-calling loop
         tools_used = []
         ui_actions = []
+        usage = {}
+        response_text = ""
         max_iterations = 5
         iteration = 0
 
@@ -262,114 +258,48 @@ Available context about the player's year:
             while iteration < max_iterations:
                 iteration += 1
 
-                # Call Bedrock with tools
-                body = {
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": 1000,
-                    "temperature": 0.7,
-                    "system": system_prompt,
-                    "messages": messages,
-                    "tools": self.tools
-                }
-
-                response = self.bedrock.invoke_model(
-                    modelId=self.model_id,
-                    body=json.dumps(body)
-                )
-
-                result = json.loads(response['body'].read())
-                stop_reason = result.get('stop_reason')
+                # Call Bedrock with tools (off the event loop)
+                body = json.dumps(self._request_body(system_prompt, messages))
+                result = await run_blocking(invoke_model_json, self.bedrock, self.model_id, body)
+                add_usage(usage, result.get('usage'))
 
-                # Process response content
-                assistant_message = {"role": "assistant", "content": []}
-                response_text = ""
-                has_tool_use = False
-
-                for content in result.get('content', []):
-                    if content.get('type') == 'text':
-                        response_text += content['text']
-                        assistant_message["content"].append(content)
-                    elif content.get('type') == 'tool_use':
-                        has_tool_use = True
-                        tool_name = content['name']
-                        tool_input = content['input']
-                        tool_use_id = content['id']
-
-                        logger.info(f"Agent using tool: {tool_name} with input: {tool_input}")
-
-                        # Execute the tool
-                        tool_result = self._execute_tool(tool_name, tool_input, puuid)
-
-                        # Convert Decimals to float for JSON serialization
-                        tool_result_converted = convert_decimals(tool_result)
-
-                        tools_used.append({
-                            "name": tool_name,
-                            "input": tool_input,
-                            "result": tool_result_converted
-                        })
-
-                        # Check if this is a UI action tool
-                        if self._is_ui_action_tool(tool_name):
-                            ui_actions.append({
-                                "action": tool_name,
-                                "params": tool_input
-                            })
-
-                        # Add tool use to assistant message
-                        assistant_message["content"].append(content)
-
-                        # Add tool result to messages
-                        messages.append(assistant_message)
-                        messages.append({
-                            "role": "user",
-                            "content": [{
-                                "type": "tool_result",
-                                "tool_use_id": tool_use_id,
-                                "content": json.dumps(tool_result_converted)
-                            }]
-                        })
-                        break
+                content = result.get('content', [])
+                response_text = "".join(c['text'] for c in content if c.get('type') == 'text')
+                tool_calls = [c for c in content if c.get('type') == 'tool_use']
 
                 # If no tool use, we're done
-                if not has_tool_use:
-                    messages.append(assistant_message)
+                if not tool_calls:
+                    messages.append({"role": "assistant", "content": content})
                     break
 
+                for tool_call in tool_calls:
+                    logger.info(f"Agent using tool: {tool_call['name']} with input: {tool_call['input']}")
+
+                # Independent tools run concurrently; results keep the call order
+                results = await execute_tool_calls(tool_calls, self._tool_executor(puuid))
+
+                messages.append({"role": "assistant", "content": content})
+                messages.append({
+                    "role": "user",
+                    "content": self._record_tool_results(tool_calls, results, tools_used, ui_actions)
+                })
+
             # Extract final response text
             final_response = response_text or "I'm here to help you understand your year! What would you like to know?"
 
             # Update conversation history (only include text messages for next iteration)
-            # Important: Only keep user messages with string content and final assistant responses (not tool use messages)
-            updated_history = []
-            for msg in messages:
-                if msg["role"] == "user" and isinstance(msg.get("content"), str):
-                    # Only add user messages with string content (skip tool_result messages)
-                    updated_history.append(msg)
-                elif msg["role"] == "assistant":
-                    # Check if this assistant message contains tool_use
-                    has_tool_use_in_msg = False
-                    text_content = ""
-
-                    if isinstance(msg.get("content"), list):
-                        for c in msg["content"]:
-                            if c.get("type") == "tool_use":
-                                has_tool_use_in_msg = True
-                            elif c.get("type") == "text":
-                                text_content += c["text"]
-                    elif isinstance(msg.get("content"), str):
-                        text_content = msg["content"]
-
-                    # Only add assistant messages that don't contain tool_use (final responses only)
-                    if text_content and not has_tool_use_in_msg:
-                        updated_history.append({"role": "assistant", "content": text_content})
+            updated_history = self._history_for_next_turn(messages)
 
-            return {
+            response = {
                 "response": final_response,
                 "conversation_history": updated_history,
                 "tools_used": tools_used,
-                "ui_actions": ui_actions
+                "ui_actions": ui_actions,
+                "token_usage": get_chat_metrics().record('year_recap_chat', usage, compacted_tokens)
             }
+            if cache_key is not None:
+                self.response_cache.put(cache_key, response)
+            return response
 
         except Exception as e:
             logger.error(f"Error in year recap chat: {e}", exc_info=True)
@@ -380,6 +310,184 @@ Available context about the player's year:
                 "ui_actions": ui_actions
             }
 
+    async def chat_stream(self, message: str, year_recap_data: Dict, puuid: str,
+                          conversation_history: Optional[List[Dict]] = None) -> AsyncIterator[Dict]:
+        """
+        Streaming variant of chat()
+
+        Yields {"type": "text"} deltas as they arrive; each tool call starts as soon as its
+        input is complete ({"type": "tool_use"}) and runs alongside the rest of the turn
+        ({"type": "ui_action"} follows for UI tools once results are in).
+        Ends with {"type": "done"} carrying the fields chat() returns ({"type": "error"} on failure).
+        """
+        if conversation_history is None:
+            conversation_history = []
+
+        system_prompt = self._build_system_prompt(year_recap_data)
+        messages, compacted_tokens = compact_history(conversation_history + [{"role": "user", "content": message}])
+
+        tools_used = []
+        ui_actions = []
+        usage = {}
+        response_text = ""
+        max_iterations = 5
+
+        try:
+            for iteration in range(max_iterations):
+                body = json.dumps(self._request_body(system_prompt, messages))
+                response_text = ""
+                content = []
+                tool_calls = []
+                batch = ToolCallBatch(self._tool_executor(puuid))
+
+                try:
+                    async for event in stream_message(self.bedrock, self.model_id, body):
+                        if event["type"] == "text":
+                            response_text += event["text"]
+                            yield event
+                        elif event["type"] == "tool_use":
+                            logger.info(f"Agent using tool: {event['name']} with input: {event['input']}")
+                            yield {"type": "tool_use", "name": event["name"], "input": event["input"]}
+                            tool_calls.append(event)
+                            batch.submit(event)
+                        elif event["type"] == "message":
+                            content = event["message"]["content"]
+                            add_usage(usage, event["message"]["usage"])
+                except BaseException:
+                    batch.cancel()
+                    raise
+
+                if not tool_calls:
+                    messages.append({"role": "assistant", "content": content})
+                    break
+
+                ui_count = len(ui_actions)
+                tool_results = self._record_tool_results(tool_calls, await batch.results(), tools_used, ui_actions)
+                for ui_action in ui_actions[ui_count:]:
+                    yield {"type": "ui_action", **ui_action}
+
+                messages.append({"role": "assistant", "content": content})
+                messages.append({"role": "user", "content": tool_results})
+
+            yield {
+                "type": "done",
+                "response": response_text or "I'm here to help you understand your year! What would you like to know?",
+                "conversation_history": self._history_for_next_turn(messages),
+                "tools_used": tools_used,
+                "ui_actions": ui_actions,
+                "token_usage": get_chat_metrics().record('year_recap_chat', usage, compacted_tokens)
+            }
+
+        except Exception as e:
+            logger.error(f"Error in year recap chat stream: {e}", exc_info=True)
+            yield {
+                "type": "error",
+                "response": "Sorry, I encountered an error processing your question. Please try again!",
+                "conversation_history": conversation_history,
+                "tools_used": tools_used,
+                "ui_actions": ui_actions
+            }
+
+    def _tool_executor(self, puuid: str):
+        """Async runner for one tool call: the tools read DynamoDB/MongoDB, so they run on the worker pool"""
+        async def execute(tool_name: str, tool_input: Dict) -> Any:
+            return await run_blocking(self._execute_tool, tool_name, tool_input, puuid)
+        return execute
+
+    def _record_tool_results(self, tool_calls: List[Dict], results: List[Any],
+                             tools_used: List[Dict], ui_actions: List[Dict]) -> List[Dict]:
+        """Record each call (and its UI action) and build the tool_result blocks for the next user message"""
+        tool_results = []
+        for tool_call, tool_result in zip(tool_calls, results):
+            # Convert Decimals to float for JSON serialization
+            tool_result = convert_decimals(tool_result)
+            tools_used.append({
+                "name": tool_call["name"],
+                "input": tool_call["input"],
+                "result": tool_result
+            })
+
+            # Check if this is a UI action tool
+            if self._is_ui_action_tool(tool_call["name"]):
+                ui_actions.append({
+                    "action": tool_call["name"],
+                    "params": tool_call["input"]
+                })
+
+            tool_results.append({
+                "type": "tool_result",
+                "tool_use_id": tool_call["id"],
+                "content": json.dumps(tool_result)
+            })
+        return tool_results
+
+    def _build_system_prompt(self, year_recap_data: Dict) -> str:
+        """System prompt for the year recap assistant with the player's year as context"""
+        context = self._build_year_context(year_recap_data)
+        return """You are an agentic League of Legends Year Recap Assistant with tool-calling capabilities. You help players understand their year-long journey, achievements, and growth.
+
+Your capabilities:
+- Answer questions about yearly performance, patterns, and milestones
+- Use tools to fetch detailed data when users ask specific questions
+- Use UI action tools to help users visualize data on the page
+- Compare champions, roles, and time periods
+- Highlight memorable moments and achievements
+- Provide insights on champion pool, playstyle evolution, and trends
+
+Important guidelines:
+- When users ask about specific champions, roles, or time periods, USE THE APPROPRIATE TOOLS to fetch that data
+- When it would help the user, use UI action tools (filter_by_champion, switch_heatmap_category, etc.)
+- Keep responses concise (2-3 sentences)
+- Focus on year-long trends and patterns
+- Be encouraging and celebratory
+- **ALWAYS format your responses using Markdown** for better readability:
+  * Use **bold** for emphasis on key stats or achievements
+  * Use bullet points (-) for lists
+  * Use headings (##) for sections when appropriate
+  * Use `code formatting` for champion names, items, or specific game terms
+  * Use line breaks to separate ideas
+
+Available context about the player's year:
+""" + context
+
+    def _request_body(self, system_prompt: str, messages: List[Dict]) -> Dict:
+        return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1000,
+            "temperature": 0.7,
+            # Year context and tool schemas are the same every turn: cache them
+            "system": cached_system(system_prompt, self.prompt_cache),
+            "messages": messages,
+            "tools": cached_tools(self.tools, self.prompt_cache)
+        }
+
+    def _history_for_next_turn(self, messages: List[Dict]) -> List[Dict]:
+        """Only user messages with string content and final assistant responses (not tool use messages)"""
+        # Important: Only keep user messages with string content and final assistant responses (not tool use messages)
+        updated_history = []
+        for msg in messages:
+            if msg["role"] == "user" and isinstance(msg.get("content"), str):
+                # Only add user messages with string content (skip tool_result messages)
+                updated_history.append(msg)
+            elif msg["role"] == "assistant":
+                # Check if this assistant message contains tool_use
+                has_tool_use_in_msg = False
+                text_content = ""
+
+                if isinstance(msg.get("content"), list):
+                    for c in msg["content"]:
+                        if c.get("type") == "tool_use":
+                            has_tool_use_in_msg = True
+                        elif c.get("type") == "text":
+                            text_content += c["text"]
+                elif isinstance(msg.get("content"), str):
+                    text_content = msg["content"]
+
+                # Only add assistant messages that don't contain tool_use (final responses only)
+                if text_content and not has_tool_use_in_msg:
+                    updated_history.append({"role": "assistant", "content": text_content})
+        return updated_history
+
     def _build_year_context(self, year_recap_data: Dict) -> str:
         """Build a comprehensive context string from year recap data"""
         stats = year_recap_data.get('stats', {})
@@ -463,35 +571,18 @@ Available context about the player's year:
             logger.error(f"Error executing tool {tool_name}: {e}", exc_info=True)
             return {"error": str(e)}
 
+    def _player_snapshot(self, puuid: str) -> MatchSnapshot:
+        """All stored matches for the player, loaded once and shared by every tool in the conversation"""
+        return self.snapshots.get_stored(
+            puuid, lambda: [item.get('data', {}) for item in self.match_repository.get_summaries(puuid)]
+        )
+
     def _get_champion_performance(self, puuid: str, champion_name: str) -> Dict:
         """Fetch performance stats for a specific champion"""
-        import boto3
-        from boto3.dynamodb.conditions import Key
         from collections import defaultdict
 
         try:
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('lol-player-data')
-
-            # Fetch all matches
-            matches = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                        ExclusiveStartKey=last_evaluated_key
-                    )
-                else:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                    )
-
-                matches.extend(response['Items'])
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            snapshot = self._player_snapshot(puuid)
 
             # Filter matches for the champion
             champion_matches = []
@@ -503,21 +594,16 @@ Available context about the player's year:
             total_damage = 0
             total_vision = 0
 
-            for match_item in matches:
-                match_data = match_item.get('data', {})
-                participants = match_data.get('info', {}).get('participants', [])
-
-                for participant in participants:
-                    if participant.get('puuid') == puuid and participant.get('championName') == champion_name:
-                        champion_matches.append(participant)
-                        total_kills += participant.get('kills', 0)
-                        total_deaths += participant.get('deaths', 0)
-                        total_assists += participant.get('assists', 0)
-                        total_wins += 1 if participant.get('win', False) else 0
-                        total_gold += participant.get('goldEarned', 0)
-                        total_damage += participant.get('totalDamageDealtToChampions', 0)
-                        total_vision += participant.get('visionScore', 0)
-                        break
+            for _, participant in snapshot.rows:
+                if participant.get('championName') == champion_name:
+                    champion_matches.append(participant)
+                    total_kills += participant.get('kills', 0)
+                    total_deaths += participant.get('deaths', 0)
+                    total_assists += participant.get('assists', 0)
+                    total_wins += 1 if participant.get('win', False) else 0
+                    total_gold += participant.get('goldEarned', 0)
+                    total_damage += participant.get('totalDamageDealtToChampions', 0)
+                    total_vision += participant.get('visionScore', 0)
 
             if not champion_matches:
                 return {"error": f"No matches found for {champion_name}"}
@@ -545,13 +631,7 @@ Available context about the player's year:
 
     def _get_role_performance(self, puuid: str, role: str) -> Dict:
         """Fetch performance stats for a specific role"""
-        import boto3
-        from boto3.dynamodb.conditions import Key
-
         try:
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('lol-player-data')
-
             # Role mapping
             role_map = {
                 'Top': 'TOP',
@@ -562,25 +642,7 @@ Available context about the player's year:
             }
             riot_role = role_map.get(role, role)
 
-            # Fetch matches
-            matches = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                        ExclusiveStartKey=last_evaluated_key
-                    )
-                else:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                    )
-
-                matches.extend(response['Items'])
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            snapshot = self._player_snapshot(puuid)
 
             # Filter by role
             role_stats = {
@@ -591,19 +653,14 @@ Available context about the player's year:
                 'total_damage': 0
             }
 
-            for match_item in matches:
-                match_data = match_item.get('data', {})
-                participants = match_data.get('info', {}).get('participants', [])
-
-                for participant in participants:
-                    if participant.get('puuid') == puuid and participant.get('teamPosition') == riot_role:
-                        role_stats['matches'] += 1
-                        role_stats['wins'] += 1 if participant.get('win', False) else 0
-                        challenges = participant.get('challenges', {})
-                        role_stats['total_kda'] += float(challenges.get('kda', 0))
-                        role_stats['total_vision'] += participant.get('visionScore', 0)
-                        role_stats['total_damage'] += participant.get('totalDamageDealtToChampions', 0)
-                        break
+            for _, participant in snapshot.rows:
+                if participant.get('teamPosition') == riot_role:
+                    role_stats['matches'] += 1
+                    role_stats['wins'] += 1 if participant.get('win', False) else 0
+                    challenges = participant.get('challenges', {})
+                    role_stats['total_kda'] += float(challenges.get('kda', 0))
+                    role_stats['total_vision'] += participant.get('visionScore', 0)
+                    role_stats['total_damage'] += participant.get('totalDamageDealtToChampions', 0)
 
             if role_stats['matches'] == 0:
                 return {"error": f"No matches found for {role} role"}
@@ -623,35 +680,11 @@ Available context about the player's year:
 
     def _get_time_filtered_stats(self, puuid: str, time_range: int) -> Dict:
         """Get stats for recent matches"""
-        import boto3
-        from boto3.dynamodb.conditions import Key
-
         try:
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('lol-player-data')
-
-            # Fetch matches
-            matches = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                        ExclusiveStartKey=last_evaluated_key
-                    )
-                else:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                    )
-
-                matches.extend(response['Items'])
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            snapshot = self._player_snapshot(puuid)
 
             # Limit to time_range
-            recent_matches = matches[:time_range]
+            recent_matches = snapshot.window(time_range)
 
             # Calculate stats
             stats = {
@@ -662,19 +695,13 @@ Available context about the player's year:
                 'total_damage': 0
             }
 
-            for match_item in recent_matches:
-                match_data = match_item.get('data', {})
-                participants = match_data.get('info', {}).get('participants', [])
-
-                for participant in participants:
-                    if participant.get('puuid') == puuid:
-                        stats['matches'] += 1
-                        stats['wins'] += 1 if participant.get('win', False) else 0
-                        challenges = participant.get('challenges', {})
-                        stats['total_kda'] += float(challenges.get('kda', 0))
-                        stats['total_vision'] += participant.get('visionScore', 0)
-                        stats['total_damage'] += participant.get('totalDamageDealtToChampions', 0)
-                        break
+            for _, participant in recent_matches.rows:
+                stats['matches'] += 1
+                stats['wins'] += 1 if participant.get('win', False) else 0
+                challenges = participant.get('challenges', {})
+                stats['total_kda'] += float(challenges.get('kda', 0))
+                stats['total_vision'] += participant.get('visionScore', 0)
+                stats['total_damage'] += participant.get('totalDamageDealtToChampions', 0)
 
             if stats['matches'] == 0:
                 return {"error": "No recent matches found"}
@@ -701,31 +728,8 @@ Available context about the player's year:
 
     def _get_vision_details(self, puuid: str) -> Dict:
         """Get detailed vision statistics"""
-        import boto3
-        from boto3.dynamodb.conditions import Key
-
         try:
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('lol-player-data')
-
-            matches = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                        ExclusiveStartKey=last_evaluated_key
-                    )
-                else:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                    )
-
-                matches.extend(response['Items'])
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            snapshot = self._player_snapshot(puuid)
 
             vision_totals = {
                 'wards_placed': 0,
@@ -735,18 +739,12 @@ Available context about the player's year:
                 'matches': 0
             }
 
-            for match_item in matches:
-                match_data = match_item.get('data', {})
-                participants = match_data.get('info', {}).get('participants', [])
-
-                for participant in participants:
-                    if participant.get('puuid') == puuid:
-                        vision_totals['matches'] += 1
-                        vision_totals['wards_placed'] += participant.get('wardsPlaced', 0)
-                        vision_totals['wards_killed'] += participant.get('wardsKilled', 0)
-                        vision_totals['control_wards'] += participant.get('detectorWardsPlaced', 0)
-                        vision_totals['vision_score'] += participant.get('visionScore', 0)
-                        break
+            for _, participant in snapshot.rows:
+                vision_totals['matches'] += 1
+                vision_totals['wards_placed'] += participant.get('wardsPlaced', 0)
+                vision_totals['wards_killed'] += participant.get('wardsKilled', 0)
+                vision_totals['control_wards'] += participant.get('detectorWardsPlaced', 0)
+                vision_totals['vision_score'] += participant.get('visionScore', 0)
 
             if vision_totals['matches'] == 0:
                 return {"error": "No matches found"}
@@ -765,31 +763,8 @@ Available context about the player's year:
 
     def _get_objective_details(self, puuid: str) -> Dict:
         """Get detailed objective statistics"""
-        import boto3
-        from boto3.dynamodb.conditions import Key
-
         try:
-            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
-            table = dynamodb.Table('lol-player-data')
-
-            matches = []
-            last_evaluated_key = None
-
-            while True:
-                if last_evaluated_key:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#'),
-                        ExclusiveStartKey=last_evaluated_key
-                    )
-                else:
-                    response = table.query(
-                        KeyConditionExpression=Key('puuid').eq(puuid) & Key('dataType').begins_with('match#')
-                    )
-
-                matches.extend(response['Items'])
-                last_evaluated_key = response.get('LastEvaluatedKey')
-                if not last_evaluated_key:
-                    break
+            snapshot = self._player_snapshot(puuid)
 
             objective_totals = {
                 'dragons': 0,
@@ -799,19 +774,13 @@ Available context about the player's year:
                 'matches': 0
             }
 
-            for match_item in matches:
-                match_data = match_item.get('data', {})
-                participants = match_data.get('info', {}).get('participants', [])
-
-                for participant in participants:
-                    if participant.get('puuid') == puuid:
-                        objective_totals['matches'] += 1
-                        challenges = participant.get('challenges', {})
-                        objective_totals['dragons'] += int(challenges.get('dragonTakedowns', 0) or 0)
-                        objective_totals['barons'] += int(challenges.get('teamBaronKills', 0) or 0)
-                        objective_totals['towers'] += participant.get('turretKills', 0)
-                        objective_totals['first_blood'] += 1 if participant.get('firstBloodKill') else 0
-                        break
+            for _, participant in snapshot.rows:
+                objective_totals['matches'] += 1
+                challenges = participant.get('challenges', {})
+                objective_totals['dragons'] += int(challenges.get('dragonTakedowns', 0) or 0)
+                objective_totals['barons'] += int(challenges.get('teamBaronKills', 0) or 0)
+                objective_totals['towers'] += participant.get('turretKills', 0)
+                objective_totals['first_blood'] += 1 if participant.get('firstBloodKill') else 0
 
             if objective_totals['matches'] == 0:
                 return {"error": "No matches found"}
@@ -844,7 +813,9 @@ Available context about the player's year:
                 role=filters.get('role'),
                 match_count=filters.get('match_count'),
                 game_time_start=filters.get('game_time_start'),
-                game_time_end=filters.get('game_time_end')
+                game_time_end=filters.get('game_time_end'),
+                # The UI draws the points; density grids would only inflate the tool result sent to the model
+                include_density=False
             )
 
             logger.info(f"Filtered heatmap: {data['total_events']} events from {data['matches_analyzed']} matches")
@@ -0,0 +1,43 @@
+"""
+Chat response cache tests
+Similar questions share an answer only when they name the same numbers, champions, roles and queues
+"""
+from services import response_cache
+from services.response_cache import ResponseCache
+from services.static_data import StaticDataService
+
+AHRI = "how many times did I die early on Ahri in my ranked solo games this year"
+ZED = "how many times did I die early on Zed in my ranked solo games this year"
+
+
+def cached_answer(cache: ResponseCache, question: str):
+    return cache.get(cache.key('coach', question, {}, puuid='player'))
+
+
+def make_cache() -> ResponseCache:
+    cache = ResponseCache(max_entries=10, ttl_seconds=60, similarity=0.8)
+    cache.put(cache.key('coach', AHRI, {}, puuid='player'), {'response': 'Ahri answer'})
+    return cache
+
+
+def test_different_champion_is_not_a_similar_question():
+    cache = make_cache()
+
+    assert cached_answer(cache, ZED) is None
+    assert cached_answer(cache, "how many times did I die early on Ahri in my ranked solo games this year?")['response'] == 'Ahri answer'
+    assert cached_answer(cache, "how many times did i die early on ahri in ranked solo games this year")['response'] == 'Ahri answer'
+
+
+def test_multi_word_champion_names_are_entities():
+    entities = response_cache.question_entities(response_cache.normalize_question("best build on Lee Sin or Dr. Mundo"))
+
+    assert {'champion:64', 'champion:36'} <= entities
+
+
+def test_no_similar_matches_without_the_champion_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, 'get_static_data', lambda: StaticDataService(tmp_path))
+    cache = make_cache()
+
+    assert cached_answer(cache, ZED) is None
+    assert cached_answer(cache, "how many times did I die early on Ahri in ranked solo games this year") is None
+    assert cached_answer(cache, AHRI)['response'] == 'Ahri answer'
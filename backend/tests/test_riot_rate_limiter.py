@@ -0,0 +1,175 @@
+"""
+Riot rate-limit scheduler tests
+RiotAPIClient against a local stub server that enforces an app limit and answers 429s
+"""
+import asyncio
+import math
+import time
+
+import httpx
+import pytest
+
+from services.match_cache import MatchCache
+from services.rate_limiter import RiotRateLimiter
+from services.riot_api import RiotAPIClient
+
+HOST = RiotAPIClient.BASE_URLS["americas"]
+
+
+class StubRiotServer:
+    """Accepts `limit` requests per `seconds` window and answers the rest with 429 + Retry-After"""
+
+    def __init__(self, limit: int, seconds: int, fail_first: int = 0, retry_after: int = 1, latency: float = 0.01):
+        self.limit = limit
+        self.seconds = seconds
+        self.fail_first = fail_first  # Unconditional 429s before the limit applies
+        self.retry_after = retry_after
+        self.latency = latency  # Response delay: keeps concurrent requests in flight before any response arrives
+        self.accepted = []
+        self.rejected = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        # Counted on arrival, like Riot does, so response latency jitter can't shift the window
+        response = self.respond(request, time.monotonic())
+        await asyncio.sleep(self.latency)
+        return response
+
+    def respond(self, request: httpx.Request, now: float) -> httpx.Response:
+        self.accepted = [t for t in self.accepted if t > now - self.seconds]
+        headers = {"X-App-Rate-Limit": f"{self.limit}:{self.seconds}"}
+
+        if self.fail_first:
+            self.fail_first -= 1
+            self.rejected += 1
+            headers.update({"Retry-After": str(self.retry_after), "X-Rate-Limit-Type": "service"})
+            return httpx.Response(429, headers=headers)
+
+        if len(self.accepted) >= self.limit:
+            self.rejected += 1
+            wait = self.accepted[0] + self.seconds - now
+            headers.update({"Retry-After": str(math.ceil(wait)), "X-Rate-Limit-Type": "application"})
+            return httpx.Response(429, headers=headers)
+
+        self.accepted.append(now)
+        headers["X-App-Rate-Limit-Count"] = f"{len(self.accepted)}:{self.seconds}"
+        return httpx.Response(200, json={"path": request.url.path}, headers=headers)
+
+
+def make_client(server: StubRiotServer, tmp_path, app_limits=None, max_retries: int = 3) -> RiotAPIClient:
+    return RiotAPIClient(
+        api_key="test-key",
+        rate_limiter=RiotRateLimiter(app_limits=app_limits),
+        max_retries=max_retries,
+        match_cache=MatchCache(cache_dir=str(tmp_path), max_bytes=0),
+        transport=httpx.MockTransport(server.handle)
+    )
+
+
+async def fetch_accounts(client: RiotAPIClient, count: int):
+    try:
+        return await asyncio.gather(*(
+            client.get_account_by_riot_id(f"player{i}", "NA1") for i in range(count)
+        ))
+    finally:
+        await client.aclose()
+
+
+def test_known_limit_never_trips_429(tmp_path):
+    server = StubRiotServer(limit=5, seconds=1)
+    client = make_client(server, tmp_path, app_limits=[(5, 1)])
+
+    start = time.monotonic()
+    results = asyncio.run(fetch_accounts(client, 12))
+    elapsed = time.monotonic() - start
+
+    assert len(results) == 12
+    assert server.rejected == 0
+    # 12 requests at 5/s need two full windows
+    assert elapsed >= 2.0
+
+
+def test_learns_limit_from_headers_and_recovers_from_429s(tmp_path):
+    # The scheduler starts at the development-key default (20/s), the stub allows 5/s
+    server = StubRiotServer(limit=5, seconds=1)
+    client = make_client(server, tmp_path)
+
+    results = asyncio.run(fetch_accounts(client, 12))
+
+    assert [r["path"] for r in results] == [
+        f"/riot/account/v1/accounts/by-riot-id/player{i}/NA1" for i in range(12)
+    ]
+    # The first burst overshoots, the retries wait out Retry-After at the learned rate
+    assert server.rejected > 0
+    assert server.rejected < 12
+
+
+def test_retry_after_is_honoured(tmp_path):
+    server = StubRiotServer(limit=100, seconds=1, fail_first=1, retry_after=1)
+    client = make_client(server, tmp_path)
+
+    start = time.monotonic()
+    results = asyncio.run(fetch_accounts(client, 1))
+
+    assert results[0]["path"].endswith("/player0/NA1")
+    assert server.rejected == 1
+    assert time.monotonic() - start >= 1.0
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    server = StubRiotServer(limit=100, seconds=1, fail_first=10, retry_after=0)
+    client = make_client(server, tmp_path, max_retries=2)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(fetch_accounts(client, 1))
+    assert server.rejected == 3
+
+
+def test_server_errors_share_the_single_retry_budget(tmp_path):
+    attempts = []
+
+    async def flaky(request: httpx.Request) -> httpx.Response:
+        attempts.append(request.url.path)
+        return httpx.Response(503)
+
+    client = RiotAPIClient(
+        api_key="test-key",
+        max_retries=2,
+        match_cache=MatchCache(cache_dir=str(tmp_path), max_bytes=0),
+        transport=httpx.MockTransport(flaky)
+    )
+    # Bulk downloads report failures as None instead of retrying again on top of _get
+    async def fetch():
+        try:
+            return await client.get_multiple_timelines(["NA1_1"])
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(fetch())
+
+    assert results == [None]
+    assert len(attempts) == 3
+
+
+def test_cancelled_fetch_hands_over_to_waiters(tmp_path):
+    server = StubRiotServer(limit=100, seconds=1, latency=0.2)
+    client = make_client(server, tmp_path)
+
+    async def run():
+        try:
+            leader = asyncio.create_task(client.get_match_details("NA1_1"))
+            await asyncio.sleep(0.05)
+            waiters = [asyncio.create_task(client.get_match_details("NA1_1")) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            # The request doing the shared fetch goes away (e.g. its SSE client disconnected)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            assert leader.cancelled()
+            return results
+        finally:
+            await client.aclose()
+
+    results = asyncio.run(run())
+
+    assert [r["path"] for r in results] == ["/lol/match/v5/matches/NA1_1"] * 3
+    # One abandoned request, then a single shared re-fetch
+    assert len(server.accepted) == 2
@@ -5,11 +5,20 @@ Uses MongoDB Atlas free tier (512 MB storage)
 
 import json
 import os
-from datetime import datetime
+import sys
+from pathlib import Path
 from pymongo import MongoClient, ASCENDING, DESCENDING
 from pymongo.errors import ConnectionFailure
 from dotenv import load_dotenv
 
+from services.match_repository import get_match_repository
+from services.timeline_events import (
+    EVENTS_COLLECTION, create_event_indexes,
+    replace_match_events, resolve_timeline_participants
+)
+from services.timeline_codec import timeline_data, unpack_document
+from services.timeline_ingest import parallel_batches, upload_timeline_files
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -47,19 +56,27 @@ class MongoDBTimelineUploader:
             ("puuid", ASCENDING),
             ("gameCreation", DESCENDING)
         ])
+        self.db.timelines.create_index([
+            ("puuid", ASCENDING),
+            ("championName", ASCENDING),
+            ("teamPosition", ASCENDING)
+        ])
 
         print("[OK] Created indexes on 'timelines' collection")
 
+        # Positioned event index used by heatmaps
+        create_event_indexes(self.db)
+        print(f"[OK] Created indexes on '{EVENTS_COLLECTION}' collection")
+
     def upload_timelines(self, data_dir: str, puuid: str):
-        """Upload all match timelines"""
+        """Upload all match timelines (bulk: one existence query, parallel parsing, batched inserts)"""
         timeline_dir = os.path.join(data_dir, 'match_timeline')
 
         if not os.path.exists(timeline_dir):
             print("[WARN] No match_timeline folder found")
             return 0
 
-        timeline_files = [f for f in os.listdir(timeline_dir)
-                         if f.endswith('.json')]
+        timeline_files = sorted(Path(timeline_dir).glob('*.json'))
 
         if not timeline_files:
             print("[WARN] No timeline files found")
@@ -67,84 +84,98 @@ class MongoDBTimelineUploader:
 
         print(f"\nUploading {len(timeline_files)} timeline files...")
 
-        uploaded = 0
-        skipped_large = 0
-        skipped_exists = 0
-
-        for i, timeline_file in enumerate(timeline_files, 1):
-            file_path = os.path.join(timeline_dir, timeline_file)
-            file_size = os.path.getsize(file_path)
-
-            # Extract match ID from filename: timeline_NA1_5080320781.json
-            match_id = timeline_file.replace('timeline_', '').replace('.json', '')
-
-            # Check if already exists
-            if self.db.timelines.find_one({'matchId': match_id}):
-                skipped_exists += 1
-                continue
-
-            with open(file_path, 'r', encoding='utf-8') as f:
-                timeline_data = json.load(f)
-
-            # Create document
-            doc = {
-                'matchId': match_id,
-                'puuid': puuid,
-                'data': timeline_data,
-                'uploadedAt': datetime.utcnow(),
-                'fileSize': file_size
-            }
-
-            # Extract metadata if available
-            if 'metadata' in timeline_data:
-                doc['metadata'] = timeline_data['metadata']
-
-            if 'info' in timeline_data:
-                info = timeline_data['info']
-                doc['gameCreation'] = info.get('gameCreation')
-                doc['gameDuration'] = info.get('gameDuration')
-                doc['frameInterval'] = info.get('frameInterval')
-                doc['frames'] = len(info.get('frames', []))
-
-            # Check document size (16 MB limit in MongoDB)
-            doc_size = len(json.dumps(doc, default=str))
-            if doc_size > 15_000_000:  # 15 MB threshold
-                print(f"[WARN] Timeline {match_id} too large ({doc_size:,} bytes / {doc_size/1024/1024:.2f} MB), skipping")
-                skipped_large += 1
-                continue
-
-            # Insert document
-            try:
-                self.db.timelines.insert_one(doc)
-                uploaded += 1
-
-                if i % 10 == 0:
-                    print(f"  Progress: {i}/{len(timeline_files)} ({file_size:,} bytes / {file_size/1024:.2f} KB)")
-
-            except Exception as e:
-                print(f"[ERROR] Failed to upload {match_id}: {e}")
-
-        print(f"\n[OK] Uploaded {uploaded} timelines")
-        if skipped_exists > 0:
-            print(f"[INFO] Skipped {skipped_exists} existing timelines")
-        if skipped_large > 0:
-            print(f"[WARN] Skipped {skipped_large} timelines (too large)")
-
-        return uploaded
+        matches_by_id = self._load_matches(data_dir)
+
+        stats = upload_timeline_files(self.db, timeline_files, puuid, matches_by_id)
+
+        print(f"\n[OK] Uploaded {stats['uploaded']} timelines ({stats['events']:,} positioned events)")
+        if stats['skipped_exists'] > 0:
+            print(f"[INFO] Skipped {stats['skipped_exists']} existing timelines")
+        if stats['skipped_large'] > 0:
+            print(f"[WARN] Skipped {stats['skipped_large']} timelines (too large)")
+        if stats['failed'] > 0:
+            print(f"[ERROR] {stats['failed']} timeline files could not be read")
+
+        return stats['uploaded']
+
+    def _load_matches(self, data_dir: str):
+        """Match details from match_summary/, keyed by match ID (files parsed in parallel)"""
+        matches_dir = os.path.join(data_dir, 'match_summary')
+        matches = {}
+        if not os.path.exists(matches_dir):
+            return matches
+
+        match_files = sorted(Path(matches_dir).glob('match_*.json'))
+
+        def load(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        for batch in parallel_batches(match_files, load):
+            for match_data in batch:
+                match_id = match_data.get('metadata', {}).get('matchId')
+                if match_id:
+                    matches[match_id] = match_data
+
+        return matches
+
+    def backfill_timeline_participants(self, puuid: str = None):
+        """Store participantId / championName / teamPosition on timelines uploaded before they existed"""
+        query = {'championName': {'$exists': False}}
+        if puuid:
+            query['puuid'] = puuid
+        projection = {'_id': 0, 'matchId': 1, 'puuid': 1, 'data.metadata.participants': 1}
+
+        docs_by_player = {}
+        for doc in self.db.timelines.find(query, projection):
+            docs_by_player.setdefault(doc['puuid'], []).append(doc)
+
+        repository = get_match_repository()
+        updated = 0
+        for player_puuid, docs in docs_by_player.items():
+            # One BatchGetItem per 100 matches instead of a query per timeline
+            resolved = resolve_timeline_participants(player_puuid, docs, repository)
+            for match_id, fields in resolved.items():
+                self.db.timelines.update_one({'matchId': match_id}, {'$set': fields})
+                updated += 1
+
+        print(f"[OK] Backfilled participant fields on {updated} timelines")
+        return updated
+
+    def backfill_timeline_events(self, puuid: str = None):
+        """Write timeline_events rows for timelines uploaded before the event index existed"""
+        query = {'puuid': puuid} if puuid else {}
+        projection = {
+            '_id': 0, 'matchId': 1, 'puuid': 1, 'uploadedAt': 1, 'data.info.frames.events': 1,
+            # Packed timelines: just the compressed event column
+            'format': 1, 'packed.frames': 1, 'packed.timestamps': 1, 'packed.events': 1, 'packed.event_offsets': 1
+        }
+
+        matches = 0
+        events_written = 0
+        for doc in self.db.timelines.find(query, projection):
+            events_written += replace_match_events(
+                self.db, doc['matchId'], doc.get('puuid'), timeline_data(doc, fields=()), doc.get('uploadedAt')
+            )
+            matches += 1
+
+        print(f"[OK] Backfilled {events_written:,} positioned events from {matches} timelines")
+        return events_written
 
     def get_timeline(self, match_id: str):
-        """Get a specific timeline"""
-        return self.db.timelines.find_one(
+        """Get a specific timeline (packed documents decoded back to the Riot timeline shape)"""
+        doc = self.db.timelines.find_one(
             {'matchId': match_id},
             {'_id': 0}
         )
+        return unpack_document(doc) if doc else None
 
     def get_timelines_by_player(self, puuid: str, limit: int = 50):
-        """Get all timelines for a player"""
-        return list(self.db.timelines.find(
+        """Get all timelines for a player (packed documents decoded back to the Riot timeline shape)"""
+        return [unpack_document(doc) for doc in self.db.timelines.find(
             {'puuid': puuid},
             {'_id': 0}
-        ).sort('gameCreation', -1).limit(limit))
+        ).sort('gameCreation', -1).limit(limit)]
 
     def get_stats(self):
         """Get collection statistics"""
@@ -344,4 +375,15 @@ const { match, timeline } = await response.json();
 
 
 if __name__ == "__main__":
-    main()
+    # python upload_timelines_to_mongodb.py --backfill-events [puuid]
+    # python upload_timelines_to_mongodb.py --backfill-participants [puuid]
+    if len(sys.argv) in (2, 3) and sys.argv[1] in ('--backfill-events', '--backfill-participants'):
+        uploader = MongoDBTimelineUploader(os.getenv('MONGODB_CONNECTION_STRING'))
+        uploader.create_indexes()
+        target_puuid = sys.argv[2] if len(sys.argv) == 3 else None
+        if sys.argv[1] == '--backfill-events':
+            uploader.backfill_timeline_events(target_puuid)
+        else:
+            uploader.backfill_timeline_participants(target_puuid)
+    else:
+        main()
@@ -1,29 +1,27 @@
 import json
 import boto3
 import os
+import sys
 import time
-from decimal import Decimal
-from typing import Any, Dict, List
+from typing import Dict, List
 from boto3.dynamodb.types import TypeSerializer
 from pathlib import Path
 from datetime import datetime
+from services.clients import ClientRegistry
+from services.dynamo_ingest import DynamoIngest, checkpoint_for, file_source
+from services.match_repository import MatchRepository
+from services.match_summary import build_summary_item
+from services.year_recap_aggregate import YearRecapAggregates
 
 class DynamoDBUploader:
-    def __init__(self, region_name='us-east-1'):
+    def __init__(self, region_name='us-east-1', use_checkpoints: bool = True):
         """Initialize DynamoDB client and serializer"""
         self.dynamodb = boto3.client('dynamodb', region_name=region_name)
         self.dynamodb_resource = boto3.resource('dynamodb', region_name=region_name)
         self.serializer = TypeSerializer()
-
-    def convert_floats_to_decimal(self, obj: Any) -> Any:
-        """Convert float to Decimal for DynamoDB compatibility"""
-        if isinstance(obj, float):
-            return Decimal(str(obj))
-        elif isinstance(obj, dict):
-            return {k: self.convert_floats_to_decimal(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [self.convert_floats_to_decimal(item) for item in obj]
-        return obj
+        # Ingest workers each get their own Table from this registry
+        self.clients = ClientRegistry(aws_region=region_name)
+        self.use_checkpoints = use_checkpoints
 
     def create_tables_if_not_exist(self):
         """Create DynamoDB tables with new structure"""
@@ -74,35 +72,16 @@ class DynamoDBUploader:
                 print(f"Table {table_name} already exists")
 
     def batch_write_items(self, table_name: str, items: List[Dict]):
-        """Write items in batches to DynamoDB (max 25 items per batch)"""
-        table = self.dynamodb_resource.Table(table_name)
-        batch_size = 25
-        total_items = len(items)
-
-        print(f"Uploading {total_items} items to {table_name}")
-
-        for i in range(0, total_items, batch_size):
-            batch = items[i:i + batch_size]
-
-            with table.batch_writer() as writer:
-                for item in batch:
-                    try:
-                        # Convert floats to Decimal
-                        item = self.convert_floats_to_decimal(item)
-
-                        # Check item size before writing
-                        item_size = len(json.dumps(item, default=str))
-                        if item_size > 380000:  # 380KB threshold
-                            print(f"[WARN] Skipping large item: {item.get('dataType', 'unknown')} ({item_size:,} bytes)")
-                            continue
+        """Write items in batches to DynamoDB (25 per request, parallel workers, unprocessed items retried)"""
+        print(f"Uploading {len(items)} items to {table_name}")
+        key_names = ('puuid', 'dataType') if table_name == 'lol-player-data' else ('dataType',)
+        stats = DynamoIngest(table_name, clients=self.clients, key_names=key_names).write_items(items)
+        self._report(table_name, stats)
 
-                        writer.put_item(Item=item)
-                    except Exception as e:
-                        print(f"[ERROR] Failed to write item to {table_name}: {e}")
-                        print(f"  Item keys: puuid={item.get('puuid', 'N/A')}, dataType={item.get('dataType', 'N/A')}")
-                        print(f"  Item size: {len(json.dumps(item, default=str)):,} bytes")
-
-            print(f"Uploaded {min(i + batch_size, total_items)}/{total_items} items to {table_name}")
+    def _report(self, table_name: str, stats: Dict[str, int]):
+        print(f"Uploaded {stats['written']} items to {table_name}"
+              + (f" ({stats['oversized']} too large, skipped)" if stats['oversized'] else "")
+              + (f" ({stats['failed']} FAILED)" if stats['failed'] else ""))
 
     def upload_account_data(self, data_dir: str, puuid: str, player_name: str):
         """Upload account data"""
@@ -139,44 +118,100 @@ class DynamoDBUploader:
                 self.batch_write_items('lol-player-data', [item])
                 print("[OK] Summoner data uploaded")
 
+    def match_items(self, match_path: Path, puuid: str) -> List[Dict]:
+        """The match#<matchId> item and its summary#<matchId> row for one match file"""
+        with open(match_path, 'r', encoding='utf-8') as f:
+            match_data = json.load(f)
+
+        # Extract matchId
+        if 'metadata' in match_data and 'matchId' in match_data['metadata']:
+            match_id = match_data['metadata']['matchId']
+        else:
+            # Extract from filename: match_1_NA1_5080320781.json
+            # Remove 'match_' prefix and '.json' suffix
+            temp = match_path.name.replace('match_', '').replace('.json', '')
+            # Remove the number prefix (e.g., "1_" from "1_NA1_5080320781")
+            parts = temp.split('_', 1)
+            match_id = parts[1] if len(parts) > 1 else temp
+
+        uploaded_at = datetime.utcnow().isoformat()
+        items = [{
+            'puuid': puuid,
+            'dataType': f'match#{match_id}',  # Use prefix to group all matches
+            'matchId': match_id,
+            'data': match_data,
+            'uploadedAt': uploaded_at
+        }]
+
+        # Compact per-player row (summary#<matchId>) read by analytics instead of the full match
+        summary_item = build_summary_item(puuid, match_id, match_data, uploaded_at)
+        if summary_item:
+            items.append(summary_item)
+        return items
+
     def upload_matches_data(self, data_dir: str, puuid: str):
-        """Upload match data - each match as a separate item"""
+        """
+        Upload match data - each match as a separate item. Files are parsed on the
+        ingest workers as they are written; with checkpoints, files already uploaded
+        (same size and modification time) are skipped on a re-run.
+        """
         matches_dir = os.path.join(data_dir, 'match_summary')
         if not os.path.exists(matches_dir):
             print("[WARN] No match_summary folder found")
             return
 
-        match_files = [f for f in os.listdir(matches_dir)
-                      if f.startswith('match_') and f.endswith('.json')]
+        match_files = sorted(f for f in os.listdir(matches_dir)
+                             if f.startswith('match_') and f.endswith('.json'))
+        print(f"Uploading {len(match_files)} match files to lol-player-data")
 
-        matches = []
-        for match_file in match_files:
-            with open(os.path.join(matches_dir, match_file), 'r', encoding='utf-8') as f:
-                match_data = json.load(f)
+        checkpoint = checkpoint_for(f"lol-player-data_{puuid}") if self.use_checkpoints else None
+        ingest = DynamoIngest('lol-player-data', checkpoint=checkpoint, clients=self.clients)
+        try:
+            stats = ingest.run(
+                file_source(os.path.join(matches_dir, match_file), lambda path: self.match_items(path, puuid), matches_dir)
+                for match_file in match_files
+            )
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
 
-                # Extract matchId
-                if 'metadata' in match_data and 'matchId' in match_data['metadata']:
-                    match_id = match_data['metadata']['matchId']
-                else:
-                    # Extract from filename: match_1_NA1_5080320781.json
-                    # Remove 'match_' prefix and '.json' suffix
-                    temp = match_file.replace('match_', '').replace('.json', '')
-                    # Remove the number prefix (e.g., "1_" from "1_NA1_5080320781")
-                    parts = temp.split('_', 1)
-                    match_id = parts[1] if len(parts) > 1 else temp
+        self._report('lol-player-data', stats)
+        print(f"[OK] {stats['sources']} match files uploaded"
+              + (f", {stats['skipped_sources']} already uploaded (checkpoint)" if stats['skipped_sources'] else ""))
 
-                item = {
-                    'puuid': puuid,
-                    'dataType': f'match#{match_id}',  # Use prefix to group all matches
-                    'matchId': match_id,
-                    'data': match_data,
-                    'uploadedAt': datetime.utcnow().isoformat()
-                }
-                matches.append(item)
+    def backfill_match_summaries(self, puuid: str):
+        """Write summary#<matchId> rows for matches uploaded before summaries existed"""
+        table = self.dynamodb_resource.Table('lol-player-data')
+        query_kwargs = {
+            'KeyConditionExpression': 'puuid = :puuid AND begins_with(dataType, :dtype)',
+            'ExpressionAttributeValues': {':puuid': puuid, ':dtype': 'match#'}
+        }
 
-        if matches:
-            self.batch_write_items('lol-player-data', matches)
-            print(f"[OK] {len(matches)} matches uploaded")
+        summaries = []
+        while True:
+            response = table.query(**query_kwargs)
+            for item in response['Items']:
+                summary_item = build_summary_item(
+                    puuid, item['matchId'], item.get('data', {}), item.get('uploadedAt', datetime.utcnow().isoformat())
+                )
+                if summary_item:
+                    summaries.append(summary_item)
+
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            if not last_evaluated_key:
+                break
+            query_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+        if summaries:
+            self.batch_write_items('lol-player-data', summaries)
+        print(f"[OK] Backfilled {len(summaries)} match summaries for {puuid}")
+
+    def rebuild_year_recap_aggregate(self, puuid: str):
+        """Recompute the aggregate#year_recap item from the player's stored match summaries"""
+        table = self.dynamodb_resource.Table('lol-player-data')
+        aggregates = YearRecapAggregates(table=table, match_repository=MatchRepository(table=table, ttl_seconds=0))
+        aggregate = aggregates.rebuild(puuid)
+        print(f"[OK] Year recap aggregate built from {aggregate['total_matches']} matches")
 
     def upload_champion_mastery_data(self, data_dir: str, puuid: str):
         """Upload champion mastery data as a single item"""
@@ -292,6 +327,7 @@ class DynamoDBUploader:
         self.upload_account_data(data_dir, puuid, player_name)
         self.upload_summoner_data(data_dir, puuid)
         self.upload_matches_data(data_dir, puuid)
+        self.rebuild_year_recap_aggregate(puuid)
         self.upload_champion_mastery_data(data_dir, puuid)
         self.upload_ranked_data(data_dir, puuid)
         self.upload_challenges_data(data_dir, puuid)
@@ -345,7 +381,7 @@ class DynamoDBUploader:
         return response.get('Items', [])
 
 
-def main():
+def main(use_checkpoints: bool = True):
     """Main function to run the upload"""
     # Configuration
     DATA_DIR = 'Sneaky_data'  # Relative to backend directory
@@ -363,7 +399,7 @@ def main():
         return
 
     # Initialize uploader
-    uploader = DynamoDBUploader(region_name=REGION)
+    uploader = DynamoDBUploader(region_name=REGION, use_checkpoints=use_checkpoints)
 
     # Create tables
     print("Creating DynamoDB tables if they don't exist...")
@@ -393,6 +429,7 @@ def main():
     print("     - challenges        (player challenges)")
     print("     - champion_mastery  (all champion masteries)")
     print("     - match#<matchId>   (individual matches - 57 items)")
+    print("     - summary#<matchId> (compact per-match stats used by analytics)")
     print("\nTable 2: lol-static-data (Reference data - shared by ALL players)")
     print("   Structure: dataType (primary key)")
     print("   Data types:")
@@ -434,4 +471,11 @@ response = static_table.get_item(
 
 
 if __name__ == "__main__":
-    main()
+    # python upload_to_dynamodb.py --backfill-summaries <puuid>
+    # python upload_to_dynamodb.py [--no-checkpoint]   (re-upload match files already uploaded)
+    if len(sys.argv) == 3 and sys.argv[1] == '--backfill-summaries':
+        uploader = DynamoDBUploader()
+        uploader.backfill_match_summaries(sys.argv[2])
+        uploader.rebuild_year_recap_aggregate(sys.argv[2])
+    else:
+        main(use_checkpoints='--no-checkpoint' not in sys.argv)
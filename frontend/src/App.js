@@ -365,7 +365,8 @@ function App() {
 
     try {
       // Check cache first
-      const cacheKey = `yearRecap_${currentPuuid}`;
+      // v2: binned minute_grids instead of raw heatmap points
+      const cacheKey = `yearRecap_v2_${currentPuuid}`;
       const cachedData = localStorage.getItem(cacheKey);
       const cacheTimestamp = localStorage.getItem(`${cacheKey}_timestamp`);
       
@@ -394,6 +395,7 @@ function App() {
         body: JSON.stringify({
           puuid: currentPuuid,
           player_name: currentPlayerName
+          // Raw points stay off: minute playback runs on the per-minute grids (minute_grids)
         })
       });
 
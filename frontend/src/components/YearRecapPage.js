@@ -99,17 +99,16 @@ const YearRecapPage = ({ yearRecapData, puuid, playerName, loading, error, narra
 
   const currentCategory = categories.find(c => c.id === selectedCategory);
 
-  // Use filtered heatmap data if available, otherwise use full data
-  const allCategoryData = useMemo(() => {
-    // If agent has provided filtered data, use that
+  // Agent-filtered heatmaps come with raw events; the full year recap is binned per minute
+  const filteredEvents = useMemo(() => {
     if (filteredHeatmapData && filteredHeatmapData.event_type === selectedCategory) {
       console.log(`Using filtered heatmap data: ${filteredHeatmapData.events.length} events`);
       return filteredHeatmapData.events;
     }
+    return null;
+  }, [selectedCategory, filteredHeatmapData]);
 
-    // Otherwise use full year recap data
-    return yearRecapData?.heatmap_data?.[selectedCategory] || [];
-  }, [yearRecapData, selectedCategory, filteredHeatmapData]);
+  const currentMinuteGrid = yearRecapData?.minute_grids?.[selectedCategory];
 
   const currentTimelineData = useMemo(() =>
     yearRecapData?.timeline_data?.[selectedCategory] || []
@@ -167,21 +166,51 @@ const YearRecapPage = ({ yearRecapData, puuid, playerName, loading, error, narra
     return dimension - (normalized * dimension);
   };
 
-  // Filter data based on current timeline position
+  // Filter raw (agent-filtered) events based on current timeline position
   const currentData = useMemo(() => {
+    if (!filteredEvents) return [];
     if (currentMinute === null) {
-      // Show all year data when not playing
-      return allCategoryData;
+      // Show all events when not playing
+      return filteredEvents;
     }
     // Filter to show only events up to current minute
-    return allCategoryData.filter(point => {
+    return filteredEvents.filter(point => {
       const pointMinute = Math.floor(point.timestamp / 60000);
       return pointMinute <= currentMinute;
     });
-  }, [allCategoryData, currentMinute]);
+  }, [filteredEvents, currentMinute]);
+
+  // Year recap cells up to the current minute, summed from the per-minute grids
+  const currentCells = useMemo(() => {
+    if (filteredEvents || !currentMinuteGrid) return [];
+
+    const { resolution, cell_size: cellSize, minutes, cells, counts } = currentMinuteGrid;
+    const cellCounts = {};
+    for (let i = 0; i < minutes.length; i++) {
+      // Entries are sorted by minute
+      if (currentMinute !== null && minutes[i] > currentMinute) break;
+      cellCounts[cells[i]] = (cellCounts[cells[i]] || 0) + counts[i];
+    }
+
+    return Object.entries(cellCounts).map(([cell, count]) => ({
+      x: ((cell % resolution) + 0.5) * cellSize,
+      y: (Math.floor(cell / resolution) + 0.5) * cellSize,
+      count
+    }));
+  }, [filteredEvents, currentMinuteGrid, currentMinute]);
+
+  const visibleEventsCount = useMemo(() => (
+    filteredEvents ? currentData.length : currentCells.reduce((total, cell) => total + cell.count, 0)
+  ), [filteredEvents, currentData, currentCells]);
 
   // Calculate density-based heatmap
   const heatmapPoints = useMemo(() => {
+    if (!filteredEvents) {
+      if (!currentCells.length) return [];
+      const maxCount = Math.max(...currentCells.map(cell => cell.count));
+      return currentCells.map(cell => ({ ...cell, density: cell.count / maxCount }));
+    }
+
     if (!currentData.length) return [];
 
     // Create grid for density calculation (500 unit cells)
@@ -207,7 +236,7 @@ const YearRecapPage = ({ yearRecapData, puuid, playerName, loading, error, narra
         density: densityMap[key] / maxDensity
       };
     });
-  }, [currentData]);
+  }, [filteredEvents, currentData, currentCells]);
 
   const stats = yearRecapData?.stats || {};
 
@@ -456,7 +485,7 @@ const YearRecapPage = ({ yearRecapData, puuid, playerName, loading, error, narra
   }
 
   // No data state
-  if (!yearRecapData || !yearRecapData.heatmap_data) {
+  if (!yearRecapData || !yearRecapData.minute_grids) {
     return (
       <div className="flex-1 bg-bg-dark flex items-center justify-center">
         <div className="text-center">
@@ -830,6 +859,12 @@ const YearRecapPage = ({ yearRecapData, puuid, playerName, loading, error, narra
                 </div>
 
                 <div className="mt-4 space-y-2">
+                  {selectedPoint.count !== undefined && (
+                    <div className="bg-gray-800 rounded-md px-3 py-2">
+                      <div className="text-xs uppercase tracking-wide text-text-secondary">Events in this area</div>
+                      <div className="text-white font-medium text-sm">{selectedPoint.count}</div>
+                    </div>
+                  )}
                   {selectedPoint.match_id && (
                     <div className="bg-gray-800 rounded-md px-3 py-2">
                       <div className="text-xs uppercase tracking-wide text-text-secondary">Match ID</div>
@@ -1104,7 +1139,7 @@ const YearRecapPage = ({ yearRecapData, puuid, playerName, loading, error, narra
         onPlayPause={handlePlayPause}
         onTimelineChange={handleTimelineChange}
         onReset={handleReset}
-        visibleEventsCount={currentData.length}
+        visibleEventsCount={visibleEventsCount}
       />
     </div>
   );